@@ -2,19 +2,83 @@ import streamlit as st
 import os
 import shutil
 import time
+from typing import Dict, Optional
 from dotenv import load_dotenv
 from modules.document_processor import DocumentProcessor
-from modules.vector_store import VectorStore
-from modules.llm_interface import LLMInterface
+from modules.vector_store import VectorStore, MANIFEST_FILE
+from modules.shared_store import SharedStore
+from modules.llm_interface import LLMInterface, CHAT_ERROR_PREFIX
+from modules.answer_cache import AnswerCache
+from modules.embedding_cache import EmbeddingCache
+from modules.embedding_backend import EmbeddingBackend, backend_for
+from modules.metrics import METRICS, serve as serve_metrics
 
 # --- Configuration & Setup ---
 load_dotenv()  # Load variables from .env file
 
 UPLOAD_DIR = "data/uploads"
+EMBED_CACHE_PATH = "data/embedding_cache.sqlite"
+STORE_DIR = "data/store"  # written by `python ingest.py <dir>`
+EMBED_TIMEOUT = 5.0  # seconds to wait for a query embedding before falling back to keyword results
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "3000"))  # prompt tokens spent on sources
 os.makedirs(UPLOAD_DIR, exist_ok=True)
 
+# Hot-path timings and token counts for the Debug tab (METRICS_ENABLED=0 turns them off);
+# METRICS_PORT additionally serves them at http://127.0.0.1:<port>/metrics for Prometheus
+# (METRICS_HOST=0.0.0.0 opts in to binding every interface)
+if os.getenv("METRICS_ENABLED", "1") == "1":
+    METRICS.enable()
+if os.getenv("METRICS_PORT"):
+    serve_metrics(int(os.getenv("METRICS_PORT")), host=os.getenv("METRICS_HOST", "127.0.0.1"))
+
 st.set_page_config(page_title="PCC AI Assistant", layout="wide")
 
+# --- Process-wide resources (shared by every browser session) ---
+@st.cache_resource
+def create_llm_interface(api_key: str) -> LLMInterface:
+    # Embeddings survive restarts/redeploys, so re-indexing only pays for new text
+    return LLMInterface(
+        api_key=api_key,
+        embedding_cache=EmbeddingCache(EMBED_CACHE_PATH),
+        embedder=get_embedder(),
+        context_token_budget=CONTEXT_TOKEN_BUDGET
+    )
+
+@st.cache_resource
+def get_processor() -> DocumentProcessor:
+    return DocumentProcessor()
+
+@st.cache_resource
+def get_shared_store() -> SharedStore:
+    # One copy of the vectors per process; sessions search snapshots of it
+    store = VectorStore()
+    # Start from a bulk-ingested store if one exists
+    if os.path.exists(os.path.join(STORE_DIR, MANIFEST_FILE)):
+        try:
+            store.load(STORE_DIR)
+        except Exception as e:
+            st.error(f"Error loading store from {STORE_DIR}: {e}")
+            store = VectorStore()
+    return SharedStore(store)
+
+@st.cache_resource
+def get_embedder() -> Optional[EmbeddingBackend]:
+    # Queries must be embedded by the backend that produced the stored vectors; a new store
+    # uses EMBEDDING_BACKEND (e.g. "hashing:1024:1-2" for local CPU embeddings), else OpenAI
+    recorded = get_shared_store().snapshot().embedding_backend
+    return backend_for(recorded or os.getenv("EMBEDDING_BACKEND"), STORE_DIR)
+
+@st.cache_resource
+def get_answer_cache() -> AnswerCache:
+    # Shared like the store it answers from: a question asked in one session is a hit in every other
+    # (entries are dropped whenever the shared store publishes a new version)
+    return AnswerCache()
+
+@st.cache_resource
+def get_summaries() -> Dict[str, str]:
+    # {doc_id: summary} of documents indexed through the app, visible to every session
+    return {}
+
 # --- Custom CSS for Modern Simple Look ---
 st.markdown("""
 <style>
@@ -47,12 +111,15 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 # --- Session State Initialization ---
-if 'processor' not in st.session_state:
-    st.session_state['processor'] = DocumentProcessor()
-if 'vector_store' not in st.session_state:
-    st.session_state['vector_store'] = VectorStore()
-if 'documents_meta' not in st.session_state:
-    st.session_state['documents_meta'] = {}  # {filename: summary}
+shared_store = get_shared_store()
+answer_cache = get_answer_cache()
+summaries = get_summaries()
+# This run reads one consistent version; other sessions' uploads show up on the next rerun
+store = shared_store.snapshot()
+documents = store.documents()
+documents_meta = {name: summaries.get(doc_id, "(bulk ingested)") for doc_id, name in documents.items()}  # {filename: summary}
+doc_ids = {name: doc_id for doc_id, name in documents.items()}  # {filename: doc_id}
+
 if 'llm_interface' not in st.session_state:
     st.session_state['llm_interface'] = None
 
@@ -61,7 +128,7 @@ if st.session_state['llm_interface'] is None:
     env_key = os.getenv("OPENAI_API_KEY")
     if env_key:
         try:
-            st.session_state['llm_interface'] = LLMInterface(api_key=env_key)
+            st.session_state['llm_interface'] = create_llm_interface(env_key)
         except Exception as e:
             st.error(f"Error initializing from .env: {e}")
 
@@ -76,14 +143,14 @@ with st.sidebar:
         with st.expander("Change Key"):
              new_key = st.text_input("New API Key", type="password")
              if new_key:
-                 st.session_state['llm_interface'] = LLMInterface(api_key=new_key)
+                 st.session_state['llm_interface'] = create_llm_interface(new_key)
                  st.rerun()
     else:
         st.warning("⚠️ No API Key Detected")
         user_key = st.text_input("Enter OpenAI Key", type="password")
         if user_key:
             try:
-                st.session_state['llm_interface'] = LLMInterface(api_key=user_key)
+                st.session_state['llm_interface'] = create_llm_interface(user_key)
                 st.success("Key Loaded!")
                 st.rerun()
             except Exception as e:
@@ -93,6 +160,8 @@ with st.sidebar:
 
     language = st.selectbox("Language", ["tr", "en"], index=0)
     top_k = st.slider("Retrieval Count (Top K)", 2, 8, 3)
+    # Empty selection = search all documents
+    file_filter = st.multiselect("Search only in", list(documents_meta.keys())) or None
 
     st.divider()
     
@@ -109,38 +178,75 @@ with st.sidebar:
                     with open(file_path, "wb") as f:
                         f.write(uploaded_file.getbuffer())
                     
-                    # 2. Extract Text (Deterministic)
-                    doc = st.session_state['processor'].build_document(file_path)
+                    # 2. Identify by content: an unchanged or duplicate upload is skipped outright
+                    processor = get_processor()
+                    content_hash = processor.file_hash(file_path)
+                    if store.has_document(content_hash):
+                        st.info(f"Already indexed (as {store.documents()[content_hash]}), skipped.")
+                    else:
+                        # 3. Extract Text (Deterministic): pages stream straight into the chunker
+                        #    (with page/offset provenance), no page list or joined text is kept
+                        doc_id, filename = content_hash, os.path.basename(file_path)
+                        chunk_records = list(processor.iter_chunks(processor.iter_pages(file_path)))
                     
-                    # 3. Create Chunks & Embeddings
-                    chunks = st.session_state['processor'].chunk_text(doc.text)
-                    embeddings = st.session_state['llm_interface'].embed_texts(chunks)
+                        # 4. Near-duplicates of stored chunks become references and a changed revision
+                        #    reuses the stored vectors of unchanged chunks; the rest are embedded while
+                        #    the short summary is written from the chunks (requests run concurrently)
+                        llm = st.session_state['llm_interface']
+                        chunks = [c.text for c in chunk_records]
+                        previous_id = doc_ids.get(filename)
+                        duplicate_of = shared_store.near_duplicates(doc_id, chunks, exclude=[previous_id])
+                        reused = store.reusable_vectors(previous_id, chunks) if previous_id else [None] * len(chunks)
+                        missing = [i for i, vec in enumerate(reused) if vec is None and duplicate_of[i] is None]
+                        new_embeddings, summary = llm.embed_and_summarize(
+                            [chunks[i] for i in missing], chunk_records, language=language
+                        )
+                        fresh = dict(zip(missing, new_embeddings))
                     
-                    # 4. Store Vector Data
-                    st.session_state['vector_store'].add_document(
-                        doc_id=doc.doc_id,
-                        filename=doc.filename,
-                        chunks=chunks,
-                        embeddings=embeddings
-                    )
-                    
-                    # 5. Generate Summary (Short)
-                    summary = st.session_state['llm_interface'].summarize_short(doc.text, language=language)
-                    st.session_state['documents_meta'][doc.filename] = summary
+                        # 5. Store Vector Data on a new version of the shared store (a re-uploaded file
+                        #    replaces its previous version) and persist it: saving into the directory the
+                        #    store came from appends one segment; searches in progress keep their snapshot
+                        summaries[doc_id] = summary
+                        with shared_store.write() as draft:
+                            # Step 4 read an older version: redo the lookups on the draft, since another
+                            # session may have removed a dedup target or the previous version meanwhile.
+                            # Chunks that lost theirs are embedded here (normally none)
+                            previous_id = {name: d for d, name in draft.documents().items()}.get(filename)
+                            duplicate_of = draft.near_duplicates(doc_id, chunks, exclude=[previous_id])
+                            embeddings = draft.reusable_vectors(previous_id, chunks) if previous_id else [None] * len(chunks)
+                            for i, vec in fresh.items():
+                                if embeddings[i] is None:
+                                    embeddings[i] = vec
+                            late = [i for i, vec in enumerate(embeddings) if vec is None and duplicate_of[i] is None]
+                            for i, vec in zip(late, llm.embed_texts([chunks[i] for i in late])):
+                                embeddings[i] = vec
+
+                            draft.bind_embedding_backend(llm.embedding_backend)
+                            draft.replace_document(
+                                doc_id=doc_id,
+                                filename=filename,
+                                chunks=chunks,
+                                embeddings=embeddings,
+                                provenance=[c.provenance() for c in chunk_records],
+                                duplicate_of=duplicate_of
+                            )
+                            if previous_id and previous_id != doc_id:
+                                draft.remove_document(previous_id)
+                            draft.save(STORE_DIR)
                     
-                    # Feedback & Refund
-                    st.toast(f"✅ Indexed: {doc.filename}", icon="🎉")
-                    st.success("File Processed Successfully!")
-                    time.sleep(1.0)
-                    st.rerun()
+                        # Feedback & Refund
+                        st.toast(f"✅ Indexed: {filename}", icon="🎉")
+                        st.success("File Processed Successfully!")
+                        time.sleep(1.0)
+                        st.rerun()
                     
                 except Exception as e:
                     st.error(f"Error processing file: {e}")
 
     # File Listing
-    if st.session_state['documents_meta']:
+    if documents_meta:
         st.markdown("### 📂 Uploaded Files")
-        for fname, summ in st.session_state['documents_meta'].items():
+        for fname, summ in documents_meta.items():
             with st.expander(f"📄 {fname}"):
                 st.caption(summ)
 
@@ -148,7 +254,7 @@ with st.sidebar:
 st.markdown("<h1 class='main-header'>🎓 Document Assistant</h1>", unsafe_allow_html=True)
 st.markdown("<p class='sub-text'>Search, ask questions, and analyze with AI.</p>", unsafe_allow_html=True)
 
-if not st.session_state['documents_meta']:
+if not documents_meta:
     st.info("👋 Welcome! Please upload a PDF or TXT file in the sidebar to get started.")
 else:
     tab1, tab2, tab3 = st.tabs(["🔎 Search", "💬 Q & A", "🛠️ Debug Mode"])
@@ -158,7 +264,7 @@ else:
         col1, col2 = st.columns([1, 3])
         with col1:
             st.markdown("**Search Options**")
-            search_type = st.radio("Type", ["Semantic (AI)", "Keyword (Exact)"], label_visibility="collapsed")
+            search_type = st.radio("Type", ["Hybrid", "Semantic (AI)", "Keyword (Exact)"], label_visibility="collapsed")
         
         with col2:
             query = st.text_input("Search query...", placeholder="e.g. 'Neural Networks'")
@@ -168,16 +274,21 @@ else:
             results = []
             
             if search_type == "Keyword (Exact)":
-                # Linear scan of all chunks
-                for chunk in st.session_state['vector_store'].chunks:
-                    if query.lower() in chunk['chunk_text'].lower():
-                        results.append(chunk)
-                results = results[:top_k] # Limit display
+                # Substring match: candidates from the inverted index, query verified on those chunks only
+                results = store.keyword_search(
+                    query, top_k=top_k, phrase=True, filenames=file_filter
+                )
+            elif search_type == "Hybrid":
+                # Keyword leg runs while the embedding request is in flight
+                q_future = st.session_state['llm_interface'].submit_embed_query(query)
+                results = store.hybrid_search(
+                    query, q_future, top_k=top_k, embedding_timeout=EMBED_TIMEOUT, filenames=file_filter
+                )
             else:
                 # Vector Search
                 q_vec = st.session_state['llm_interface'].embed_query(query)
                 if q_vec:
-                    results = st.session_state['vector_store'].search(q_vec, top_k=top_k)
+                    results = store.search(q_vec, top_k=top_k, filenames=file_filter)
             
             if not results:
                 st.warning("No matches found.")
@@ -187,6 +298,9 @@ else:
                     with st.container():
                         st.markdown(f"**📄 {req['filename']}** {score_display}")
                         st.info(req['chunk_text'])
+                        if req.get('sources'):
+                            # Near-identical text stored once; list every document it appears in
+                            st.caption("Also in: " + ", ".join(src['filename'] for src in req['sources'][1:]))
 
     # --- TAB 2: Q&A ---
     with tab2:
@@ -202,28 +316,47 @@ else:
             
             with st.chat_message("assistant"):
                 with st.spinner("Analyzing documents..."):
-                    # 1. Retrieve Contexts
-                    q_vec = st.session_state['llm_interface'].embed_query(user_question)
-                    contexts = st.session_state['vector_store'].search(q_vec, top_k=top_k)
-                    
-                    # 2. Generate Answer
-                    response = st.session_state['llm_interface'].answer_question(
-                        question=user_question,
-                        contexts=contexts,
-                        language=language
+                    # 1. Retrieve Contexts (semantic + keyword, keyword-only if embedding fails)
+                    q_future = st.session_state['llm_interface'].submit_embed_query(user_question)
+                    contexts = store.hybrid_search(
+                        user_question, q_future, top_k=top_k, embedding_timeout=EMBED_TIMEOUT,
+                        filenames=file_filter
                     )
                     
-                    # 3. Display Answer
-                    st.write(response['answer'])
+                    # 2. Reuse a cached answer for a near-identical question over the same sources,
+                    #    otherwise start a new one (citations are ready before the first token)
+                    q_vec = q_future.result() if q_future.done() else []
+                    cached = None
+                    if q_vec:
+                        cached = answer_cache.get(q_vec, contexts, language, store.version)
+                    if cached:
+                        response = {"citations": cached['citations'], "stream": iter([cached['answer']])}
+                    else:
+                        response = st.session_state['llm_interface'].stream_answer_question(
+                            question=user_question,
+                            contexts=contexts,
+                            language=language
+                        )
                     
-                    # 4. Display Citations
-                    with st.expander("📚 Sources Used"):
-                        if not response['citations']:
-                            st.write("No relevant documents found.")
-                        else:
-                            for idx, cit in enumerate(response['citations']):
-                                st.markdown(f"**{idx+1}. {cit['filename']}** (Score: {cit.get('score', 0):.2f})")
-                                st.text(cit['chunk_text'])
+                # 3. Display Answer as it is generated
+                answer = st.write_stream(response['stream'])
+                if q_vec and contexts and not cached and not answer.startswith(CHAT_ERROR_PREFIX):
+                    answer_cache.put(
+                        user_question, q_vec, contexts, language, store.version, answer, response['citations']
+                    )
+                
+                # 4. Display Citations
+                with st.expander("📚 Sources Used"):
+                    if not response['citations']:
+                        st.write("No relevant documents found.")
+                    else:
+                        for idx, cit in enumerate(response['citations']):
+                            st.markdown(f"**{idx+1}. {cit['filename']}** (Score: {cit.get('score', 0):.2f})")
+                            st.text(cit['chunk_text'])
+                            if cit.get('chunks'):
+                                st.caption(f"Merged chunks: {', '.join(str(i) for i in cit['chunk_indices'])}")
+                            if cit.get('sources'):
+                                st.caption("Also in: " + ", ".join(src['filename'] for src in cit['sources'][1:]))
 
     # --- TAB 3: Debug (Intentional Failure) ---
     with tab3:
@@ -238,7 +371,7 @@ else:
             with st.spinner("Running simulation..."):
                 # 1. Retrieve Normal Contexts
                 q_vec = st.session_state['llm_interface'].embed_query(debug_q)
-                contexts = st.session_state['vector_store'].search(q_vec, top_k=3)
+                contexts = store.search(q_vec, top_k=3)
                 
                 # 2. Call LLM with forced failure flag
                 res = st.session_state['llm_interface'].answer_question(
@@ -256,11 +389,46 @@ else:
                 
                 with col2:
                     st.subheader("Retrieved Contexts")
-                    # Show exactly what was sent (which might be shuffled/corrupted if flag is on)
+                    # Show the sources as packed for the prompt (shuffled/corrupted further if flag is on)
                     st.json([{
                         "file": c['filename'], 
+                        "chunks": c.get('chunk_indices', [c.get('chunk_index')]),
                         "text": c['chunk_text'][:200]+"..." 
-                    } for c in contexts])
+                    } for c in st.session_state['llm_interface'].pack_contexts(contexts)])
                 
                 if force_fail:
                     st.warning("⚠️ Note: Contexts may have been shuffled or ignored by the Prompt Injection.")
+
+        with st.expander("📈 Cache Metrics"):
+            st.json({
+                "query_embeddings": st.session_state['llm_interface'].query_cache_stats(),
+                "summary_notes": st.session_state['llm_interface'].summarizer.cache_stats(),
+                "answers": answer_cache.stats(),
+                "shared_store": shared_store.stats(),
+                "embedding": store.embedding_info
+            })
+
+        with st.expander("⏱️ Performance Metrics"):
+            if not METRICS.enabled:
+                st.info("Metrics are disabled (METRICS_ENABLED=0).")
+            else:
+                snapshot = METRICS.snapshot()
+                # Spans nest (e.g. hybrid search includes vector search), so times are inclusive
+                st.dataframe([
+                    {"span": name, "count": t['count'], "mean ms": round(t['mean_ms'], 2),
+                     "p50 ms": round(t['p50_ms'], 2), "p95 ms": round(t['p95_ms'], 2),
+                     "p99 ms": round(t['p99_ms'], 2), "total s": round(t['total_s'], 2)}
+                    for name, t in snapshot['timers'].items()
+                ], use_container_width=True)
+                st.json(snapshot['counters'])
+
+                col1, col2 = st.columns(2)
+                with col1:
+                    st.download_button(
+                        "Export (Prometheus)", METRICS.to_prometheus(),
+                        file_name="metrics.prom", mime="text/plain"
+                    )
+                with col2:
+                    if st.button("Reset Metrics"):
+                        METRICS.reset()
+                        st.rerun()
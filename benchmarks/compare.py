@@ -0,0 +1,80 @@
+import sys
+import json
+import argparse
+from typing import Dict, Any, Optional
+
+# Metrics where a smaller number is better; everything else (throughput) is higher-is-better
+_LOWER_IS_BETTER = ("_ms", "_seconds", "_mb")
+# Leaves describing the workload rather than measuring it
+_CONFIG_LEAVES = ("samples", "chunks", ".dim", "input_mb")
+
+def flatten(results: Dict[str, Any], prefix: str = "") -> Dict[str, float]:
+    """
+    Numeric leaves of a result file as {"stores.100000.search.p99_ms": value}.
+    """
+    flat: Dict[str, float] = {}
+    for key, value in results.items():
+        path = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(flatten(value, path + "."))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[path] = float(value)
+    return flat
+
+def change(metric: str, old: float, new: float) -> Optional[float]:
+    """
+    Relative improvement of `new` over `old` (positive = better), None when undefined.
+    """
+    if old == 0:
+        return None
+    ratio = (new - old) / old
+    return -ratio if metric.endswith(_LOWER_IS_BETTER) else ratio
+
+def compare(old: Dict[str, Any], new: Dict[str, Any], threshold: float = 0.05) -> Dict[str, Dict[str, float]]:
+    """
+    Metrics present in both result files, with their relative change.
+
+    Args:
+        old (Dict): Baseline results (benchmarks/run.py output).
+        new (Dict): Results to compare.
+        threshold (float): Changes smaller than this are reported as unchanged.
+
+    Returns:
+        Dict: metric -> {'old', 'new', 'change', 'verdict'}
+    """
+    old_flat = flatten({k: v for k, v in old.items() if k not in ("environment", "config")})
+    new_flat = flatten({k: v for k, v in new.items() if k not in ("environment", "config")})
+
+    report = {}
+    for metric in sorted(old_flat.keys() & new_flat.keys()):
+        if metric.endswith(_CONFIG_LEAVES):
+            continue
+        delta = change(metric, old_flat[metric], new_flat[metric])
+        if delta is None or abs(delta) < threshold:
+            verdict = "same"
+        else:
+            verdict = "better" if delta > 0 else "worse"
+        report[metric] = {"old": old_flat[metric], "new": new_flat[metric], "change": delta, "verdict": verdict}
+    return report
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Compare two benchmark result files.")
+    parser.add_argument("old", help="Baseline result JSON.")
+    parser.add_argument("new", help="Result JSON to compare against the baseline.")
+    parser.add_argument("--threshold", type=float, default=0.05, help="Relative change treated as noise.")
+    args = parser.parse_args(argv)
+
+    with open(args.old, encoding='utf-8') as f:
+        old = json.load(f)
+    with open(args.new, encoding='utf-8') as f:
+        new = json.load(f)
+
+    print(f"{old['environment'].get('commit')} -> {new['environment'].get('commit')}")
+    report = compare(old, new, args.threshold)
+    for metric, row in report.items():
+        delta = "n/a" if row["change"] is None else f"{row['change']:+.1%}"
+        print(f"{metric:60s} {row['old']:>14.4g} {row['new']:>14.4g} {delta:>9s}  {row['verdict']}")
+    return 1 if any(row["verdict"] == "worse" for row in report.values()) else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
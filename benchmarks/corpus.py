@@ -0,0 +1,76 @@
+import numpy as np
+from typing import List, Tuple
+
+# Syllables for a synthetic vocabulary (Zipf-distributed, like natural text)
+_SYLLABLES = ["ka", "lo", "mi", "ne", "ru", "sa", "ti", "vo", "ze", "da", "pe", "gu", "ha", "ji", "bo", "ce"]
+
+def vocabulary(size: int = 5000, seed: int = 0) -> List[str]:
+    rng = np.random.default_rng(seed)
+    words = set()
+    while len(words) < size:
+        n = int(rng.integers(1, 5))
+        words.add("".join(rng.choice(_SYLLABLES, size=n)))
+    return sorted(words)
+
+def _zipf_indices(rng: np.random.Generator, n: int, vocab_size: int) -> np.ndarray:
+    return (rng.zipf(1.3, size=n) - 1) % vocab_size
+
+def synthetic_document(n_chars: int, seed: int = 0) -> str:
+    """
+    Raw document text of about `n_chars` characters with the mess clean_text() deals with:
+    runs of spaces/tabs, CRLF line ends, blank-line runs and indented lines.
+    """
+    rng = np.random.default_rng(seed)
+    vocab = np.array(vocabulary(seed=seed))
+    parts: List[str] = []
+    size = 0
+    while size < n_chars:
+        words = vocab[_zipf_indices(rng, int(rng.integers(40, 160)), len(vocab))]
+        sentence_ends = rng.random(len(words)) < 0.08
+        text = " ".join(w + "." if end else w for w, end in zip(words, sentence_ends))
+        if rng.random() < 0.3:
+            text = text.replace(" ", "  \t", 3)
+        paragraph = ("   " if rng.random() < 0.2 else "") + text + "\r\n" * int(rng.integers(1, 4))
+        parts.append(paragraph)
+        size += len(paragraph)
+    return "".join(parts)
+
+def synthetic_chunks(n: int, words_per_chunk: int = 24, seed: int = 0) -> List[str]:
+    """
+    `n` short chunk texts drawn from the synthetic vocabulary.
+    """
+    rng = np.random.default_rng(seed)
+    vocab = np.array(vocabulary(seed=seed))
+    indices = _zipf_indices(rng, n * words_per_chunk, len(vocab)).reshape(n, words_per_chunk)
+    return [" ".join(row) for row in vocab[indices]]
+
+def synthetic_vectors(n: int, dim: int, n_clusters: int = 64, seed: int = 0) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Clustered unit vectors (real embeddings are far from uniform, which matters for IVF).
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: (vectors (n, dim) float32, cluster centers (n_clusters, dim)).
+    """
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((n_clusters, dim)).astype('float32')
+    centers /= np.linalg.norm(centers, axis=1, keepdims=True)
+
+    vectors = np.empty((n, dim), dtype='float32')
+    # Generated in blocks to keep the temporary arrays small at 1M rows
+    for start in range(0, n, 65536):
+        end = min(n, start + 65536)
+        labels = rng.integers(0, n_clusters, size=end - start)
+        block = centers[labels] + rng.standard_normal((end - start, dim)).astype('float32') * (1.4 / np.sqrt(dim))
+        block /= np.linalg.norm(block, axis=1, keepdims=True)
+        vectors[start:end] = block
+    return vectors, centers
+
+def synthetic_queries(centers: np.ndarray, n: int, seed: int = 1) -> np.ndarray:
+    """
+    Query vectors near random cluster centers.
+    """
+    rng = np.random.default_rng(seed)
+    dim = centers.shape[1]
+    noise = rng.standard_normal((n, dim)).astype('float32') * (2.0 / np.sqrt(dim))
+    queries = centers[rng.integers(0, len(centers), size=n)] + noise
+    return queries / np.linalg.norm(queries, axis=1, keepdims=True)
@@ -0,0 +1,127 @@
+import time
+import zlib
+import asyncio
+import hashlib
+import numpy as np
+from types import SimpleNamespace
+from typing import List, Dict, Any, Iterator, Optional
+from modules.keyword_index import tokenize
+
+def fake_embedding(text: str, dim: int = 256) -> List[float]:
+    """
+    Deterministic hashing-trick embedding: each word adds +-1 to one dimension, so texts
+    sharing words get similar vectors (search results stay meaningful) without any model.
+    """
+    vec = np.zeros(dim, dtype='float32')
+    for token in tokenize(text):
+        h = zlib.crc32(token.encode("utf-8"))
+        vec[h % dim] += 1.0 if (h >> 31) & 1 else -1.0
+    norm = np.linalg.norm(vec)
+    if norm == 0:
+        # Texts without words still get a stable, non-zero vector
+        vec[int(hashlib.sha256(text.encode("utf-8")).hexdigest(), 16) % dim] = 1.0
+        return vec.tolist()
+    return (vec / norm).tolist()
+
+def fake_answer(messages: List[Dict[str, str]]) -> str:
+    """
+    Deterministic chat reply derived from the prompt (cites SOURCE 1 when there is one).
+    """
+    prompt = messages[-1]["content"]
+    digest = hashlib.sha256(prompt.encode("utf-8")).hexdigest()[:8]
+    source = " [SOURCE 1]" if "SOURCE 1" in prompt else ""
+    return f"Synthetic answer {digest} for a {len(prompt)}-character prompt{source}."
+
+
+class FakeOpenAI:
+    def __init__(self, dim: int = 256, latency: float = 0.0, stream_chunk_words: int = 2):
+        """
+        Offline stand-in for the OpenAI client: `embeddings.create` and `chat.completions.create`
+        (with stream=True) return objects shaped like the SDK's, computed deterministically.
+        Plugs into LLMInterface(client=...).
+
+        Args:
+            dim (int): Embedding dimension.
+            latency (float): Seconds each request sleeps, to model network round trips.
+            stream_chunk_words (int): Words per streamed delta.
+        """
+        self.dim = dim
+        self.latency = latency
+        self.stream_chunk_words = stream_chunk_words
+        self.requests = 0
+        self.embeddings = SimpleNamespace(create=self._embed)
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._chat))
+
+    def _embed(self, input: List[str], model: str, **kwargs: Any) -> SimpleNamespace:
+        self.requests += 1
+        if self.latency:
+            time.sleep(self.latency)
+        return embedding_response(input, self.dim)
+
+    def _chat(self, model: str, messages: List[Dict[str, str]], temperature: float = 0.0, stream: bool = False, **kwargs: Any):
+        self.requests += 1
+        if self.latency:
+            time.sleep(self.latency)
+        answer = fake_answer(messages)
+        if stream:
+            include_usage = (kwargs.get("stream_options") or {}).get("include_usage", False)
+            return self._stream(answer, messages if include_usage else None)
+        return chat_response(answer, messages)
+
+    def _stream(self, answer: str, messages: Optional[List[Dict[str, str]]] = None) -> Iterator[SimpleNamespace]:
+        words = answer.split(" ")
+        for i in range(0, len(words), self.stream_chunk_words):
+            text = " ".join(words[i:i + self.stream_chunk_words]) + " "
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=text))], usage=None)
+        # Final chunk carries no content, like the real API
+        yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=None))], usage=None)
+        if messages is not None:
+            # stream_options={"include_usage": True}: one more chunk with usage and no choices
+            yield SimpleNamespace(choices=[], usage=chat_usage(messages, answer))
+
+
+class FakeAsyncOpenAI:
+    def __init__(self, dim: int = 256, latency: float = 0.0):
+        """
+        Async counterpart of FakeOpenAI, for LLMInterface(async_client=...).
+        """
+        self.dim = dim
+        self.latency = latency
+        self.requests = 0
+        self.embeddings = SimpleNamespace(create=self._embed)
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._chat))
+
+    async def _embed(self, input: List[str], model: str, **kwargs: Any) -> SimpleNamespace:
+        self.requests += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return embedding_response(input, self.dim)
+
+    async def _chat(self, model: str, messages: List[Dict[str, str]], temperature: float = 0.0, **kwargs: Any) -> SimpleNamespace:
+        self.requests += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return chat_response(fake_answer(messages), messages)
+
+
+def _count_tokens(text: str) -> int:
+    # Rough stand-in for a tokenizer: one token per whitespace-separated word
+    return len(text.split())
+
+def embedding_response(texts: List[str], dim: int) -> SimpleNamespace:
+    tokens = sum(_count_tokens(t) for t in texts)
+    return SimpleNamespace(
+        data=[SimpleNamespace(embedding=fake_embedding(t, dim)) for t in texts],
+        usage=SimpleNamespace(prompt_tokens=tokens, total_tokens=tokens)
+    )
+
+def chat_usage(messages: List[Dict[str, str]], answer: str) -> SimpleNamespace:
+    prompt = sum(_count_tokens(m["content"]) for m in messages)
+    completion = _count_tokens(answer)
+    return SimpleNamespace(prompt_tokens=prompt, completion_tokens=completion, total_tokens=prompt + completion)
+
+def chat_response(answer: str, messages: Optional[List[Dict[str, str]]] = None) -> SimpleNamespace:
+    return SimpleNamespace(
+        choices=[SimpleNamespace(message=SimpleNamespace(content=answer))],
+        usage=chat_usage(messages, answer) if messages is not None else None
+    )
@@ -0,0 +1,274 @@
+import os
+import sys
+import json
+import time
+import shutil
+import platform
+import argparse
+import tempfile
+import subprocess
+import multiprocessing
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Dict, Any, Callable, Optional
+from benchmarks.corpus import synthetic_document, synthetic_chunks, synthetic_vectors, synthetic_queries
+from benchmarks.fake_backend import FakeOpenAI, FakeAsyncOpenAI
+from modules.document_processor import DocumentProcessor
+from modules.vector_store import VectorStore
+from modules.llm_interface import LLMInterface
+from modules.embedding_backend import HashingEmbedder, TfidfSvdEmbedder
+from modules.metrics import METRICS
+
+# Finishes in minutes on a laptop; pass --sizes 1000000 explicitly for the 1M-chunk run (several GB of RAM)
+DEFAULT_SIZES = [10_000, 100_000]
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+CHUNKS_PER_DOC = 100
+
+def percentiles(samples_s: List[float]) -> Dict[str, float]:
+    """
+    p50/p95/p99/mean of latency samples, in milliseconds.
+    """
+    ms = np.asarray(samples_s) * 1000.0
+    return {
+        "p50_ms": float(np.percentile(ms, 50)),
+        "p95_ms": float(np.percentile(ms, 95)),
+        "p99_ms": float(np.percentile(ms, 99)),
+        "mean_ms": float(ms.mean()),
+        "samples": len(ms)
+    }
+
+def timed(fn: Callable[[], Any]) -> float:
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+def peak_rss_mb() -> Optional[float]:
+    """
+    Peak resident set size of this process (None where the resource module is unavailable).
+    """
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+def bench_text(text_mb: float, seed: int) -> Dict[str, Any]:
+    """
+    clean_text / chunk_text / iter_chunks throughput on one synthetic document.
+    """
+    processor = DocumentProcessor()
+    raw = synthetic_document(int(text_mb * 1024 * 1024), seed=seed)
+    mb = len(raw) / (1024 * 1024)
+
+    start = time.perf_counter()
+    cleaned = processor.clean_text(raw)
+    clean_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    chunks = processor.chunk_text(cleaned)
+    chunk_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    streamed = sum(1 for _ in processor.iter_chunks([(1, raw)]))
+    iter_s = time.perf_counter() - start
+
+    return {
+        "input_mb": mb,
+        "clean_text_mb_per_s": mb / clean_s,
+        "chunk_text_mb_per_s": len(cleaned) / (1024 * 1024) / chunk_s,
+        "iter_chunks_mb_per_s": mb / iter_s,
+        "chunks": len(chunks),
+        "streamed_chunks": streamed
+    }
+
+def bench_llm(n_chunks: int, dim: int, n_questions: int, seed: int) -> Dict[str, Any]:
+    """
+    LLMInterface code paths (batching, caching, prompt building, streaming) on the fake backend.
+    """
+    llm = LLMInterface(
+        api_key="offline",
+        client=FakeOpenAI(dim=dim),
+        async_client=FakeAsyncOpenAI(dim=dim),
+        query_cache_size=0
+    )
+    texts = synthetic_chunks(n_chunks, words_per_chunk=120, seed=seed)
+
+    embed_s = timed(lambda: llm.embed_texts(texts))
+    ingest_s = timed(lambda: llm.embed_and_summarize(texts, " ".join(texts[:50]), language="en"))
+
+    store = VectorStore()
+    store.add_document("bench", "bench.txt", texts, llm.embed_texts(texts))
+    questions = synthetic_chunks(n_questions, words_per_chunk=8, seed=seed + 1)
+
+    answer_s, first_token_s = [], []
+    for question in questions:
+        start = time.perf_counter()
+        contexts = store.search(llm.embed_query(question), top_k=3)
+        llm.answer_question(question, contexts, language="en")
+        answer_s.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        stream = llm.stream_answer_question(question, contexts, language="en")["stream"]
+        next(stream)
+        first_token_s.append(time.perf_counter() - start)
+        for _ in stream:
+            pass
+
+    return {
+        "chunks": n_chunks,
+        "embed_texts_chunks_per_s": n_chunks / embed_s,
+        "embed_and_summarize_chunks_per_s": n_chunks / ingest_s,
+        "answer_question": percentiles(answer_s),
+        "stream_first_token": percentiles(first_token_s)
+    }
+
+def bench_embedders(n_chunks: int, dim: int, n_queries: int, seed: int) -> Dict[str, Any]:
+    """
+    Local CPU embedding backends: fit time, batch throughput and single-query latency.
+    """
+    texts = synthetic_chunks(n_chunks, words_per_chunk=120, seed=seed)
+    questions = synthetic_chunks(n_queries, words_per_chunk=8, seed=seed + 1)
+    results: Dict[str, Any] = {"chunks": n_chunks}
+    for key, embedder in (("hashing", HashingEmbedder()), ("tfidf", TfidfSvdEmbedder(dim=dim))):
+        fit_s = timed(lambda: embedder.fit(texts))
+        encode_s = timed(lambda: embedder.encode(texts))
+        query_s = [timed(lambda: embedder.encode([q])) for q in questions]
+        results[key] = {
+            "fit_seconds": fit_s,
+            "encode_chunks_per_s": n_chunks / encode_s,
+            "query": percentiles(query_s)
+        }
+    return results
+
+def bench_store(n: int, dim: int, n_queries: int, top_k: int, ivf: bool, seed: int) -> Dict[str, Any]:
+    """
+    VectorStore at one scale: ingest rate, search latency, save/load time, peak RSS.
+    Runs in its own process so the peak RSS belongs to this scale alone.
+    """
+    vectors, centers = synthetic_vectors(n, dim, seed=seed)
+    texts = synthetic_chunks(n, seed=seed)
+    queries = synthetic_queries(centers, n_queries, seed=seed + 1)
+    result: Dict[str, Any] = {"chunks": n, "dim": dim}
+
+    # 1. Ingest: documents of CHUNKS_PER_DOC chunks, as the upload/ingest paths add them
+    store = VectorStore(near_dup_threshold=None)
+    start = time.perf_counter()
+    for doc, lo in enumerate(range(0, n, CHUNKS_PER_DOC)):
+        hi = min(n, lo + CHUNKS_PER_DOC)
+        store.add_document(f"doc{doc}", f"doc{doc}.txt", texts[lo:hi], list(vectors[lo:hi]))
+    result["add_document_chunks_per_s"] = n / (time.perf_counter() - start)
+    del vectors
+
+    # 2. Search latency (one warm-up query first)
+    store.search(queries[0], top_k=top_k)
+    result["search"] = percentiles([timed(lambda q=q: store.search(q, top_k=top_k)) for q in queries])
+    result["search_filtered"] = percentiles([
+        timed(lambda q=q, i=i: store.search(q, top_k=top_k, doc_ids=[f"doc{i % (n // CHUNKS_PER_DOC or 1)}"]))
+        for i, q in enumerate(queries)
+    ])
+    if ivf:
+        result["build_ivf_seconds"] = timed(store.build_ivf)
+        result["search_ivf"] = percentiles([timed(lambda q=q: store.search(q, top_k=top_k)) for q in queries])
+        store.drop_ivf()
+
+    # Copy-on-write fork that every write to the app's shared store pays
+    result["fork_ms"] = timed(store.fork) * 1000.0
+
+    # 3. Persistence
+    tmp = tempfile.mkdtemp(prefix="bench-store-")
+    try:
+        result["save_seconds"] = timed(lambda: store.save(tmp))
+        result["disk_mb"] = sum(
+            os.path.getsize(os.path.join(root, name)) for root, _, names in os.walk(tmp) for name in names
+        ) / (1024 * 1024)
+        loaded = VectorStore()
+        result["load_seconds"] = timed(lambda: loaded.load(tmp))
+        result["first_search_after_load_ms"] = timed(lambda: loaded.search(queries[0], top_k=top_k)) * 1000.0
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+    result["peak_rss_mb"] = peak_rss_mb()
+    if METRICS.enabled:
+        result["metrics"] = METRICS.snapshot()["timers"]
+    return result
+
+def run_isolated(fn: Callable[..., Dict[str, Any]], *args: Any) -> Dict[str, Any]:
+    """
+    Runs one benchmark in a fresh (spawned) process.
+    """
+    with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as pool:
+        return pool.submit(fn, *args).result()
+
+def environment() -> Dict[str, Any]:
+    def git(*cmd: str) -> Optional[str]:
+        try:
+            return subprocess.run(
+                ["git", *cmd], capture_output=True, text=True, timeout=10,
+                cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+            ).stdout.strip() or None
+        except (OSError, subprocess.SubprocessError):
+            return None
+
+    return {
+        "commit": git("rev-parse", "--short", "HEAD"),
+        "dirty": bool(git("status", "--porcelain", "--untracked-files=no")),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "cpus": os.cpu_count()
+    }
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Offline performance benchmarks (synthetic data, fake LLM backend).")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="Store sizes in chunks.")
+    parser.add_argument("--dim", type=int, default=256, help="Embedding dimension.")
+    parser.add_argument("--queries", type=int, default=200, help="Search queries per size.")
+    parser.add_argument("--top-k", type=int, default=5, help="Results per search.")
+    parser.add_argument("--ivf", action="store_true", help="Also build and query an IVF index.")
+    parser.add_argument("--text-mb", type=float, default=8.0, help="Size of the text-processing document.")
+    parser.add_argument("--llm-chunks", type=int, default=2000, help="Chunks embedded through LLMInterface.")
+    parser.add_argument("--questions", type=int, default=50, help="Questions answered through LLMInterface.")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of every synthetic input.")
+    parser.add_argument("--metrics", action="store_true", help="Record instrumentation while benchmarking (measures its overhead).")
+    parser.add_argument("--in-process", action="store_true", help="Don't isolate sizes in subprocesses (RSS is then cumulative).")
+    parser.add_argument("--out", help="Result file (default: benchmarks/results/<timestamp>_<commit>.json).")
+    return parser.parse_args(argv)
+
+def main(argv=None) -> Dict[str, Any]:
+    args = parse_args(argv)
+    if args.metrics:
+        # Spawned store processes read the switch from the environment at import
+        os.environ["METRICS_ENABLED"] = "1"
+        METRICS.enable()
+    env = environment()
+    results: Dict[str, Any] = {"environment": env, "config": vars(args).copy(), "stores": {}}
+
+    print(f"Text processing ({args.text_mb} MB)...")
+    results["text"] = bench_text(args.text_mb, args.seed)
+    print(f"LLM paths on the fake backend ({args.llm_chunks} chunks)...")
+    results["llm"] = bench_llm(args.llm_chunks, args.dim, args.questions, args.seed)
+    print(f"Local embedding backends ({args.llm_chunks} chunks)...")
+    results["embedders"] = bench_embedders(args.llm_chunks, args.dim, args.queries, args.seed)
+    if args.metrics:
+        results["metrics"] = METRICS.snapshot()
+
+    for n in args.sizes:
+        print(f"Vector store with {n:,} chunks...")
+        call_args = (n, args.dim, args.queries, args.top_k, args.ivf, args.seed)
+        results["stores"][str(n)] = bench_store(*call_args) if args.in_process else run_isolated(bench_store, *call_args)
+        search = results["stores"][str(n)]["search"]
+        print(f"  search p50 {search['p50_ms']:.2f} ms, p99 {search['p99_ms']:.2f} ms")
+
+    out = args.out or os.path.join(RESULTS_DIR, f"{env['timestamp'].replace(':', '')}_{env['commit'] or 'nogit'}.json")
+    if os.path.dirname(out):
+        os.makedirs(os.path.dirname(out), exist_ok=True)
+    with open(out, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=2)
+    print(f"Results written to {out}")
+    return results
+
+if __name__ == "__main__":
+    main()
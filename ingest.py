@@ -0,0 +1,155 @@
+import os
+import sys
+import argparse
+from typing import List, Optional
+from dotenv import load_dotenv
+from modules.document_processor import DocumentProcessor
+from modules.vector_store import VectorStore, MANIFEST_FILE
+from modules.llm_interface import LLMInterface
+from modules.embedding_cache import EmbeddingCache
+from modules.ingest_pipeline import IngestPipeline, SUPPORTED_EXTENSIONS
+from modules.embedding_backend import (
+    EmbeddingBackend, HashingEmbedder, TfidfSvdEmbedder, EMBEDDER_FILE, backend_for
+)
+
+DEFAULT_STORE_DIR = "data/store"
+DEFAULT_CACHE_PATH = "data/embedding_cache.sqlite"
+# --embedder choice -> prefix of the backend names it records in the store
+BACKEND_PREFIXES = {"openai": "openai:", "hashing": "hashing:", "tfidf": "tfidf-svd:"}
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Index a directory tree of PDF/TXT files into a persisted vector store."
+    )
+    parser.add_argument("directory", help="Root directory to ingest (searched recursively).")
+    parser.add_argument("--store", default=DEFAULT_STORE_DIR, help="Store directory (created or resumed).")
+    parser.add_argument("--cache", default=DEFAULT_CACHE_PATH, help="Embedding cache file.")
+    parser.add_argument("--extract-workers", type=int, default=2, help="Threads hashing files and checking the checkpoint.")
+    parser.add_argument("--chunk-workers", type=int, default=2, help="Threads reading, cleaning and chunking files.")
+    parser.add_argument("--dedup-workers", type=int, default=1, help="Threads looking up near-duplicate chunks.")
+    parser.add_argument("--embed-workers", type=int, default=4, help="Concurrent embedding requests.")
+    parser.add_argument("--queue-size", type=int, default=8, help="Max files waiting between two stages.")
+    parser.add_argument("--checkpoint-every", type=int, default=50, help="Save after this many stored files.")
+    parser.add_argument("--chunk-size", type=int, default=800, help="Characters per chunk.")
+    parser.add_argument("--overlap", type=int, default=120, help="Overlapping characters between chunks.")
+    parser.add_argument("--near-dup-threshold", type=float, default=0.9,
+                        help="Similarity above which a chunk is stored as a reference to an existing one.")
+    parser.add_argument("--no-dedup", action="store_true", help="Embed and store every chunk, even near-duplicates.")
+    parser.add_argument("--embedder", choices=tuple(BACKEND_PREFIXES),
+                        help="Embedding backend (default: the one the store was built with, else openai). "
+                             "hashing/tfidf run locally on the CPU and need no API key.")
+    parser.add_argument("--embed-dim", type=int, help="Vector dimension of a new local backend (hashing 1024, tfidf 256).")
+    parser.add_argument("--fit-chunks", type=int, default=20000, help="Chunks sampled to fit a new tfidf backend.")
+    return parser.parse_args(argv)
+
+def sample_chunks(root: str, processor: DocumentProcessor, limit: int, chunk_size: int, overlap: int) -> List[str]:
+    """
+    Up to `limit` chunk texts spread over the files under `root`, to fit a local embedder on.
+    """
+    paths = sorted(
+        os.path.join(dirpath, name)
+        for dirpath, _, filenames in os.walk(root)
+        for name in filenames if name.lower().endswith(SUPPORTED_EXTENSIONS)
+    )
+    per_file = max(1, -(-limit // max(len(paths), 1)))
+    texts: List[str] = []
+    for path in paths:
+        if len(texts) >= limit:
+            break
+        try:
+            chunks = processor.iter_chunks(processor.iter_pages(path), chunk_size, overlap)
+            texts.extend(chunk.text for chunk, _ in zip(chunks, range(per_file)))
+        except Exception as e:
+            print(f"  sample skipped: {path}: {e}")
+    return texts[:limit]
+
+def load_embedder(args: argparse.Namespace, store: VectorStore) -> Optional[EmbeddingBackend]:
+    """
+    The local backend to embed with (None = OpenAI): the one the store was built with, or a
+    new one per --embedder. A new tfidf backend is fitted on the directory and saved to the store.
+    """
+    recorded = store.embedding_backend if store.num_rows else None
+    kind = args.embedder or next(
+        (k for k, prefix in BACKEND_PREFIXES.items() if recorded and recorded.startswith(prefix)), "openai"
+    )
+    if recorded and not recorded.startswith(BACKEND_PREFIXES[kind]):
+        raise ValueError(f"The store was built with {recorded}; re-ingest into a new --store to use {kind}.")
+
+    if kind == "openai":
+        return None
+    if recorded:
+        return backend_for(recorded, args.store)
+    if kind == "hashing":
+        return HashingEmbedder(dim=args.embed_dim or 1024)
+
+    processor = DocumentProcessor()
+    texts = sample_chunks(args.directory, processor, args.fit_chunks, args.chunk_size, args.overlap)
+    print(f"Fitting tfidf embedder on {len(texts)} chunks...")
+    embedder = TfidfSvdEmbedder(dim=args.embed_dim or 256).fit(texts)
+    os.makedirs(args.store, exist_ok=True)
+    embedder.save(os.path.join(args.store, EMBEDDER_FILE))
+    return embedder
+
+def main(argv=None) -> int:
+    load_dotenv()
+    args = parse_args(argv)
+
+    if not os.path.isdir(args.directory):
+        print(f"Not a directory: {args.directory}")
+        return 2
+
+    # 1. Resume into the existing store, if any
+    store = VectorStore(near_dup_threshold=None if args.no_dedup else args.near_dup_threshold)
+    if os.path.exists(os.path.join(args.store, MANIFEST_FILE)):
+        store.load(args.store)
+        print(f"Loaded store from {args.store} ({store.num_live} chunks).")
+
+    # 2. Pick the embedding backend: local ones need no API key
+    try:
+        embedder = load_embedder(args, store)
+    except ValueError as e:
+        print(e)
+        return 2
+    if embedder is not None:
+        embed_fn = lambda texts: embedder.encode(texts).tolist()
+        backend_name = embedder.name
+    else:
+        api_key = os.getenv("OPENAI_API_KEY")
+        if not api_key:
+            print("OPENAI_API_KEY is not set (environment or .env).")
+            return 2
+        llm = LLMInterface(api_key=api_key, embedding_cache=EmbeddingCache(args.cache))
+        embed_fn = llm.embed_texts
+        backend_name = llm.embedding_backend
+    print(f"Embedding backend: {backend_name}")
+
+    # 3. Run the pipeline
+    pipeline = IngestPipeline(
+        store=store,
+        store_dir=args.store,
+        embed_fn=embed_fn,
+        processor=DocumentProcessor(),
+        extract_workers=args.extract_workers,
+        chunk_workers=args.chunk_workers,
+        dedup_workers=args.dedup_workers,
+        embed_workers=args.embed_workers,
+        queue_size=args.queue_size,
+        checkpoint_every=args.checkpoint_every,
+        chunk_size=args.chunk_size,
+        overlap=args.overlap,
+        embedding_backend=backend_name
+    )
+    stats = pipeline.run(args.directory)
+
+    # 4. Report
+    print(
+        f"Done in {stats['seconds']:.1f}s: {stats['stored']} files stored ({stats['chunks']} chunks: "
+        f"{stats['embedded_chunks']} embedded, {stats['reused_chunks']} reused, "
+        f"{stats['duplicate_chunks']} near-duplicates), {stats['skipped']} skipped, {len(stats['failed'])} failed."
+    )
+    for rel_path, error in stats["failed"].items():
+        print(f"  failed: {rel_path}: {error}")
+    return 1 if stats["failed"] else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
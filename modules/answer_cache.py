@@ -0,0 +1,165 @@
+import time
+import threading
+import numpy as np
+from collections import OrderedDict
+from typing import List, Dict, Any, Optional, Tuple
+
+def context_key(contexts: List[Dict[str, Any]]) -> Tuple[Tuple[str, int], ...]:
+    """
+    Identity of a retrieved context set: its (doc_id, chunk_index) ids, in rank order.
+    """
+    return tuple((c.get("doc_id"), c.get("chunk_index")) for c in contexts)
+
+
+class AnswerCache:
+    def __init__(self, threshold: float = 0.95, ttl_seconds: float = 3600.0, max_entries: int = 512):
+        """
+        Semantic answer cache: a new question reuses a previous answer when the two
+        question embeddings are within `threshold` cosine similarity AND retrieval
+        returned the same context set for both. Everything is dropped when the
+        VectorStore's version changes.
+
+        Args:
+            threshold (float): Minimum cosine similarity between question embeddings.
+            ttl_seconds (float): Entries older than this are never served.
+            max_entries (int): Size bound; least recently used entries are evicted first.
+        """
+        self.threshold = threshold
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+
+        self._entries: "OrderedDict[int, Dict[str, Any]]" = OrderedDict()
+        self._next_id = 0
+        self._store_version: Optional[int] = None
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(
+        self,
+        query_embedding: List[float],
+        contexts: List[Dict[str, Any]],
+        language: str,
+        store_version: int
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Looks up a cached answer for a question.
+
+        Args:
+            query_embedding (List[float]): Embedding of the new question.
+            contexts (List[Dict]): Contexts retrieved for the new question.
+            language (str): Answer language.
+            store_version (int): VectorStore.version the contexts were retrieved from.
+
+        Returns:
+            Dict or None: {'answer', 'citations', 'question', 'similarity'} on a hit.
+        """
+        key = context_key(contexts)
+        q = self._unit(query_embedding)
+
+        with self._lock:
+            if not self._sync(store_version):
+                self.misses += 1
+                return None
+            self._expire()
+
+            best_id, best_sim = None, self.threshold
+            for entry_id, entry in self._entries.items():
+                if entry["language"] != language or entry["context_key"] != key:
+                    continue
+                sim = float(entry["embedding"] @ q)
+                if sim >= best_sim:
+                    best_id, best_sim = entry_id, sim
+
+            if best_id is None:
+                self.misses += 1
+                return None
+
+            self.hits += 1
+            self._entries.move_to_end(best_id)
+            entry = self._entries[best_id]
+            return {
+                "answer": entry["answer"],
+                "citations": entry["citations"],
+                "question": entry["question"],
+                "similarity": best_sim
+            }
+
+    def put(
+        self,
+        question: str,
+        query_embedding: List[float],
+        contexts: List[Dict[str, Any]],
+        language: str,
+        store_version: int,
+        answer: str,
+        citations: List[Dict[str, Any]]
+    ) -> None:
+        """
+        Caches a generated answer for a question and the context set it was grounded on.
+        """
+        with self._lock:
+            if not self._sync(store_version):
+                return
+            self._entries[self._next_id] = {
+                "question": question,
+                "embedding": self._unit(query_embedding),
+                "context_key": context_key(contexts),
+                "language": language,
+                "answer": answer,
+                "citations": citations,
+                "created_at": time.time()
+            }
+            self._next_id += 1
+
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Hit/miss counters plus eviction and invalidation counts.
+        """
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": len(self._entries),
+            "evictions": self.evictions,
+            "invalidations": self.invalidations
+        }
+
+    def _sync(self, store_version: int) -> bool:
+        """
+        Drops every entry once the store has changed (documents added, replaced or removed).
+        Versions only grow: an older one comes from a session still reading an earlier
+        snapshot of a shared store, and is neither served nor cached (returns False).
+        """
+        if self._store_version is not None and store_version < self._store_version:
+            return False
+        if self._store_version is not None and store_version != self._store_version and self._entries:
+            self._entries.clear()
+            self.invalidations += 1
+        self._store_version = store_version
+        return True
+
+    def _expire(self) -> None:
+        cutoff = time.time() - self.ttl_seconds
+        # Insertion order == creation order only until entries are touched, so check all
+        for entry_id in [i for i, e in self._entries.items() if e["created_at"] < cutoff]:
+            del self._entries[entry_id]
+            self.evictions += 1
+
+    @staticmethod
+    def _unit(vector: List[float]) -> np.ndarray:
+        vec = np.asarray(vector, dtype='float32')
+        norm = np.linalg.norm(vec)
+        return vec / norm if norm > 0 else vec
@@ -0,0 +1,192 @@
+from typing import List, Dict, Any, Optional, Callable, Tuple
+
+# Prompt cost of one "--- SOURCE i (filename) ---" header, in tokens
+SOURCE_HEADER_TOKENS = 12
+
+
+class ContextPacker:
+    def __init__(self, token_budget: int = 3000, count_tokens: Optional[Callable[[str], int]] = None):
+        """
+        Turns retrieved chunks into the sources of an answer prompt. Chunks of the same document
+        that overlap or touch (by character offsets, or consecutive chunk_index for chunks stored
+        without provenance) are merged into one span and the overlap is sent once; text repeated
+        verbatim is dropped. Chunks are admitted best score first while the new text they add
+        fits in `token_budget`, so prompt size no longer grows with top_k.
+
+        Args:
+            token_budget (int): Max prompt tokens spent on sources (the best chunk is always kept).
+            count_tokens (Callable, optional): Token counter (e.g. EmbeddingBatcher.count_tokens);
+                defaults to a ~3 characters per token estimate.
+        """
+        self.token_budget = token_budget
+        self.count_tokens = count_tokens or (lambda text: len(text) // 3 + 1)
+
+    def pack(self, contexts: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Selects and merges contexts into spans, best span first.
+
+        Args:
+            contexts (List[Dict]): Search results (need 'chunk_text', 'doc_id'; 'score', 'chunk_index'
+                and offsets are used when present).
+
+        Returns:
+            List[Dict]: Spans. A span of one chunk is that chunk's dict, unchanged. A merged span
+                copies its first chunk's fields with the merged 'chunk_text', the best 'score',
+                'chunk_indices' and the original chunks under 'chunks' (citations map back to them).
+        """
+        # 1. Best first; a stable sort keeps retrieval order for ties and missing scores
+        ranked = sorted(range(len(contexts)), key=lambda i: -contexts[i].get("score", 0.0))
+
+        # 2. Admit chunks while the text they add (plus a header if they start a span) fits
+        selected: List[int] = []
+        covered: Dict[str, List[Tuple[int, int]]] = {}
+        seen_texts = set()
+        used = 0
+        for i in ranked:
+            ctx = contexts[i]
+            text_key = " ".join(ctx.get("chunk_text", "").split())
+            if text_key in seen_texts:
+                continue
+            cost = self._added_tokens(ctx, covered, [contexts[j] for j in selected])
+            if selected and used + cost > self.token_budget:
+                continue
+            selected.append(i)
+            seen_texts.add(text_key)
+            used += cost
+            if self._offsets(ctx):
+                covered.setdefault(ctx.get("doc_id"), []).append(self._offsets(ctx))
+
+        # 3. Merge per document, then order spans by their best chunk's rank
+        rank_of = {i: r for r, i in enumerate(ranked)}
+        by_doc: Dict[Any, List[int]] = {}
+        for i in selected:
+            by_doc.setdefault(contexts[i].get("doc_id"), []).append(i)
+
+        spans = []
+        for members in by_doc.values():
+            for group in self._merge_groups([contexts[i] for i in members], members):
+                spans.append((min(rank_of[i] for i in group), self._span([contexts[i] for i in group])))
+        spans.sort(key=lambda pair: pair[0])
+        return [span for _, span in spans]
+
+    def _added_tokens(
+        self,
+        ctx: Dict[str, Any],
+        covered: Dict[str, List[Tuple[int, int]]],
+        selected: List[Dict[str, Any]]
+    ) -> int:
+        """
+        Tokens `ctx` adds to the prompt given what is already selected.
+        """
+        text = ctx.get("chunk_text", "")
+        offsets = self._offsets(ctx)
+        if offsets is None:
+            # Without offsets the overlap can't be located up front: count the whole chunk
+            joins = any(self._consecutive(ctx, other) for other in selected)
+            return self.count_tokens(text) + (0 if joins else SOURCE_HEADER_TOKENS)
+
+        start, end = offsets
+        intervals = sorted(covered.get(ctx.get("doc_id"), []))
+        joins = any(s <= end and start <= e for s, e in intervals)
+        # Pieces of [start, end) no selected chunk covers yet
+        pieces, pos = [], start
+        for s, e in intervals:
+            if e <= pos or s >= end:
+                continue
+            if s > pos:
+                pieces.append(text[pos - start:s - start])
+            pos = max(pos, e)
+        if pos < end:
+            pieces.append(text[pos - start:])
+        tokens = sum(self.count_tokens(piece) for piece in pieces if piece)
+        return tokens + (0 if joins else SOURCE_HEADER_TOKENS)
+
+    def _merge_groups(self, chunks: List[Dict[str, Any]], ids: List[int]) -> List[List[int]]:
+        """
+        Splits one document's selected chunks into runs that overlap or touch.
+        """
+        if all(self._offsets(c) for c in chunks):
+            interval = self._offsets
+        elif all(isinstance(c.get("chunk_index"), int) for c in chunks):
+            # Consecutive chunks overlap by construction (chunk_text's sliding window)
+            interval = lambda c: (c["chunk_index"], c["chunk_index"] + 1)
+        else:
+            return [[i] for i in ids]
+
+        groups: List[List[int]] = []
+        prev_end = None
+        for chunk, i in sorted(zip(chunks, ids), key=lambda pair: interval(pair[0])):
+            start, end = interval(chunk)
+            if groups and start <= prev_end:
+                groups[-1].append(i)
+                prev_end = max(prev_end, end)
+            else:
+                groups.append([i])
+                prev_end = end
+        return groups
+
+    def _span(self, chunks: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        One prompt source from a run of chunks (given in document order).
+        """
+        if len(chunks) == 1:
+            return chunks[0]
+
+        # 1. Text: append only what each chunk adds past the current end
+        text = chunks[0].get("chunk_text", "")
+        offsets = [self._offsets(c) for c in chunks]
+        if all(offsets):
+            end = offsets[0][1]
+            for chunk, (start, chunk_end) in zip(chunks[1:], offsets[1:]):
+                if chunk_end > end:
+                    text += chunk["chunk_text"][end - start:]
+                    end = chunk_end
+        else:
+            for chunk in chunks[1:]:
+                text = self._join_overlapping(text, chunk.get("chunk_text", ""))
+
+        # 2. Fields: the first chunk's, widened to the whole run
+        span = {k: v for k, v in chunks[0].items() if k not in ("global_index", "sources")}
+        span["chunk_text"] = text
+        span["score"] = max(c.get("score", 0.0) for c in chunks)
+        span["chunk_indices"] = [c.get("chunk_index") for c in chunks]
+        span["chunks"] = chunks
+        if all(offsets):
+            span["end_offset"] = max(e for _, e in offsets)
+        page_ends = [c["page_end"] for c in chunks if c.get("page_end") is not None]
+        if page_ends:
+            span["page_end"] = max(page_ends)
+
+        # 3. Other documents any of the merged chunks also appears in (near-duplicates)
+        also_in = {}
+        for chunk in chunks:
+            for src in chunk.get("sources", [])[1:]:
+                also_in.setdefault((src.get("doc_id"), src.get("chunk_index")), src)
+        if also_in:
+            span["sources"] = [{"doc_id": span.get("doc_id"), "filename": span.get("filename")}] + list(also_in.values())
+        return span
+
+    @staticmethod
+    def _offsets(ctx: Dict[str, Any]) -> Optional[Tuple[int, int]]:
+        """
+        (start, end) character offsets of a chunk, if stored and consistent with its text.
+        """
+        start, end = ctx.get("start_offset"), ctx.get("end_offset")
+        if start is None or end is None or end - start != len(ctx.get("chunk_text", "")):
+            return None
+        return start, end
+
+    @staticmethod
+    def _consecutive(a: Dict[str, Any], b: Dict[str, Any]) -> bool:
+        ia, ib = a.get("chunk_index"), b.get("chunk_index")
+        return a.get("doc_id") == b.get("doc_id") and isinstance(ia, int) and isinstance(ib, int) and abs(ia - ib) <= 1
+
+    @staticmethod
+    def _join_overlapping(left: str, right: str) -> str:
+        """
+        left + right with the longest suffix of `left` that starts `right` written once.
+        """
+        for k in range(min(len(left), len(right)), 0, -1):
+            if left.endswith(right[:k]):
+                return left + right[k:]
+        return left + right
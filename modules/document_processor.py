@@ -1,9 +1,13 @@
 import os
 import re
-import uuid
+import codecs
+import hashlib
+from concurrent.futures import ProcessPoolExecutor
+from itertools import groupby
 from dataclasses import dataclass
 from pypdf import PdfReader
-from typing import List
+from typing import List, Dict, Iterable, Iterator, Optional, Tuple, Callable
+from modules.metrics import timed
 
 @dataclass
 class Document:
@@ -14,19 +18,90 @@ class Document:
     filename: str
     text: str
 
+@dataclass
+class Chunk:
+    """
+    A piece of a document's cleaned text with its source location.
+    `start`/`end` are character offsets into Document.text (text == doc.text[start:end]).
+    """
+    index: int
+    text: str
+    start: int
+    end: int
+    page_start: int
+    page_end: int
+
+    def provenance(self) -> Dict[str, int]:
+        """
+        Location fields in the shape VectorStore.add_document(provenance=...) expects.
+        """
+        return {
+            "page_start": self.page_start,
+            "page_end": self.page_end,
+            "start_offset": self.start,
+            "end_offset": self.end
+        }
+
+# Whitespace patterns for DocumentProcessor.clean_text
+_HORIZONTAL_WS = re.compile(r'[ \t]+')
+_PARAGRAPH_BREAK = re.compile(r'\n\s*\n')
+
+# Streaming TXT reads
+TXT_BLOCK_SIZE = 1 << 20
+ENCODING_SAMPLE_SIZE = 1 << 16
+
+# Upper bound on characters per token, used to size the look-ahead window for token-based chunks
+MAX_CHARS_PER_TOKEN = 8
+
+def _open_pdf(file_path: str) -> PdfReader:
+    reader = PdfReader(file_path)
+    if reader.is_encrypted:
+        try:
+            # Try empty password
+            reader.decrypt("")
+        except:
+             raise ValueError("PDF is encrypted and cannot be read.")
+    return reader
+
+def _extract_page_range(file_path: str, start: int, end: int) -> List[Tuple[int, str]]:
+    """
+    Process-pool worker: opens its own PdfReader and extracts pages [start, end).
+
+    Returns:
+        List[Tuple[int, str]]: (1-based page number, page text) pairs.
+    """
+    reader = _open_pdf(file_path)
+    return [(i + 1, reader.pages[i].extract_text() or "") for i in range(start, end)]
+
+
 class DocumentProcessor:
-    def __init__(self):
+    def __init__(self, max_workers: Optional[int] = None, pages_per_shard: int = 32, parallel_min_pages: int = 64):
         """
         Initialize the DocumentProcessor.
+
+        Args:
+            max_workers (int, optional): Processes used for PDF extraction (default: CPU count).
+            pages_per_shard (int): Pages extracted per worker task.
+            parallel_min_pages (int): Smaller PDFs are extracted in-process (pool start-up isn't worth it).
         """
-        pass
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.pages_per_shard = pages_per_shard
+        self.parallel_min_pages = parallel_min_pages
 
-    def build_document(self, file_path: str) -> Document:
+    def build_document(
+        self,
+        file_path: str,
+        pages: Optional[Iterable[Tuple[int, str]]] = None,
+        content_hash: Optional[str] = None
+    ) -> Document:
         """
         Processes a file (extracts & cleans) and returns a Document object.
+        The doc_id is the file's content hash, so the same bytes always get the same id.
         
         Args:
             file_path (str): Absolute path to the file.
+            pages (Iterable, optional): Already extracted (page_number, text) pairs, to avoid reading twice.
+            content_hash (str, optional): Already computed file_hash(), to avoid hashing twice.
             
         Returns:
             Document: A dataclass containing metadata and processed text.
@@ -36,19 +111,51 @@ class DocumentProcessor:
 
         filename = os.path.basename(file_path)
         
-        # Extract and clean text
-        raw_text = self.extract_text(file_path)
-        cleaned_text = self.clean_text(raw_text)
-        
-        # Create a unique ID for this document instance
-        doc_id = str(uuid.uuid4())
+        # Extract and clean text page by page (the same text iter_chunks() offsets refer to)
+        if pages is None:
+            pages = self.iter_pages(file_path)
+        cleaned_text = self._join_pages(self._iter_clean_pages(pages))
         
         return Document(
-            doc_id=doc_id,
+            doc_id=content_hash or self.file_hash(file_path),
             filename=filename,
             text=cleaned_text
         )
 
+    @staticmethod
+    @timed("processor_hash")
+    def file_hash(file_path: str, block_size: int = TXT_BLOCK_SIZE) -> str:
+        """
+        Content hash (sha256 hex) of a file's raw bytes, read in blocks.
+        """
+        digest = hashlib.sha256()
+        with open(file_path, 'rb') as f:
+            for block in iter(lambda: f.read(block_size), b''):
+                digest.update(block)
+        return digest.hexdigest()
+
+    @timed("processor_extract")
+    def iter_pages(self, file_path: str) -> Iterator[Tuple[int, str]]:
+        """
+        Yields raw (page_number, text) pairs: PDF pages, or the blocks of a TXT file
+        (all page 1; consecutive pieces of one page are continuous text).
+        """
+        _, ext = os.path.splitext(file_path)
+        ext = ext.lower()
+        if ext not in ('.pdf', '.txt'):
+            raise ValueError(f"Unsupported file type: {ext}. Only .pdf and .txt are supported.")
+
+        try:
+            if ext == '.pdf':
+                yield from self.iter_pdf_pages(file_path)
+            else:
+                # A TXT file is one page, streamed in blocks
+                for block in self.iter_txt_blocks(file_path):
+                    yield (1, block)
+        except Exception as e:
+            raise ValueError(f"Error extracting text from {os.path.basename(file_path)}: {str(e)}")
+
+    @timed("processor_extract")
     def extract_text(self, file_path: str) -> str:
         """
         Determines file type and extracts text accordingly.
@@ -73,33 +180,67 @@ class DocumentProcessor:
             # Re-raise nicely formatted errors
             raise ValueError(f"Error extracting text from {os.path.basename(file_path)}: {str(e)}")
 
+    @timed("processor_clean")
     def clean_text(self, text: str) -> str:
         """
         Minimal text cleaning: normalize whitespace and newlines.
         
-        Steps:
+        Steps (applied block by block for streamed text, see _clean_blocks()):
         1. Replace multiple spaces/tabs with single space.
         2. Normalize line breaks: replace 3+ newlines with 2 (paragraph break).
         3. Strip leading/trailing whitespace.
         """
         if not text:
             return ""
-            
+        return "".join(self._clean_blocks([text]))
+
+    def _clean_blocks(self, blocks: Iterable[str]) -> Iterator[str]:
+        """
+        Streaming clean_text(): cleans consecutive blocks of one text, yielding cleaned
+        pieces whose concatenation equals clean_text() of the whole. Memory is bounded by
+        the block size. A whitespace run at the end of a block is held back until the next
+        block, so runs that cross block boundaries (including a CRLF split between blocks)
+        are cleaned as one.
+        """
+        carry = ""
+        started = False
+        for block in blocks:
+            text = carry + block
+            cut = len(text)
+            while cut and text[cut - 1].isspace():
+                cut -= 1
+            carry = text[cut:]
+            # Keep a long blank stretch from growing the carry (cleaning a run is idempotent)
+            if len(carry) > 4096 and not carry.endswith('\r'):
+                carry = self._clean_span(carry)
+
+            out = self._clean_span(text[:cut])
+            if not started:
+                out = out.lstrip()
+            if out:
+                started = True
+                yield out
+        # Trailing whitespace (the final carry) is dropped
+
+    @staticmethod
+    def _clean_span(text: str) -> str:
+        """
+        Steps 1-2 of clean_text() on a span that doesn't split a whitespace run.
+        """
         # Pattern: [ \t]+ -> " " (Collapse horizontal whitespace)
-        text = re.sub(r'[ \t]+', ' ', text)
-        
+        text = _HORIZONTAL_WS.sub(' ', text)
+
         # Basic normalization of varied newline chars
-        text = text.replace('\r\n', '\n').replace('\r', '\n')
-        
+        if '\r' in text:
+            text = text.replace('\r\n', '\n').replace('\r', '\n')
+
         # Replace 3+ empty lines with 2 newlines (preserve paragraphs clearly)
-        text = re.sub(r'\n\s*\n', '\n\n', text)
-        
-        return text.strip()
+        return _PARAGRAPH_BREAK.sub('\n\n', text)
 
     def chunk_text(self, text: str, chunk_size: int = 800, overlap: int = 120) -> List[str]:
         """
         Splits text into chunks of `chunk_size` characters with `overlap`.
-        Simple sliding window approach.
+        Simple sliding window approach (see iter_chunks() for the streaming version).
         
         Args:
             text (str): The cleaned text.
@@ -111,57 +252,193 @@ class DocumentProcessor:
         """
         if not text:
             return []
-            
-        chunks = []
-        start = 0
-        text_len = len(text)
-        
-        while start < text_len:
-            end = min(start + chunk_size, text_len)
-            
-            # Simple cut
-            chunk = text[start:end]
-            
-            # Optional: Try not to cut words in half if possible (minor improvement)
-            # If we are not at end of text, try to pull back to the last space
-            if end < text_len:
-                last_space = chunk.rfind(' ')
-                if last_space != -1 and len(chunk) - last_space < 50: 
-                    # Only pull back if we don't lose too much characters (e.g. < 50 chars)
-                    end = start + last_space + 1
-                    chunk = text[start:end]
-
-            chunks.append(chunk.strip())
-            
-            # If we reached the end, break
-            if end >= text_len:
-                break
-                
-            # Move start forward, subtracting overlap
-            # Ensure we always move forward at least 1 char to avoid infinite loop
-            step = max(1, len(chunk) - overlap)
-            start += step
-            
-        return chunks
+        return [chunk.text for chunk in self._chunk_pages(iter([(1, text)]), chunk_size, overlap)]
+
+    def iter_chunks(
+        self,
+        pages: Iterable[Tuple[int, str]],
+        chunk_size: int = 800,
+        overlap: int = 120,
+        count_tokens: Optional[Callable[[str], int]] = None
+    ) -> Iterator[Chunk]:
+        """
+        Streaming chunker: cleans and chunks a (page_number, text) stream as it arrives
+        (e.g. iter_pages()), holding at most one page plus one chunk window in memory.
+
+        Args:
+            pages (Iterable): Raw (page_number, text) pairs in page order.
+            chunk_size (int): Max chunk length, in characters (or tokens with `count_tokens`).
+            overlap (int): Overlap between consecutive chunks, same unit as `chunk_size`.
+            count_tokens (Callable, optional): Token counter (e.g. EmbeddingBatcher.count_tokens)
+                to size chunks by tokens instead of characters.
+
+        Returns:
+            Iterator[Chunk]: Chunks with offsets into the document text and page numbers.
+        """
+        return self._chunk_pages(self._iter_clean_pages(pages), chunk_size, overlap, count_tokens)
+
+    @staticmethod
+    def join_chunks(chunks: Iterable[Chunk]) -> str:
+        """
+        The document text a run of consecutive chunks covers, overlaps written once
+        (doc.text[first.start:last.end]; whitespace between chunks that don't touch becomes a space).
+        """
+        parts = []
+        end = None
+        for chunk in chunks:
+            if end is None or chunk.start >= end:
+                if end is not None and chunk.start > end:
+                    parts.append(" ")
+                parts.append(chunk.text)
+                end = chunk.end
+            elif chunk.end > end:
+                parts.append(chunk.text[end - chunk.start:])
+                end = chunk.end
+        return "".join(parts)
+
+    def _iter_clean_pages(self, pages: Iterable[Tuple[int, str]]) -> Iterator[Tuple[int, str]]:
+        """
+        Cleans page text, dropping pages without text. Consecutive items with the same
+        page number are pieces of one page (e.g. blocks of a TXT file) and are cleaned
+        as one text, piece by piece. Yields (page_number, cleaned piece); document text
+        is the cleaned pages joined by newlines (pieces of a page are not separated).
+        """
+        for page_number, pieces in groupby(pages, key=lambda page: page[0]):
+            for cleaned in self._clean_blocks(text for _, text in pieces):
+                yield page_number, cleaned
+
+    @staticmethod
+    def _join_pages(clean_pages: Iterable[Tuple[int, str]]) -> str:
+        parts = []
+        previous = None
+        for page_number, text in clean_pages:
+            if parts and page_number != previous:
+                parts.append("\n")
+            parts.append(text)
+            previous = page_number
+        return "".join(parts)
+
+    @timed("processor_chunk")
+    def _chunk_pages(
+        self,
+        pages: Iterator[Tuple[int, str]],
+        chunk_size: int,
+        overlap: int,
+        count_tokens: Optional[Callable[[str], int]] = None
+    ) -> Iterator[Chunk]:
+        """
+        Sliding window over cleaned pages. `window` holds document text from `window_start` on;
+        text before the next chunk's start is dropped as soon as that chunk is emitted.
+        """
+        max_chars = chunk_size if count_tokens is None else chunk_size * MAX_CHARS_PER_TOKEN
+        window, window_start = "", 0
+        total = 0                                  # document characters read so far
+        page_marks: List[Tuple[int, int]] = []     # (offset where a page starts, page number)
+        exhausted = False
+        start, index = 0, 0
+
+        def page_at(offset: int) -> int:
+            page = page_marks[0][1]
+            for mark, number in page_marks:
+                if mark > offset:
+                    break
+                page = number
+            return page
+
+        while True:
+            # 1. Read pages until the window covers a full chunk past `start` (or the text ends)
+            while not exhausted and total <= start + max_chars:
+                page = next(pages, None)
+                if page is None:
+                    exhausted = True
+                    break
+                if not page_marks or page[0] != page_marks[-1][1]:
+                    # A new page: separated by a newline and marked (continued pages are not)
+                    if total:
+                        window += "\n"
+                        total += 1
+                    page_marks.append((total, page[0]))
+                window += page[1]
+                total += len(page[1])
+
+            if start >= total:
+                return
+
+            # 2. Find the chunk end (offsets only; the text is sliced once below)
+            end = min(start + max_chars, total)
+            if count_tokens is not None:
+                # Largest end whose text fits in chunk_size tokens
+                lo, hi = start + 1, end
+                while lo < hi:
+                    mid = (lo + hi + 1) // 2
+                    if count_tokens(window[start - window_start:mid - window_start]) <= chunk_size:
+                        lo = mid
+                    else:
+                        hi = mid - 1
+                end = lo
+
+            # Try not to cut words in half: pull back to the last space if it costs < 50 characters
+            if end < total:
+                last_space = window.rfind(' ', start - window_start, end - window_start)
+                if last_space != -1 and end - (last_space + window_start) < 50:
+                    end = window_start + last_space + 1
+
+            # 3. Emit the stripped chunk with its exact offsets
+            raw = window[start - window_start:end - window_start]
+            text = raw.strip()
+            if text:
+                chunk_start = start + len(raw) - len(raw.lstrip())
+                chunk_end = chunk_start + len(text)
+                yield Chunk(index, text, chunk_start, chunk_end, page_at(chunk_start), page_at(chunk_end - 1))
+                index += 1
+
+            if end >= total and exhausted:
+                return
+
+            # 4. Advance (overlap is scaled to characters for token-sized chunks)
+            overlap_chars = overlap if count_tokens is None else (end - start) * overlap // chunk_size
+            start += max(1, (end - start) - overlap_chars)
+
+            # 5. Drop consumed text once it is most of the window (amortized: pieces can be
+            #    much larger than a chunk, so trimming after every chunk would copy them repeatedly)
+            if start - window_start > len(window) // 2:
+                window = window[start - window_start:]
+                window_start = start
+            while len(page_marks) > 1 and page_marks[1][0] <= start:
+                page_marks.pop(0)
+
+    def iter_pdf_pages(self, file_path: str) -> Iterator[Tuple[int, str]]:
+        """
+        Yields (page_number, text) for every page of a PDF, in page order (1-based,
+        empty text for pages without a text layer). Large PDFs are split into page-range
+        shards extracted in parallel worker processes; pages are yielded as soon as
+        their shard (and all earlier ones) are done, so consumers can start early.
+
+        Args:
+            file_path (str): Path to the PDF.
+        """
+        num_pages = len(_open_pdf(file_path).pages)
+
+        if self.max_workers <= 1 or num_pages < self.parallel_min_pages:
+            yield from _extract_page_range(file_path, 0, num_pages)
+            return
+
+        shards = [(s, min(s + self.pages_per_shard, num_pages)) for s in range(0, num_pages, self.pages_per_shard)]
+        pool = ProcessPoolExecutor(max_workers=min(self.max_workers, len(shards)))
+        try:
+            futures = [pool.submit(_extract_page_range, file_path, start, end) for start, end in shards]
+            for future in futures:
+                yield from future.result()
+        finally:
+            # A consumer that stops early doesn't wait for the remaining shards: queued ones are
+            # cancelled and running ones finish in the background
+            pool.shutdown(wait=False, cancel_futures=True)
 
     def _extract_pdf_text(self, file_path: str) -> str:
         """
         Helper to safely extract text from PDF using pypdf.
         """
-        text_content = []
-        reader = PdfReader(file_path)
-        
-        if reader.is_encrypted:
-            try:
-                # Try empty password
-                reader.decrypt("")
-            except:
-                 raise ValueError("PDF is encrypted and cannot be read.")
-
-        for i, page in enumerate(reader.pages):
-            page_text = page.extract_text()
-            if page_text:
-                text_content.append(page_text)
+        text_content = [page_text for _, page_text in self.iter_pdf_pages(file_path) if page_text]
         
         full_text = "\n".join(text_content)
         
@@ -171,15 +448,46 @@ class DocumentProcessor:
 
         return full_text
 
-    def _extract_txt_text(self, file_path: str) -> str:
+    def iter_txt_blocks(self, file_path: str, block_size: int = TXT_BLOCK_SIZE) -> Iterator[str]:
+        """
+        Streams a text file as decoded blocks of about `block_size` characters, so memory
+        stays bounded by the block size. Multi-byte characters split across reads are
+        handled by an incremental decoder.
+        """
+        encoding = self._sniff_encoding(file_path)
+        # The sample decoded cleanly; stray bad bytes later on are replaced rather than failing mid-stream
+        decoder = codecs.getincrementaldecoder(encoding)(errors='replace')
+        with open(file_path, 'rb') as f:
+            while True:
+                data = f.read(block_size)
+                text = decoder.decode(data, final=not data)
+                if text:
+                    yield text
+                if not data:
+                    return
+
+    @staticmethod
+    def _sniff_encoding(file_path: str, sample_size: int = ENCODING_SAMPLE_SIZE) -> str:
         """
-        Helper to extract text from TXT with encoding fallback.
+        Detects the encoding from the file head: BOM first, then UTF-8 if the sample
+        decodes, otherwise Latin-1 (which accepts any byte).
         """
-        # Try UTF-8 first
+        with open(file_path, 'rb') as f:
+            sample = f.read(sample_size)
+
+        if sample.startswith(codecs.BOM_UTF8):
+            return 'utf-8-sig'
+        if sample.startswith((codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE)):
+            return 'utf-16'
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                return f.read()
+            # Not final: a character cut off at the end of the sample is fine
+            codecs.getincrementaldecoder('utf-8')().decode(sample, final=False)
+            return 'utf-8'
         except UnicodeDecodeError:
-            # Fallback to Latin-1
-            with open(file_path, 'r', encoding='latin-1') as f:
-                return f.read()
+            return 'latin-1'
+
+    def _extract_txt_text(self, file_path: str) -> str:
+        """
+        Helper to extract text from TXT with encoding detection.
+        """
+        return "".join(self.iter_txt_blocks(file_path))
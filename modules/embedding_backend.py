@@ -0,0 +1,241 @@
+import os
+import math
+import hashlib
+import joblib
+import numpy as np
+from abc import ABC, abstractmethod
+from collections import Counter
+from typing import List, Dict, Any, Optional, Tuple, Callable
+from sklearn.decomposition import TruncatedSVD
+from sklearn.feature_extraction.text import HashingVectorizer, TfidfVectorizer
+from sklearn.utils import murmurhash3_32
+
+# Fitted local models are kept next to the store they produced vectors for
+EMBEDDER_FILE = "embedder.joblib"
+# Same tokens as KeywordIndex.tokenize (unicode words, single characters included)
+TOKEN_PATTERN = r"(?u)\b\w+\b"
+
+
+class EmbeddingBackend(ABC):
+    """
+    Turns texts into unit-length float32 vectors. `name` identifies the vector space
+    (backend, parameters and, for fitted models, the fit itself); VectorStore records it
+    so vectors from different spaces are never mixed.
+    """
+    name: str = ""
+    dim: int = 0
+
+    @property
+    def is_fitted(self) -> bool:
+        return True
+
+    def __getstate__(self) -> Dict[str, Any]:
+        # Cached analyzers are rebuilt from the vectorizer, not part of the model
+        state = self.__dict__.copy()
+        state["_analyzer"] = None
+        return state
+
+    def fit(self, texts: List[str]) -> "EmbeddingBackend":
+        return self
+
+    @abstractmethod
+    def encode(self, texts: List[str]) -> np.ndarray:
+        """
+        Embeds a batch of texts in one vectorized pass.
+
+        Returns:
+            np.ndarray: (len(texts), dim) float32, rows L2-normalized (zero rows for empty texts).
+        """
+
+    def save(self, path: str) -> None:
+        """
+        Persists the backend (atomic write), so later runs embed into the same space.
+        """
+        tmp_path = path + ".tmp"
+        joblib.dump(self, tmp_path)
+        os.replace(tmp_path, path)
+
+    @staticmethod
+    def load(path: str) -> "EmbeddingBackend":
+        backend = joblib.load(path)
+        if not isinstance(backend, EmbeddingBackend):
+            raise ValueError(f"{path} does not contain an embedding backend.")
+        return backend
+
+    @staticmethod
+    def _normalize(vectors: np.ndarray) -> np.ndarray:
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return (vectors / norms).astype('float32', copy=False)
+
+
+class HashingEmbedder(EmbeddingBackend):
+    def __init__(self, dim: int = 1024, ngram_range: Tuple[int, int] = (1, 2)):
+        """
+        Stateless local embedder: word n-grams hashed into `dim` signed buckets.
+        Needs no fitting and no model file; purely lexical (no synonyms), like BM25
+        but usable as a dense vector. Encoding is one sparse pass per batch.
+
+        Args:
+            dim (int): Number of hash buckets (vector dimension).
+            ngram_range (Tuple[int, int]): Word n-gram sizes to hash.
+        """
+        self.dim = dim
+        self.ngram_range = tuple(ngram_range)
+        self.name = f"hashing:{dim}:{self.ngram_range[0]}-{self.ngram_range[1]}"
+        self._vectorizer = HashingVectorizer(
+            n_features=dim,
+            ngram_range=self.ngram_range,
+            token_pattern=TOKEN_PATTERN,
+            alternate_sign=True,
+            norm="l2",
+            dtype=np.float32
+        )
+        self._analyzer: Optional[Callable[[str], List[str]]] = None
+
+    def encode(self, texts: List[str]) -> np.ndarray:
+        if not texts:
+            return np.zeros((0, self.dim), dtype='float32')
+        if len(texts) == 1:
+            return self._encode_one(texts[0])[None, :]
+        return self._vectorizer.transform(texts).toarray()
+
+    def _encode_one(self, text: str) -> np.ndarray:
+        """
+        Single-text fast path (queries), bucket for bucket what HashingVectorizer computes
+        but without its sparse-matrix plumbing (~10x faster for one short text).
+        """
+        if self._analyzer is None:
+            self._analyzer = self._vectorizer.build_analyzer()
+        vec = np.zeros(self.dim, dtype='float32')
+        for term, count in Counter(self._analyzer(text)).items():
+            h = murmurhash3_32(term, seed=0)
+            # Same bucket/sign rule as sklearn's hashing transform (alternate_sign=True)
+            index = abs(h) % self.dim if h != -2**31 else (2**31 - self.dim) % self.dim
+            vec[index] += count if h >= 0 else -count
+        norm = np.linalg.norm(vec)
+        return vec / norm if norm else vec
+
+    @classmethod
+    def from_name(cls, name: str) -> "HashingEmbedder":
+        """
+        Rebuilds the embedder a store recorded as `name` (e.g. "hashing:1024:1-2").
+        """
+        try:
+            kind, dim, ngrams = name.split(":")
+            low, high = ngrams.split("-")
+            if kind != "hashing":
+                raise ValueError
+            return cls(dim=int(dim), ngram_range=(int(low), int(high)))
+        except ValueError:
+            raise ValueError(f"Not a hashing embedder name: {name}")
+
+
+class TfidfSvdEmbedder(EmbeddingBackend):
+    def __init__(self, dim: int = 256, max_features: int = 100_000, ngram_range: Tuple[int, int] = (1, 2)):
+        """
+        Local embedder fitted on the corpus: TF-IDF weights reduced to `dim` dense
+        dimensions with truncated SVD (latent semantic analysis), so terms that occur
+        in similar contexts end up close together. Must be fit() before encoding and
+        saved alongside the store; refitting creates a new, incompatible space.
+
+        Args:
+            dim (int): Target dimension (capped by the vocabulary size of the fit corpus).
+            max_features (int): Vocabulary size kept by the TF-IDF step.
+            ngram_range (Tuple[int, int]): Word n-gram sizes.
+        """
+        self.dim = dim
+        self.max_features = max_features
+        self.ngram_range = tuple(ngram_range)
+        self.name = ""
+        self._tfidf: Optional[TfidfVectorizer] = None
+        # SVD components as a (vocabulary, dim) matrix: projecting is one sparse x dense product
+        self._projection: Optional[np.ndarray] = None
+        self._analyzer: Optional[Callable[[str], List[str]]] = None
+
+    @property
+    def is_fitted(self) -> bool:
+        return self._projection is not None
+
+    def fit(self, texts: List[str]) -> "TfidfSvdEmbedder":
+        """
+        Fits vocabulary, IDF weights and the SVD projection on sample texts (chunks).
+        """
+        texts = [t for t in texts if t and t.strip()]
+        if len(texts) < 2:
+            raise ValueError("TF-IDF + SVD needs at least 2 non-empty texts to fit.")
+
+        tfidf = TfidfVectorizer(
+            max_features=self.max_features,
+            ngram_range=self.ngram_range,
+            token_pattern=TOKEN_PATTERN,
+            sublinear_tf=True,
+            min_df=2 if len(texts) >= 100 else 1,
+            dtype=np.float32
+        )
+        matrix = tfidf.fit_transform(texts)
+        components = min(self.dim, matrix.shape[1] - 1, len(texts) - 1)
+        if components < 1:
+            raise ValueError("Fit corpus is too small for an SVD projection.")
+        svd = TruncatedSVD(n_components=components, algorithm="randomized", n_iter=5, random_state=0)
+        svd.fit(matrix)
+
+        self._tfidf = tfidf
+        self._projection = np.ascontiguousarray(svd.components_.T, dtype=np.float32)
+        self.dim = components
+        fingerprint = hashlib.sha256(self._projection.tobytes()).hexdigest()[:12]
+        self.name = f"tfidf-svd:{components}:{fingerprint}"
+        return self
+
+    def encode(self, texts: List[str]) -> np.ndarray:
+        if not self.is_fitted:
+            raise ValueError("TfidfSvdEmbedder must be fit() or loaded before encoding.")
+        if not texts:
+            return np.zeros((0, self.dim), dtype='float32')
+        if len(texts) == 1:
+            return self._encode_one(texts[0])[None, :]
+        return self._normalize(np.asarray(self._tfidf.transform(texts) @ self._projection))
+
+    def _encode_one(self, text: str) -> np.ndarray:
+        """
+        Single-text fast path (queries): skips the vectorizer's sparse-matrix plumbing and
+        sums the projection rows of the text's terms. Same direction as encode(): the TF-IDF
+        row norm only scales the result, which is normalized anyway.
+        """
+        if self._analyzer is None:
+            self._analyzer = self._tfidf.build_analyzer()
+        vocabulary, idf = self._tfidf.vocabulary_, self._tfidf.idf_
+        ids, weights = [], []
+        for term, tf in Counter(self._analyzer(text)).items():
+            j = vocabulary.get(term)
+            if j is not None:
+                ids.append(j)
+                weights.append((1.0 + math.log(tf)) * idf[j])  # sublinear tf, as fitted
+        if not ids:
+            return np.zeros(self.dim, dtype='float32')
+        vec = np.asarray(weights, dtype='float32') @ self._projection[ids]
+        norm = np.linalg.norm(vec)
+        return vec / norm if norm else vec
+
+
+def backend_for(name: Optional[str], model_dir: Optional[str] = None) -> Optional[EmbeddingBackend]:
+    """
+    The local backend that produced vectors recorded under `name` (VectorStore.embedding_backend),
+    or None for remote (OpenAI) / unrecorded vectors.
+
+    Args:
+        name (str, optional): Recorded backend name.
+        model_dir (str, optional): Directory holding EMBEDDER_FILE for fitted backends.
+    """
+    if not name or name.startswith("openai:"):
+        return None
+    if name.startswith("hashing:"):
+        return HashingEmbedder.from_name(name)
+
+    path = os.path.join(model_dir or "", EMBEDDER_FILE)
+    if not os.path.exists(path):
+        raise ValueError(f"Vectors were produced by {name} but {path} is missing.")
+    backend = EmbeddingBackend.load(path)
+    if backend.name != name:
+        raise ValueError(f"{path} holds {backend.name}, but the vectors were produced by {name}.")
+    return backend
@@ -0,0 +1,336 @@
+import time
+import random
+import asyncio
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Callable, Optional, Tuple, Awaitable, Deque
+from openai import APIConnectionError
+from modules.metrics import METRICS
+
+try:
+    import tiktoken
+except ImportError:  # Optional: fall back to a conservative character-based estimate
+    tiktoken = None
+
+# HTTP statuses worth retrying: rate limit, timeouts and server-side errors
+TRANSIENT_STATUS = {408, 409, 429, 500, 502, 503, 504}
+
+class EmbeddingError(Exception):
+    """
+    Raised when a batch of embeddings still fails after all retries.
+    """
+    pass
+
+
+class AdaptiveLimiter:
+    def __init__(self, max_limit: int):
+        """
+        Concurrency limiter with AIMD behaviour: halves the number of in-flight requests
+        on a rate limit (429) and grows it back by one after a run of successes.
+        """
+        self.max_limit = max_limit
+        self.limit = max_limit
+        self.in_flight = 0
+        self._successes = 0
+        self._cond = threading.Condition()
+        # Coroutines waiting for a slot: (their loop, future resolved when a slot is handed over)
+        self._async_waiters: Deque[Tuple[asyncio.AbstractEventLoop, asyncio.Future]] = deque()
+
+    def acquire(self) -> None:
+        with self._cond:
+            while self.in_flight >= self.limit:
+                self._cond.wait()
+            self.in_flight += 1
+
+    async def acquire_async(self) -> None:
+        """
+        Acquire for coroutines. The limit is shared with threaded callers, so instead of
+        waiting on the condition (and stalling the event loop) a coroutine parks on a future;
+        release() takes the slot for it and resolves the future on its loop.
+        """
+        loop = asyncio.get_running_loop()
+        with self._cond:
+            if self.in_flight < self.limit:
+                self.in_flight += 1
+                return
+            waiter = (loop, loop.create_future())
+            self._async_waiters.append(waiter)
+        try:
+            await waiter[1]
+        except asyncio.CancelledError:
+            with self._cond:
+                if waiter in self._async_waiters:
+                    self._async_waiters.remove(waiter)
+                    raise
+            # The slot was already handed over: give it back (if the future itself was
+            # cancelled first, _grant does that instead)
+            if waiter[1].done() and not waiter[1].cancelled():
+                self.release()
+            raise
+
+    def release(self) -> None:
+        with self._cond:
+            self.in_flight -= 1
+            self._wake_async()
+            self._cond.notify_all()
+
+    def on_success(self) -> None:
+        with self._cond:
+            self._successes += 1
+            if self.limit < self.max_limit and self._successes >= self.limit:
+                self.limit += 1
+                self._successes = 0
+                self._wake_async()
+                self._cond.notify_all()
+
+    def _wake_async(self) -> None:
+        """
+        Hands free slots to waiting coroutines, oldest first (caller holds the lock).
+        """
+        while self._async_waiters and self.in_flight < self.limit:
+            loop, future = self._async_waiters.popleft()
+            self.in_flight += 1
+            try:
+                loop.call_soon_threadsafe(self._grant, future)
+            except RuntimeError:
+                # Its loop is closed: nobody is waiting there any more
+                self.in_flight -= 1
+
+    def _grant(self, future: asyncio.Future) -> None:
+        # Runs on the waiter's loop
+        if future.cancelled():
+            self.release()
+        else:
+            future.set_result(None)
+
+    def on_rate_limit(self) -> None:
+        with self._cond:
+            self.limit = max(1, self.limit // 2)
+            self._successes = 0
+
+
+class EmbeddingBatcher:
+    def __init__(
+        self,
+        max_batch_tokens: int = 250_000,
+        max_batch_inputs: int = 2048,
+        max_input_tokens: int = 8191,
+        max_concurrency: int = 4,
+        max_retries: int = 5,
+        base_delay: float = 0.5,
+        max_delay: float = 30.0,
+        encoding_name: str = "cl100k_base"
+    ):
+        """
+        Splits embedding inputs into request-sized batches, dispatches them concurrently,
+        and retries transient failures with exponential backoff and full jitter.
+
+        Args:
+            max_batch_tokens (int): Token budget per request (the API caps a request at 300k).
+            max_batch_inputs (int): Max inputs per request (API limit: 2048).
+            max_input_tokens (int): Per-input limit; longer inputs are truncated.
+            max_concurrency (int): Upper bound on requests in flight (lowered on 429s).
+            max_retries (int): Retries per batch before giving up.
+            base_delay (float): First backoff delay in seconds.
+            max_delay (float): Backoff cap in seconds.
+            encoding_name (str): tiktoken encoding used for counting, when tiktoken is installed.
+        """
+        self.max_batch_tokens = max_batch_tokens
+        self.max_batch_inputs = max_batch_inputs
+        self.max_input_tokens = max_input_tokens
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+        self._encoding = tiktoken.get_encoding(encoding_name) if tiktoken else None
+        self.limiter = AdaptiveLimiter(max_concurrency)
+
+    def count_tokens(self, text: str) -> int:
+        if self._encoding is not None:
+            return len(self._encoding.encode(text))
+        # ~3 chars per token over-estimates for English and stays safe for other languages
+        return len(text) // 3 + 1
+
+    def make_batches(self, texts: List[str]) -> List[Tuple[int, List[str]]]:
+        """
+        Greedily packs texts (in order) into batches under the token/input limits.
+        A batch is a contiguous run of inputs, so its originals are texts[start:start + len(batch)].
+
+        Returns:
+            List[Tuple[int, List[str]]]: (index of first text, batch texts as sent: over-long
+                inputs truncated to max_input_tokens).
+        """
+        batches = []
+        current: List[str] = []
+        current_tokens = 0
+        start = 0
+
+        for i, text in enumerate(texts):
+            tokens = self.count_tokens(text)
+            if tokens > self.max_input_tokens:
+                text = self._truncate(text)
+                tokens = self.max_input_tokens
+
+            if current and (current_tokens + tokens > self.max_batch_tokens or len(current) >= self.max_batch_inputs):
+                batches.append((start, current))
+                current, current_tokens, start = [], 0, i
+            current.append(text)
+            current_tokens += tokens
+
+        if current:
+            batches.append((start, current))
+        return batches
+
+    def embed(
+        self,
+        texts: List[str],
+        request_fn: Callable[[List[str]], List[List[float]]],
+        on_batch: Optional[Callable[[List[str], List[List[float]]], None]] = None
+    ) -> List[List[float]]:
+        """
+        Embeds all texts, preserving input order.
+
+        Args:
+            texts (List[str]): Inputs.
+            request_fn: Sends one batch to the backend and returns its vectors in order.
+            on_batch: Called with (batch texts, vectors) as each batch completes
+                (e.g. to write them to a cache before the rest are done). The texts are the
+                original inputs, also for ones truncated for the request.
+
+        Returns:
+            List[List[float]]: One vector per input.
+
+        Raises:
+            EmbeddingError: A batch failed permanently or ran out of retries.
+        """
+        if not texts:
+            return []
+
+        batches = self.make_batches(texts)
+        results: List[Optional[List[float]]] = [None] * len(texts)
+
+        def run(batch: Tuple[int, List[str]]) -> None:
+            start, batch_texts = batch
+            vectors = self._request_with_retry(batch_texts, request_fn)
+            if len(vectors) != len(batch_texts):
+                raise EmbeddingError(f"Expected {len(batch_texts)} embeddings, got {len(vectors)}.")
+            results[start:start + len(vectors)] = vectors
+            if on_batch is not None:
+                # Keyed by the original inputs: a truncated text must hit the cache next time
+                on_batch(texts[start:start + len(vectors)], vectors)
+
+        if len(batches) == 1:
+            run(batches[0])
+        else:
+            with ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix="embed") as pool:
+                # list() re-raises the first worker exception
+                list(pool.map(run, batches))
+        return results
+
+    async def aembed(
+        self,
+        texts: List[str],
+        request_fn: Callable[[List[str]], Awaitable[List[List[float]]]],
+        on_batch: Optional[Callable[[List[str], List[List[float]]], None]] = None
+    ) -> List[List[float]]:
+        """
+        Async counterpart of embed(): `request_fn` is a coroutine function and batches
+        run as concurrent tasks under the same adaptive limit.
+        """
+        if not texts:
+            return []
+
+        batches = self.make_batches(texts)
+        results: List[Optional[List[float]]] = [None] * len(texts)
+
+        async def run(batch: Tuple[int, List[str]]) -> None:
+            start, batch_texts = batch
+            vectors = await self._arequest_with_retry(batch_texts, request_fn)
+            if len(vectors) != len(batch_texts):
+                raise EmbeddingError(f"Expected {len(batch_texts)} embeddings, got {len(vectors)}.")
+            results[start:start + len(vectors)] = vectors
+            if on_batch is not None:
+                # Keyed by the original inputs: a truncated text must hit the cache next time
+                on_batch(texts[start:start + len(vectors)], vectors)
+
+        await asyncio.gather(*(run(b) for b in batches))
+        return results
+
+    def _request_with_retry(self, texts: List[str], request_fn: Callable[[List[str]], List[List[float]]]) -> List[List[float]]:
+        """
+        One batch: waits for a concurrency slot, sends it, retries transient errors.
+        """
+        attempt = 0
+        while True:
+            self.limiter.acquire()
+            try:
+                vectors = request_fn(texts)
+            except Exception as e:
+                self.limiter.release()
+                if not self._should_retry(e, attempt):
+                    raise EmbeddingError(f"Embedding request failed after {attempt + 1} attempt(s): {e}") from e
+
+                time.sleep(self._backoff(attempt, e))
+                attempt += 1
+                continue
+
+            self.limiter.release()
+            self.limiter.on_success()
+            return vectors
+
+    async def _arequest_with_retry(
+        self,
+        texts: List[str],
+        request_fn: Callable[[List[str]], Awaitable[List[List[float]]]]
+    ) -> List[List[float]]:
+        attempt = 0
+        while True:
+            await self.limiter.acquire_async()
+            try:
+                vectors = await request_fn(texts)
+            except Exception as e:
+                self.limiter.release()
+                if not self._should_retry(e, attempt):
+                    raise EmbeddingError(f"Embedding request failed after {attempt + 1} attempt(s): {e}") from e
+
+                await asyncio.sleep(self._backoff(attempt, e))
+                attempt += 1
+                continue
+
+            self.limiter.release()
+            self.limiter.on_success()
+            return vectors
+
+    def _should_retry(self, error: Exception, attempt: int) -> bool:
+        """
+        Classifies a failed attempt (429s also lower the concurrency limit).
+        """
+        status = getattr(error, "status_code", None)
+        if status == 429:
+            self.limiter.on_rate_limit()
+            METRICS.inc("llm_rate_limited")
+        transient = status in TRANSIENT_STATUS or isinstance(error, APIConnectionError)
+        retry = transient and attempt < self.max_retries
+        if retry:
+            METRICS.inc("llm_embed_retries")
+        return retry
+
+    def _backoff(self, attempt: int, error: Exception) -> float:
+        """
+        Full-jitter exponential backoff; honours a Retry-After header when the server sends one.
+        """
+        response = getattr(error, "response", None)
+        retry_after = getattr(response, "headers", {}).get("retry-after") if response is not None else None
+        if retry_after:
+            try:
+                return min(self.max_delay, float(retry_after))
+            except ValueError:
+                pass
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+    def _truncate(self, text: str) -> str:
+        if self._encoding is not None:
+            return self._encoding.decode(self._encoding.encode(text)[:self.max_input_tokens])
+        return text[:self.max_input_tokens * 3]
@@ -0,0 +1,116 @@
+import os
+import time
+import sqlite3
+import hashlib
+import threading
+import numpy as np
+from typing import List, Dict, Any, Optional
+
+class EmbeddingCache:
+    def __init__(self, path: str, max_entries: int = 100_000):
+        """
+        On-disk, content-addressed embedding cache (SQLite).
+        Keys are sha256(model + normalized text); vectors are stored as float32 blobs.
+        The least recently used entries are evicted once `max_entries` is exceeded.
+
+        Args:
+            path (str): SQLite file path (parent directories are created).
+            max_entries (int): Size bound of the cache.
+        """
+        parent = os.path.dirname(path)
+        if parent:
+            os.makedirs(parent, exist_ok=True)
+
+        self.path = path
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+
+        # One connection shared across threads (UI + background workers), serialized by a lock
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings "
+                "(key TEXT PRIMARY KEY, dim INTEGER, vector BLOB, last_used REAL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_last_used ON embeddings(last_used)")
+
+    @staticmethod
+    def make_key(model: str, text: str) -> str:
+        """
+        Content address of a text for a given model. Whitespace runs are collapsed first,
+        so re-extracted copies of the same chunk map to the same entry.
+        """
+        normalized = " ".join(text.split())
+        return hashlib.sha256(f"{model}\0{normalized}".encode("utf-8")).hexdigest()
+
+    def get_many(self, model: str, texts: List[str]) -> List[Optional[List[float]]]:
+        """
+        Looks up embeddings for texts (None for misses), in input order.
+        """
+        keys = [self.make_key(model, t) for t in texts]
+        found: Dict[str, List[float]] = {}
+
+        with self._lock:
+            unique = list(dict.fromkeys(keys))
+            # Stay under SQLite's bound-parameter limit
+            for start in range(0, len(unique), 500):
+                batch = unique[start:start + 500]
+                placeholders = ",".join("?" * len(batch))
+                for key, blob in self._conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", batch
+                ):
+                    found[key] = np.frombuffer(blob, dtype='float32').tolist()
+
+            if found:
+                now = time.time()
+                with self._conn:
+                    self._conn.executemany(
+                        "UPDATE embeddings SET last_used = ? WHERE key = ?", ((now, k) for k in found)
+                    )
+
+        results = [found.get(k) for k in keys]
+        hit_count = sum(r is not None for r in results)
+        self.hits += hit_count
+        self.misses += len(results) - hit_count
+        return results
+
+    def put_many(self, model: str, texts: List[str], embeddings: List[List[float]]) -> None:
+        """
+        Stores embeddings for texts, then evicts least recently used entries over the bound.
+        """
+        now = time.time()
+        rows = []
+        for text, vec in zip(texts, embeddings):
+            arr = np.asarray(vec, dtype='float32')
+            rows.append((self.make_key(model, text), len(arr), arr.tobytes(), now))
+
+        with self._lock, self._conn:
+            self._conn.executemany("INSERT OR REPLACE INTO embeddings VALUES (?, ?, ?, ?)", rows)
+            count = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+            if count > self.max_entries:
+                self._conn.execute(
+                    "DELETE FROM embeddings WHERE key IN "
+                    "(SELECT key FROM embeddings ORDER BY last_used ASC LIMIT ?)",
+                    (count - self.max_entries,)
+                )
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Hit/miss counters for this process and the current number of cached entries.
+        """
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": entries,
+            "max_entries": self.max_entries
+        }
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,95 @@
+import os
+import json
+import threading
+from typing import Dict, Any, Optional, Tuple
+
+class FileManifest:
+    # lookup() outcomes
+    NEW = "new"
+    CHANGED = "changed"
+    UNCHANGED = "unchanged"
+
+    def __init__(self, path: Optional[str] = None):
+        """
+        Records which version of each source file is indexed: (path, size, mtime, hash) -> doc_id.
+        Size + mtime are a cheap first check; the content hash decides when they differ, so a
+        file that was only touched or copied again is not re-indexed.
+
+        Args:
+            path (str, optional): JSON file the manifest is persisted to (None = in memory only).
+        """
+        self.path = path
+        self.entries: Dict[str, Dict[str, Any]] = self._read()
+        self._lock = threading.Lock()
+
+    def stat_matches(self, key: str, size: int, mtime: float) -> bool:
+        """
+        Fast path: the file's size and mtime are what was recorded (no need to hash it).
+        """
+        with self._lock:
+            entry = self.entries.get(key)
+        return entry is not None and entry["size"] == size and entry["mtime"] == mtime
+
+    def lookup(self, key: str, size: int, mtime: float, content_hash: str) -> Tuple[str, Optional[Dict[str, Any]]]:
+        """
+        Classifies a file against its recorded version.
+
+        Returns:
+            Tuple[str, Dict]: (NEW | CHANGED | UNCHANGED, previous entry or None).
+            An UNCHANGED file with a new size/mtime has its entry refreshed.
+        """
+        with self._lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return self.NEW, None
+            if entry.get("hash") != content_hash:
+                return self.CHANGED, dict(entry)
+            entry["size"], entry["mtime"] = size, mtime
+            return self.UNCHANGED, dict(entry)
+
+    def references(self, doc_id: str) -> int:
+        """
+        Number of files whose indexed version is this document.
+        """
+        with self._lock:
+            return sum(1 for entry in self.entries.values() if entry.get("doc_id") == doc_id)
+
+    def record(
+        self,
+        key: str,
+        size: int,
+        mtime: float,
+        content_hash: str,
+        doc_id: Optional[str],
+        chunks: int = 0
+    ) -> None:
+        with self._lock:
+            self.entries[key] = {
+                "size": size,
+                "mtime": mtime,
+                "hash": content_hash,
+                "doc_id": doc_id,
+                "chunks": chunks
+            }
+
+    def save(self) -> None:
+        """
+        Writes the manifest atomically (temp file + rename).
+        """
+        if not self.path:
+            return
+        with self._lock:
+            data = json.dumps(self.entries, indent=2, ensure_ascii=False)
+        parent = os.path.dirname(self.path)
+        if parent:
+            os.makedirs(parent, exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(data)
+        os.replace(tmp_path, self.path)
+
+    def _read(self) -> Dict[str, Dict[str, Any]]:
+        if not self.path or not os.path.exists(self.path):
+            return {}
+        with open(self.path, 'r', encoding='utf-8') as f:
+            return json.load(f)
@@ -0,0 +1,368 @@
+import os
+import time
+import queue
+import threading
+from typing import List, Dict, Any, Optional, Callable
+from modules.document_processor import DocumentProcessor
+from modules.vector_store import VectorStore
+from modules.file_manifest import FileManifest
+
+CHECKPOINT_FILE = "ingest_manifest.json"
+SUPPORTED_EXTENSIONS = ('.pdf', '.txt')
+
+# Queue sentinel: tells a stage's workers that upstream is finished
+_DONE = object()
+
+class IngestPipeline:
+    def __init__(
+        self,
+        store: VectorStore,
+        store_dir: str,
+        embed_fn: Callable[[List[str]], List[List[float]]],
+        processor: Optional[DocumentProcessor] = None,
+        extract_workers: int = 2,
+        chunk_workers: int = 2,
+        embed_workers: int = 4,
+        dedup_workers: int = 1,
+        queue_size: int = 8,
+        checkpoint_every: int = 50,
+        chunk_size: int = 800,
+        overlap: int = 120,
+        embedding_backend: Optional[str] = None,
+        log: Callable[[str], None] = print
+    ):
+        """
+        Bulk ingestion of a directory tree into a persisted VectorStore, run as a staged
+        pipeline: hash/check -> extract/clean/chunk -> dedup -> embed -> store. Stages are connected by bounded
+        queues (a slow stage blocks the ones feeding it) and each has its own worker count.
+        A checkpoint manifest in `store_dir` records (path, size, mtime, hash) -> doc_id for
+        files whose chunks are saved, so an interrupted run resumes without redoing them and a
+        re-sync skips unchanged files. Doc ids are content hashes; a changed file only embeds
+        the chunks whose text changed and reuses the stored vectors of the rest. Chunks that
+        nearly duplicate an already stored chunk (MinHash/LSH) are kept as references to it
+        and never embedded.
+
+        Args:
+            store (VectorStore): Target store (loaded from `store_dir` by the caller if it exists).
+            store_dir (str): Directory the store and checkpoint manifest are saved to.
+            embed_fn (Callable): Embeds a list of texts (e.g. LLMInterface.embed_texts).
+            processor (DocumentProcessor, optional): Extraction/chunking settings.
+            extract_workers (int): Threads hashing files and checking them against the checkpoint.
+            chunk_workers (int): Threads reading, cleaning and chunking files (pages stream into the chunker).
+            embed_workers (int): Threads calling `embed_fn` concurrently.
+            dedup_workers (int): Threads looking up near-duplicate chunks (lookups share the store lock).
+            queue_size (int): Max items waiting between two stages.
+            checkpoint_every (int): Save the store + manifest after this many stored files.
+            chunk_size (int): Characters per chunk.
+            overlap (int): Overlapping characters between chunks.
+            embedding_backend (str, optional): Name of the backend behind `embed_fn`; recorded in
+                the store, and a run into a store built by another backend fails before any work.
+            log (Callable): Progress/error reporting.
+        """
+        self.store = store
+        self.store_dir = store_dir
+        self.embed_fn = embed_fn
+        self.processor = processor or DocumentProcessor()
+        self.extract_workers = extract_workers
+        self.chunk_workers = chunk_workers
+        self.embed_workers = embed_workers
+        self.dedup_workers = dedup_workers
+        self.queue_size = queue_size
+        self.checkpoint_every = checkpoint_every
+        self.chunk_size = chunk_size
+        self.overlap = overlap
+        self.embedding_backend = embedding_backend
+        self.log = log
+
+        self.manifest = FileManifest(os.path.join(store_dir, CHECKPOINT_FILE))
+        self.failed: Dict[str, str] = {}
+        self._save_error: Optional[Exception] = None
+        self._lock = threading.Lock()
+        # The store isn't thread-safe: embed workers read old vectors while the writer adds
+        self._store_lock = threading.Lock()
+        # content hash -> identical files waiting for the copy that is being ingested
+        self._in_flight: Dict[str, List[Dict[str, Any]]] = {}
+        self._counts = {"skipped": 0, "reused_chunks": 0, "embedded_chunks": 0, "duplicate_chunks": 0}
+
+    def run(self, root: str) -> Dict[str, Any]:
+        """
+        Indexes every supported file under `root` that isn't already checkpointed
+        (or has changed since), then saves the store.
+
+        Returns:
+            Dict: Run statistics (files found/skipped/stored/failed, chunks stored,
+                reused, embedded and stored as near-duplicate references, seconds).
+
+        Raises:
+            ValueError: The store holds vectors of a different embedding backend.
+            Exception: Saving the store failed (the last good checkpoint stays valid).
+        """
+        started = time.perf_counter()
+        root = os.path.abspath(root)
+        if self.embedding_backend is not None:
+            self.store.bind_embedding_backend(self.embedding_backend)
+        files = self._discover(root)
+        todo = [f for f in files if not self.manifest.stat_matches(f["rel_path"], f["size"], f["mtime"])]
+        self.log(f"{len(files)} files found, {len(files) - len(todo)} already indexed, {len(todo)} to check.")
+
+        # 1. Bounded queues between stages
+        paths_q: queue.Queue = queue.Queue(maxsize=self.queue_size)
+        files_q: queue.Queue = queue.Queue(maxsize=self.queue_size)
+        chunks_q: queue.Queue = queue.Queue(maxsize=self.queue_size)
+        dedup_q: queue.Queue = queue.Queue(maxsize=self.queue_size)
+        vectors_q: queue.Queue = queue.Queue(maxsize=self.queue_size)
+
+        # 2. Stage workers (the store stage is a single writer: VectorStore isn't thread-safe)
+        stages = [
+            self._start(self.extract_workers, self._extract_stage, paths_q, files_q),
+            self._start(self.chunk_workers, self._chunk_stage, files_q, chunks_q),
+            self._start(self.dedup_workers, self._dedup_stage, chunks_q, dedup_q),
+            self._start(self.embed_workers, self._embed_stage, dedup_q, vectors_q),
+        ]
+        stats = {"stored": 0, "chunks": 0}
+        writer = threading.Thread(target=self._store_stage, args=(vectors_q, stats), name="ingest-store")
+        writer.start()
+
+        # 3. Feed the pipeline, then shut stages down in order
+        for file_info in todo:
+            paths_q.put(file_info)
+        self._finish(stages[0], paths_q, files_q)
+        self._finish(stages[1], files_q, chunks_q)
+        self._finish(stages[2], chunks_q, dedup_q)
+        self._finish(stages[3], dedup_q, vectors_q)
+        writer.join()
+
+        if self._save_error is not None:
+            # Files stored since the last good checkpoint are redone on the next run
+            raise self._save_error
+
+        return {
+            "found": len(files),
+            "skipped": len(files) - len(todo) + self._counts["skipped"],
+            "stored": stats["stored"],
+            "chunks": stats["chunks"],
+            "reused_chunks": self._counts["reused_chunks"],
+            "embedded_chunks": self._counts["embedded_chunks"],
+            "duplicate_chunks": self._counts["duplicate_chunks"],
+            "failed": dict(self.failed),
+            "seconds": time.perf_counter() - started
+        }
+
+    # --- Stages ---
+
+    def _extract_stage(self, item: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        # 1. Content check: a touched/copied file with the same bytes is not re-indexed
+        item["hash"] = self.processor.file_hash(item["path"])
+        status, entry = self.manifest.lookup(item["rel_path"], item["size"], item["mtime"], item["hash"])
+        if status == FileManifest.UNCHANGED:
+            self._count("skipped")
+            return None
+        item["previous"] = entry
+
+        # 2. Same content already indexed (or being ingested) under another path: share its document
+        with self._lock:
+            waiting = self._in_flight.get(item["hash"])
+            if waiting is not None:
+                waiting.append(item)
+                return None
+            with self._store_lock:
+                indexed = self.store.has_document(item["hash"])
+            if not indexed:
+                self._in_flight[item["hash"]] = []
+        if indexed:
+            self._settle_copy(item, item["hash"])
+            return None
+
+        return item
+
+    def _chunk_stage(self, item: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        # Pages are read as the chunker consumes them: no page list or joined text is held.
+        # A file's chunks are still collected whole, since dedup and replace_document work
+        # per document (and the store keeps every chunk's text anyway).
+        pages = self.processor.iter_pages(item["path"])
+        item["chunks"] = list(self.processor.iter_chunks(pages, self.chunk_size, self.overlap))
+        if not item["chunks"]:
+            self.log(f"[skip] {item['rel_path']}: no text")
+            # Empty files are done: nothing to embed, don't retry them on resume
+            self._settle(item, doc_id=None)
+            return None
+        return item
+
+    def _dedup_stage(self, item: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        # The file's previous version is not a dedup target: its unchanged chunks are reused
+        # by the embed stage and its edited ones need new vectors
+        previous_id = item["previous"].get("doc_id") if item["previous"] else None
+        with self._store_lock:
+            item["duplicate_of"] = self.store.near_duplicates(
+                item["hash"], [c.text for c in item["chunks"]], exclude=[previous_id]
+            )
+        self._count("duplicate_chunks", sum(1 for target in item["duplicate_of"] if target is not None))
+        return item
+
+    def _embed_stage(self, item: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        texts = [c.text for c in item["chunks"]]
+        previous = item["previous"]
+        duplicates = [target is not None for target in item["duplicate_of"]]
+
+        # Reuse stored vectors of chunks whose text didn't change, embed only the rest
+        # (near-duplicates need no vector at all)
+        embeddings: List[Any] = [None] * len(texts)
+        if previous and previous.get("doc_id"):
+            with self._store_lock:
+                embeddings = self.store.reusable_vectors(previous["doc_id"], texts)
+        missing = [i for i, vec in enumerate(embeddings) if vec is None and not duplicates[i]]
+        reused = sum(1 for i, vec in enumerate(embeddings) if vec is not None and not duplicates[i])
+        if missing:
+            for i, vec in zip(missing, self.embed_fn([texts[i] for i in missing])):
+                embeddings[i] = vec
+
+        item["embeddings"] = embeddings
+        self._count("reused_chunks", reused)
+        self._count("embedded_chunks", len(missing))
+        return item
+
+    def _store_stage(self, in_q: queue.Queue, stats: Dict[str, int]) -> None:
+        since_checkpoint = 0
+        while True:
+            item = in_q.get()
+            if item is _DONE:
+                break
+            if self._save_error is not None:
+                # Keep draining so upstream stages don't block on a full queue
+                continue
+            try:
+                with self._store_lock:
+                    self.store.replace_document(
+                        doc_id=item["hash"],
+                        filename=item["rel_path"],
+                        chunks=[c.text for c in item["chunks"]],
+                        embeddings=item["embeddings"],
+                        provenance=[c.provenance() for c in item["chunks"]],
+                        duplicate_of=item["duplicate_of"]
+                    )
+                self._settle(item, doc_id=item["hash"])
+            except Exception as e:
+                self._fail(item, e)
+                continue
+
+            stats["stored"] += 1
+            stats["chunks"] += len(item["chunks"])
+            since_checkpoint += 1
+            if since_checkpoint >= self.checkpoint_every:
+                try:
+                    self._save_checkpoint()
+                except Exception as e:
+                    self._save_error = e
+                    continue
+                self.log(f"[checkpoint] {stats['stored']} files, {stats['chunks']} chunks")
+                since_checkpoint = 0
+
+        if self._save_error is None:
+            try:
+                self._save_checkpoint()
+            except Exception as e:
+                self._save_error = e
+
+    def _settle(self, item: Dict[str, Any], doc_id: Optional[str]) -> None:
+        """
+        Records a finished file (and any identical copies that waited for it) in the manifest.
+        """
+        self.manifest.record(
+            item["rel_path"], item["size"], item["mtime"], item["hash"], doc_id, len(item.get("chunks") or [])
+        )
+        self._release_previous(item)
+        with self._lock:
+            copies = self._in_flight.pop(item["hash"], [])
+        for copy in copies:
+            self._settle_copy(copy, doc_id)
+
+    def _settle_copy(self, item: Dict[str, Any], doc_id: Optional[str]) -> None:
+        self.log(f"[duplicate] {item['rel_path']}: content already indexed")
+        self.manifest.record(item["rel_path"], item["size"], item["mtime"], item["hash"], doc_id)
+        self._release_previous(item)
+        self._count("skipped")
+
+    def _release_previous(self, item: Dict[str, Any]) -> None:
+        """
+        Removes the file's previous version from the store once no file refers to it anymore.
+        """
+        previous = item["previous"]
+        old_id = previous.get("doc_id") if previous else None
+        if old_id and old_id != item["hash"] and self.manifest.references(old_id) == 0:
+            with self._store_lock:
+                self.store.remove_document(old_id)
+
+    # --- Plumbing ---
+
+    def _start(self, workers: int, fn: Callable, in_q: queue.Queue, out_q: queue.Queue) -> List[threading.Thread]:
+        threads = [
+            threading.Thread(target=self._worker, args=(fn, in_q, out_q), name=f"ingest-{fn.__name__}-{i}", daemon=True)
+            for i in range(max(1, workers))
+        ]
+        for t in threads:
+            t.start()
+        return threads
+
+    def _worker(self, fn: Callable, in_q: queue.Queue, out_q: queue.Queue) -> None:
+        while True:
+            item = in_q.get()
+            if item is _DONE:
+                return
+            try:
+                result = fn(item)
+            except Exception as e:
+                # One bad file must not stop the run; it isn't checkpointed, so it is retried next time
+                self._fail(item, e)
+                continue
+            if result is not None:
+                out_q.put(result)
+
+    @staticmethod
+    def _finish(threads: List[threading.Thread], in_q: queue.Queue, out_q: queue.Queue) -> None:
+        """
+        Stops one stage after its input is drained, then signals the next stage.
+        """
+        for _ in threads:
+            in_q.put(_DONE)
+        for t in threads:
+            t.join()
+        out_q.put(_DONE)
+
+    def _count(self, name: str, n: int = 1) -> None:
+        with self._lock:
+            self._counts[name] += n
+
+    def _fail(self, item: Dict[str, Any], error: Exception) -> None:
+        with self._lock:
+            self.failed[item["rel_path"]] = str(error)
+            # Copies waiting on this file aren't indexed either; they are retried with it
+            copies = self._in_flight.pop(item["hash"], []) if "hash" in item else []
+            for copy in copies:
+                self.failed[copy["rel_path"]] = str(error)
+        self.log(f"[error] {item['rel_path']}: {error}")
+
+    def _discover(self, root: str) -> List[Dict[str, Any]]:
+        files = []
+        for dirpath, dirnames, filenames in os.walk(root):
+            dirnames.sort()
+            for name in sorted(filenames):
+                if not name.lower().endswith(SUPPORTED_EXTENSIONS):
+                    continue
+                path = os.path.join(dirpath, name)
+                st = os.stat(path)
+                files.append({
+                    "path": path,
+                    "rel_path": os.path.relpath(path, root).replace(os.sep, "/"),
+                    "size": st.st_size,
+                    "mtime": st.st_mtime
+                })
+        return files
+
+    def _save_checkpoint(self) -> None:
+        """
+        Saves the store first, then the manifest: a file is only recorded as done once
+        its chunks are on disk.
+        """
+        with self._store_lock:
+            self.store.save(self.store_dir)
+        self.manifest.save()
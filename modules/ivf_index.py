@@ -0,0 +1,227 @@
+import time
+import numpy as np
+from typing import List, Dict, Any, Optional, Sequence
+
+class IVFIndex:
+    def __init__(self, n_lists: int, nprobe: int = 8, n_iter: int = 10, seed: int = 0):
+        """
+        Inverted-file (IVF) index over unit-normalized vectors.
+        A k-means coarse quantizer splits the rows into `n_lists` cells; a query only
+        scores the rows in the `nprobe` cells whose centroids are closest to it.
+
+        Args:
+            n_lists (int): Number of k-means centroids / posting lists.
+            nprobe (int): Default number of lists probed per query.
+            n_iter (int): k-means iterations during training.
+            seed (int): Random seed for centroid initialisation.
+        """
+        if n_lists < 1:
+            raise ValueError("n_lists must be at least 1.")
+
+        self.n_lists = n_lists
+        self.nprobe = nprobe
+        self.n_iter = n_iter
+        self.seed = seed
+
+        self.centroids: Optional[np.ndarray] = None  # (n_lists, Dim), unit-normalized
+        self.trained_rows = 0
+
+        # Posting lists: row ids per centroid, appended as small arrays and merged lazily
+        self._postings: List[List[np.ndarray]] = [[] for _ in range(n_lists)]
+
+    def train(self, vectors: np.ndarray) -> None:
+        """
+        Runs spherical k-means (cosine) on a sample of rows to fit the centroids.
+
+        Args:
+            vectors (np.ndarray): Normalized training rows (N, Dim).
+        """
+        rng = np.random.default_rng(self.seed)
+        n = len(vectors)
+        if n == 0:
+            raise ValueError("Cannot train IVF index on an empty set of vectors.")
+
+        k = min(self.n_lists, n)
+        centroids = vectors[rng.choice(n, size=k, replace=False)].astype('float32', copy=True)
+
+        for _ in range(self.n_iter):
+            labels = self._nearest(vectors, centroids)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, labels, vectors)
+            counts = np.bincount(labels, minlength=k)
+
+            # Re-seed empty cells with random rows so no list stays unused
+            empty = counts == 0
+            if empty.any():
+                sums[empty] = vectors[rng.choice(n, size=int(empty.sum()))]
+
+            norms = np.linalg.norm(sums, axis=1, keepdims=True)
+            norms[norms == 0] = 1.0
+            centroids = sums / norms
+
+        self.centroids = centroids
+        self.n_lists = k
+        self.trained_rows = n
+        self._postings = [[] for _ in range(k)]
+
+    def add(self, row_ids: np.ndarray, vectors: np.ndarray) -> None:
+        """
+        Assigns rows to their nearest centroid and appends them to that posting list.
+
+        Args:
+            row_ids (np.ndarray): Store row ids of the vectors.
+            vectors (np.ndarray): Normalized vectors (N, Dim) aligned with row_ids.
+        """
+        if self.centroids is None:
+            raise ValueError("IVF index must be trained before adding vectors.")
+        if len(row_ids) == 0:
+            return
+
+        row_ids = np.asarray(row_ids, dtype=np.int64)
+        labels = self._nearest(vectors, self.centroids)
+
+        # Group by list in one pass: sort by label, then split
+        order = np.argsort(labels, kind='stable')
+        bounds = np.searchsorted(labels[order], np.arange(self.n_lists + 1))
+        for list_id in range(self.n_lists):
+            start, end = bounds[list_id], bounds[list_id + 1]
+            if start < end:
+                self._postings[list_id].append(row_ids[order[start:end]])
+
+    def candidates(self, query_vec: np.ndarray, nprobe: Optional[int] = None) -> np.ndarray:
+        """
+        Returns the row ids stored in the `nprobe` lists closest to the query.
+
+        Args:
+            query_vec (np.ndarray): Normalized query vector (Dim,).
+            nprobe (int, optional): Lists to probe (defaults to self.nprobe).
+
+        Returns:
+            np.ndarray: Candidate row ids.
+        """
+        nprobe = min(nprobe or self.nprobe, self.n_lists)
+        centroid_scores = self.centroids @ query_vec
+        probes = np.argpartition(centroid_scores, self.n_lists - nprobe)[self.n_lists - nprobe:]
+
+        parts = [self._posting(int(list_id)) for list_id in probes]
+        if not parts:
+            return np.empty(0, dtype=np.int64)
+        return np.concatenate(parts)
+
+    def _posting(self, list_id: int) -> np.ndarray:
+        """
+        Returns one posting list as a single array, merging appended pieces on first use.
+        """
+        pieces = self._postings[list_id]
+        if not pieces:
+            return np.empty(0, dtype=np.int64)
+        if len(pieces) > 1:
+            pieces[:] = [np.concatenate(pieces)]
+        return pieces[0]
+
+    def copy(self) -> "IVFIndex":
+        """
+        Copy whose posting lists can grow without affecting this index (centroids and
+        posting arrays are shared, they are never modified in place).
+        """
+        index = IVFIndex(n_lists=self.n_lists, nprobe=self.nprobe, n_iter=self.n_iter, seed=self.seed)
+        index.centroids = self.centroids
+        index.trained_rows = self.trained_rows
+        index._postings = [list(pieces) for pieces in self._postings]
+        return index
+
+    def to_arrays(self) -> Dict[str, np.ndarray]:
+        """
+        Flattens the index into arrays (for np.savez).
+        """
+        lists = [self._posting(i) for i in range(self.n_lists)]
+        return {
+            "centroids": self.centroids,
+            "list_sizes": np.array([len(p) for p in lists], dtype=np.int64),
+            "row_ids": np.concatenate(lists) if lists else np.empty(0, dtype=np.int64),
+            "params": np.array([self.nprobe, self.n_iter, self.seed, self.trained_rows], dtype=np.int64)
+        }
+
+    @classmethod
+    def from_arrays(cls, arrays: Dict[str, np.ndarray]) -> "IVFIndex":
+        """
+        Rebuilds an index saved with to_arrays().
+        """
+        centroids = np.asarray(arrays["centroids"], dtype='float32')
+        nprobe, n_iter, seed, trained_rows = (int(v) for v in arrays["params"])
+        index = cls(n_lists=len(centroids), nprobe=nprobe, n_iter=n_iter, seed=seed)
+        index.centroids = centroids
+        index.trained_rows = trained_rows
+
+        row_ids = np.asarray(arrays["row_ids"], dtype=np.int64)
+        bounds = np.concatenate([[0], np.cumsum(arrays["list_sizes"])])
+        index._postings = [
+            [row_ids[bounds[i]:bounds[i + 1]]] if bounds[i + 1] > bounds[i] else []
+            for i in range(len(centroids))
+        ]
+        return index
+
+    @staticmethod
+    def _nearest(vectors: np.ndarray, centroids: np.ndarray, batch_size: int = 65536) -> np.ndarray:
+        """
+        Index of the most similar centroid for every row, computed in batches to bound memory.
+        """
+        labels = np.empty(len(vectors), dtype=np.int64)
+        for start in range(0, len(vectors), batch_size):
+            block = vectors[start:start + batch_size]
+            labels[start:start + batch_size] = np.argmax(block @ centroids.T, axis=1)
+        return labels
+
+
+def recall_latency_report(
+    store,
+    query_embeddings: Sequence[Sequence[float]],
+    top_k: int = 5,
+    nprobe_values: Sequence[int] = (1, 2, 4, 8, 16, 32)
+) -> List[Dict[str, Any]]:
+    """
+    Measures recall@k and per-query latency of IVF search against exact search,
+    to pick an `nprobe` for a latency budget. The store must have an IVF index built.
+
+    Args:
+        store (VectorStore): Store with `build_ivf()` already called.
+        query_embeddings: Sample of query vectors (ideally real user questions).
+        top_k (int): k used for recall@k.
+        nprobe_values: nprobe settings to evaluate.
+
+    Returns:
+        List[Dict]: One row per setting ('exact' first) with recall, mean/p50/p95 latency in ms.
+    """
+    if store.ivf is None:
+        raise ValueError("Store has no IVF index; call build_ivf() first.")
+
+    def timed(fn):
+        latencies, results = [], []
+        for q in query_embeddings:
+            start = time.perf_counter()
+            results.append(fn(q))
+            latencies.append((time.perf_counter() - start) * 1000)
+        return results, np.array(latencies)
+
+    exact_results, exact_lat = timed(lambda q: store.search(q, top_k=top_k, exact=True))
+    truth = [{r['global_index'] for r in res} for res in exact_results]
+
+    report = [{
+        "nprobe": "exact",
+        "recall": 1.0,
+        "mean_ms": float(exact_lat.mean()),
+        "p50_ms": float(np.percentile(exact_lat, 50)),
+        "p95_ms": float(np.percentile(exact_lat, 95))
+    }]
+
+    for nprobe in nprobe_values:
+        results, lat = timed(lambda q: store.search(q, top_k=top_k, nprobe=nprobe))
+        hits = [len(t & {r['global_index'] for r in res}) / max(1, len(t)) for t, res in zip(truth, results)]
+        report.append({
+            "nprobe": nprobe,
+            "recall": float(np.mean(hits)),
+            "mean_ms": float(lat.mean()),
+            "p50_ms": float(np.percentile(lat, 50)),
+            "p95_ms": float(np.percentile(lat, 95))
+        })
+    return report
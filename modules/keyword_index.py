@@ -0,0 +1,214 @@
+import re
+import numpy as np
+from collections import Counter
+from typing import List, Dict, Optional, Tuple, Set
+
+TOKEN_PATTERN = re.compile(r"\w+")
+
+def tokenize(text: str) -> List[str]:
+    """
+    Lowercases and splits text into word tokens (unicode-aware).
+    """
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+class KeywordIndex:
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        """
+        Tokenized inverted index with BM25 scoring, row-aligned with the VectorStore.
+        Postings are appended as small (row_ids, term_freqs) arrays and merged lazily per term.
+
+        Args:
+            k1 (float): BM25 term-frequency saturation.
+            b (float): BM25 length normalization.
+        """
+        self.k1 = k1
+        self.b = b
+
+        self._postings: Dict[str, List[Tuple[np.ndarray, np.ndarray]]] = {}
+        self._doc_lens = np.zeros(0, dtype=np.int32)
+        self.num_rows = 0
+        self._total_len = 0
+        # Terms whose piece lists are shared with a copy() and must be copied before appending
+        self._shared: Set[str] = set()
+
+    def copy(self) -> "KeywordIndex":
+        """
+        Copy-on-write copy: posting lists are shared until either index appends to a term.
+        """
+        index = KeywordIndex(self.k1, self.b)
+        index._postings = dict(self._postings)
+        index._doc_lens = self._doc_lens.copy()
+        index.num_rows = self.num_rows
+        index._total_len = self._total_len
+        self._shared = set(self._postings)
+        index._shared = set(self._shared)
+        return index
+
+    def add(self, start_row: int, texts: List[str]) -> None:
+        """
+        Indexes texts as consecutive rows starting at `start_row`.
+        """
+        self.merge_arrays(self.build_arrays(start_row, texts))
+
+    @staticmethod
+    def build_arrays(start_row: int, texts: List[str]) -> Dict[str, np.ndarray]:
+        """
+        Tokenizes texts into a flat, term-sorted posting block (also the on-disk format).
+
+        Returns:
+            Dict: terms, offsets (into rows/tfs per term), rows, tfs, doc_lens, start_row.
+        """
+        by_term: Dict[str, List[Tuple[int, int]]] = {}
+        doc_lens = np.zeros(len(texts), dtype=np.int32)
+        for i, text in enumerate(texts):
+            tokens = tokenize(text)
+            doc_lens[i] = len(tokens)
+            for term, tf in Counter(tokens).items():
+                by_term.setdefault(term, []).append((start_row + i, tf))
+
+        terms = sorted(by_term)
+        sizes = [len(by_term[t]) for t in terms]
+        pairs = [p for t in terms for p in by_term[t]]
+        return {
+            "terms": np.array(terms, dtype=str),
+            "offsets": np.concatenate([[0], np.cumsum(sizes, dtype=np.int64)]),
+            "rows": np.array([p[0] for p in pairs], dtype=np.int64),
+            "tfs": np.array([p[1] for p in pairs], dtype=np.int32),
+            "doc_lens": doc_lens,
+            "start_row": np.array(start_row, dtype=np.int64)
+        }
+
+    def merge_arrays(self, arrays: Dict[str, np.ndarray]) -> None:
+        """
+        Adds a posting block produced by build_arrays() (freshly built or loaded from disk).
+        """
+        start_row = int(arrays["start_row"])
+        doc_lens = arrays["doc_lens"]
+        end_row = start_row + len(doc_lens)
+
+        if end_row > len(self._doc_lens):
+            grown = np.zeros(max(end_row, 2 * len(self._doc_lens)), dtype=np.int32)
+            grown[:len(self._doc_lens)] = self._doc_lens
+            self._doc_lens = grown
+        self._doc_lens[start_row:end_row] = doc_lens
+        self.num_rows = max(self.num_rows, end_row)
+        self._total_len += int(doc_lens.sum())
+
+        offsets, rows, tfs = arrays["offsets"], arrays["rows"], arrays["tfs"]
+        for i, term in enumerate(arrays["terms"].tolist()):
+            start, end = offsets[i], offsets[i + 1]
+            if self._shared and term in self._shared:
+                self._postings[term] = list(self._postings[term])
+                self._shared.discard(term)
+            self._postings.setdefault(term, []).append((rows[start:end], tfs[start:end]))
+
+    def search(
+        self,
+        query: str,
+        top_k: int = 5,
+        require_all: bool = False,
+        deleted: Optional[np.ndarray] = None,
+        substring: bool = False
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Scores rows with BM25 using only the postings of the query terms.
+
+        Args:
+            query (str): Free-text query.
+            top_k (int): Number of rows to return (<= 0 returns every match, ranked).
+            require_all (bool): Only rows containing every query term (phrase candidates).
+            deleted (np.ndarray, optional): Tombstone mask; those rows are skipped.
+            substring (bool): Match the query's tokens the way they can occur inside a substring
+                match of the query (see substring_terms), e.g. "net" also finds "network".
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: row ids and BM25 scores, best first.
+        """
+        if substring:
+            groups = list(dict.fromkeys(tuple(terms) for terms in self.substring_terms(query)))
+        else:
+            groups = [(term,) for term in dict.fromkeys(tokenize(query))]
+        empty = (np.empty(0, dtype=np.int64), np.empty(0, dtype='float32'))
+        if not groups or self.num_rows == 0:
+            return empty
+
+        # Collection stats include tombstoned rows until compaction (as Lucene does)
+        n_docs = self.num_rows
+        avg_len = self._total_len / n_docs if n_docs else 0.0
+
+        # A row matches a query token if it contains any term of the token's group
+        all_rows, all_scores, matched = [], [], []
+        for terms in groups:
+            group_rows = []
+            for term in terms:
+                rows, tfs = self._posting(term)
+                if len(rows) == 0:
+                    continue
+                idf = np.log(1.0 + (n_docs - len(rows) + 0.5) / (len(rows) + 0.5))
+                norm = self.k1 * (1.0 - self.b + self.b * self._doc_lens[rows] / max(avg_len, 1e-9))
+                all_rows.append(rows)
+                all_scores.append(idf * tfs * (self.k1 + 1.0) / (tfs + norm))
+                group_rows.append(rows)
+            if not group_rows:
+                if require_all:
+                    return empty
+                continue
+            matched.append(np.unique(np.concatenate(group_rows)) if len(group_rows) > 1 else group_rows[0])
+
+        if not all_rows:
+            return empty
+
+        rows, inverse = np.unique(np.concatenate(all_rows), return_inverse=True)
+        scores = np.bincount(inverse, weights=np.concatenate(all_scores)).astype('float32')
+
+        keep = np.ones(len(rows), dtype=bool)
+        if require_all:
+            matched_rows, counts = np.unique(np.concatenate(matched), return_counts=True)
+            keep &= np.isin(rows, matched_rows[counts == len(groups)])
+        if deleted is not None and len(deleted):
+            keep &= ~deleted[rows]
+        rows, scores = rows[keep], scores[keep]
+
+        if 0 < top_k < len(rows):
+            top = np.argpartition(scores, len(rows) - top_k)[len(rows) - top_k:]
+            rows, scores = rows[top], scores[top]
+        order = np.argsort(-scores, kind='stable')
+        return rows[order], scores[order]
+
+    def substring_terms(self, query: str) -> List[List[str]]:
+        """
+        For each token of the query, the indexed terms it can be part of when the query occurs
+        as a substring of a text: a token cut by the start of the query may be the end of a
+        longer term, one cut by its end the beginning, a token spanning the whole query any
+        part of one. Tokens between separators are whole terms. Scans the vocabulary only
+        for the (at most two) cut tokens.
+
+        Returns:
+            List[List[str]]: One list of candidate terms per query token, in query order.
+        """
+        text = query.lower()
+        groups = []
+        for match in TOKEN_PATTERN.finditer(text):
+            token = match.group()
+            cut_start, cut_end = match.start() == 0, match.end() == len(text)
+            if cut_start and cut_end:
+                groups.append([term for term in self._postings if token in term])
+            elif cut_start:
+                groups.append([term for term in self._postings if term.endswith(token)])
+            elif cut_end:
+                groups.append([term for term in self._postings if term.startswith(token)])
+            else:
+                groups.append([token] if token in self._postings else [])
+        return groups
+
+    def _posting(self, term: str) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Returns one term's postings as single arrays, merging appended pieces on first use.
+        """
+        pieces = self._postings.get(term)
+        if not pieces:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int32)
+        if len(pieces) > 1:
+            pieces[:] = [(np.concatenate([p[0] for p in pieces]), np.concatenate([p[1] for p in pieces]))]
+        return pieces[0]
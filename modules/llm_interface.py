@@ -1,9 +1,86 @@
+import time
 import random
-from typing import List, Dict, Any, Optional
-from openai import OpenAI, OpenAIError
+import asyncio
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import List, Dict, Any, Optional, Tuple, Coroutine, Iterator, Sequence, Union
+from openai import OpenAI, AsyncOpenAI, OpenAIError, DefaultAsyncHttpxClient
+from modules.embedding_cache import EmbeddingCache
+from modules.embedding_batcher import EmbeddingBatcher, EmbeddingError
+from modules.embedding_backend import EmbeddingBackend
+from modules.context_packer import ContextPacker
+from modules.document_processor import Chunk
+from modules.summarizer import Summarizer, SummaryError
+from modules.metrics import METRICS, timed
+
+try:
+    import httpx
+except ImportError:  # Newer openai releases ship their own HTTP stack; keep its default pool
+    httpx = None
+
+# Chat helpers return (or yield) this prefix instead of raising on API errors
+CHAT_ERROR_PREFIX = "Error communicating with AI"
+
+# Connection pool shared by every LLMInterface (all Streamlit sessions) in this process
+MAX_CONNECTIONS = 100
+MAX_KEEPALIVE_CONNECTIONS = 20
+KEEPALIVE_EXPIRY = 30.0
+
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_async_clients: Dict[str, AsyncOpenAI] = {}
+_shared_lock = threading.Lock()
+
+def _shared_loop() -> asyncio.AbstractEventLoop:
+    """
+    Process-wide event loop on a daemon thread. Async clients (and their pooled
+    connections) are bound to it, so sync callers hand coroutines over via run_async().
+    """
+    global _loop
+    with _shared_lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            threading.Thread(target=_loop.run_forever, name="llm-async", daemon=True).start()
+        return _loop
+
+def run_async(coro: Coroutine) -> Any:
+    """
+    Runs a coroutine on the shared loop and blocks the calling thread for its result.
+    """
+    return asyncio.run_coroutine_threadsafe(coro, _shared_loop()).result()
+
+def shared_async_client(api_key: str) -> AsyncOpenAI:
+    """
+    One AsyncOpenAI client per API key, reused across sessions instead of a client each.
+    """
+    with _shared_lock:
+        client = _async_clients.get(api_key)
+        if client is None:
+            http_client = None
+            if httpx is not None:
+                http_client = DefaultAsyncHttpxClient(limits=httpx.Limits(
+                    max_connections=MAX_CONNECTIONS,
+                    max_keepalive_connections=MAX_KEEPALIVE_CONNECTIONS,
+                    keepalive_expiry=KEEPALIVE_EXPIRY
+                ))
+            client = AsyncOpenAI(api_key=api_key, http_client=http_client)
+            _async_clients[api_key] = client
+        return client
 
 class LLMInterface:
-    def __init__(self, api_key: str, chat_model: str = "gpt-4o-mini", embed_model: str = "text-embedding-3-small"):
+    def __init__(
+        self,
+        api_key: str,
+        chat_model: str = "gpt-4o-mini",
+        embed_model: str = "text-embedding-3-small",
+        embedding_cache: Optional[EmbeddingCache] = None,
+        embed_batcher: Optional[EmbeddingBatcher] = None,
+        query_cache_size: int = 1024,
+        client: Optional[Any] = None,
+        async_client: Optional[Any] = None,
+        embedder: Optional[EmbeddingBackend] = None,
+        context_token_budget: int = 3000
+    ):
         """
         Initializes the OpenAI Client wrapper.
         
@@ -11,63 +88,324 @@ class LLMInterface:
             api_key (str): The OpenAI API Key.
             chat_model (str): The chat completion model to use (default: gpt-4o-mini).
             embed_model (str): The embedding model to use (default: text-embedding-3-small).
+            embedding_cache (EmbeddingCache, optional): Persistent cache consulted before calling the API.
+            embed_batcher (EmbeddingBatcher, optional): Batching/retry policy for embedding requests.
+            query_cache_size (int): In-process LRU size for query embeddings (0 disables it).
+            client / async_client (optional): OpenAI-compatible clients to use instead of the
+                real ones (e.g. the offline fakes in benchmarks/fake_backend.py).
+            embedder (EmbeddingBackend, optional): Local CPU embedding backend used instead of the
+                embeddings API (no network, cache or batching); chat still goes to the API.
+            context_token_budget (int): Max prompt tokens spent on retrieved sources (see ContextPacker).
         """
         if not api_key:
             raise ValueError("API Key must be provided to initialize LLMInterface.")
         
-        self.client = OpenAI(api_key=api_key)
+        self.client = client or OpenAI(api_key=api_key)
+        self.aclient = async_client or shared_async_client(api_key)
         self.model_chat = chat_model
         self.model_embed = embed_model
+        self.embedding_cache = embedding_cache
+        self.embed_batcher = embed_batcher or EmbeddingBatcher()
+        self.embedder = embedder
+        self.context_packer = ContextPacker(context_token_budget, count_tokens=self.embed_batcher.count_tokens)
+        # Long documents are condensed map-reduce style before the summary prompts (see Summarizer)
+        self.summarizer = Summarizer(self._anotes_chat, model=chat_model)
+
+        # Recent query embeddings: repeated searches/questions skip the network round trip
+        self.query_cache_size = query_cache_size
+        self._query_cache: "OrderedDict[str, List[float]]" = OrderedDict()
+        self._query_lock = threading.Lock()
+        self.query_hits = 0
+        self.query_misses = 0
 
+        # Background workers for calls the UI shouldn't block on (e.g. query embeddings)
+        self._executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="llm")
+
+    @property
+    def embedding_backend(self) -> str:
+        """
+        Name of the vector space embeddings come from (recorded by VectorStore.bind_embedding_backend).
+        """
+        return self.embedder.name if self.embedder is not None else f"openai:{self.model_embed}"
+
+    @timed("llm_embed_texts")
     def embed_texts(self, texts: List[str]) -> List[List[float]]:
         """
-        Generates embeddings for a batch of texts.
+        Generates embeddings for a list of texts (any length; split into token-bounded batches).
+        With an embedding cache, only texts not embedded before are sent to the API.
+
+        Raises:
+            EmbeddingError: A batch failed permanently or kept failing after retries.
         """
         if not texts:
             return []
-            
+        if self.embedder is not None:
+            return self._encode_local(texts)
+
+        cleaned_texts, results, pending = self._lookup_cached(texts)
+        if pending:
+            fetched = self._request_embeddings(pending, on_batch=self._cache_batch)
+            self._fill_results(cleaned_texts, results, pending, fetched)
+        return results
+
+    @timed("llm_embed_texts")
+    async def aembed_texts(self, texts: List[str]) -> List[List[float]]:
+        """
+        Async embed_texts(): batches are sent as concurrent requests on the shared client.
+        """
+        if not texts:
+            return []
+        if self.embedder is not None:
+            # CPU-bound and fast: not worth a thread hop
+            return self._encode_local(texts)
+
+        cleaned_texts, results, pending = self._lookup_cached(texts)
+        if pending:
+            async def request(batch: List[str]) -> List[List[float]]:
+                with METRICS.span("llm_embed_request"):
+                    response = await self.aclient.embeddings.create(input=batch, model=self.model_embed)
+                self._record_usage(self.model_embed, response, len(batch))
+                return [item.embedding for item in response.data]
+
+            fetched = await self.embed_batcher.aembed(pending, request, on_batch=self._cache_batch)
+            self._fill_results(cleaned_texts, results, pending, fetched)
+        return results
+
+    def _encode_local(self, texts: List[str]) -> List[List[float]]:
+        # One vectorized pass over the whole list, same newline cleanup as the API path
+        return self.embedder.encode([t.replace("\n", " ") for t in texts]).tolist()
+
+    def _lookup_cached(self, texts: List[str]) -> Tuple[List[str], List[Optional[List[float]]], List[str]]:
+        """
+        Cleans texts and resolves what the cache already has.
+
+        Returns:
+            Tuple: (cleaned texts, results with None for misses, unique texts still to embed).
+        """
         # Replace newlines with spaces to potentially improve embedding quality
         cleaned_texts = [t.replace("\n", " ") for t in texts]
-        
-        try:
-            response = self.client.embeddings.create(
-                input=cleaned_texts,
-                model=self.model_embed
-            )
+
+        if self.embedding_cache is None:
+            results = [None] * len(cleaned_texts)
+        else:
+            results = self.embedding_cache.get_many(self.model_embed, cleaned_texts)
+
+        # Identical texts within the batch are requested once
+        pending = list(dict.fromkeys(t for t, vec in zip(cleaned_texts, results) if vec is None))
+        return cleaned_texts, results, pending
+
+    def _cache_batch(self, texts: List[str], embeddings: List[List[float]]) -> None:
+        # Each batch is cached as soon as it lands, so a failure later on keeps earlier progress
+        if self.embedding_cache is not None:
+            self.embedding_cache.put_many(self.model_embed, texts, embeddings)
+
+    @staticmethod
+    def _fill_results(cleaned_texts: List[str], results: List, pending: List[str], fetched: List[List[float]]) -> None:
+        # Stitch API results back into input order
+        by_text = dict(zip(pending, fetched))
+        for i, text in enumerate(cleaned_texts):
+            if results[i] is None:
+                results[i] = by_text[text]
+
+    def _request_embeddings(self, texts: List[str], on_batch=None) -> List[List[float]]:
+        """
+        Calls the embeddings endpoint through the batcher (concurrent batches, retries on 429/5xx).
+        """
+        def request(batch: List[str]) -> List[List[float]]:
+            with METRICS.span("llm_embed_request"):
+                response = self.client.embeddings.create(
+                    input=batch,
+                    model=self.model_embed
+                )
+            self._record_usage(self.model_embed, response, len(batch))
             # Response data is guaranteed to be in same order as input list
             return [item.embedding for item in response.data]
-        except OpenAIError as e:
+
+        return self.embed_batcher.embed(texts, request, on_batch=on_batch)
+
+    @timed("llm_embed_query")
+    def embed_query(self, query: str) -> List[float]:
+        """
+        Generates embedding for a single query string. Returns [] on failure
+        (callers fall back to keyword-only retrieval).
+        """
+        if self.embedder is not None:
+            # Local encoding is cheaper than the LRU lookup
+            return self._encode_local([query])[0]
+        cached = self._cached_query(query)
+        if cached is not None:
+            return cached
+        return self._embed_query_uncached(query)
+
+    def _embed_query_uncached(self, query: str) -> List[float]:
+        try:
+            embeddings = self.embed_texts([query])
+        except EmbeddingError as e:
             print(f"Embedding Error: {e}")
             return []
+        if not embeddings:
+            return []
 
-    def embed_query(self, query: str) -> List[float]:
+        if self.query_cache_size > 0:
+            with self._query_lock:
+                self._query_cache[self._query_key(query)] = embeddings[0]
+                while len(self._query_cache) > self.query_cache_size:
+                    self._query_cache.popitem(last=False)
+        return embeddings[0]
+
+    def submit_embed_query(self, query: str) -> Future:
         """
-        Generates embedding for a single query string.
+        Starts embed_query in the background and returns a Future for its result,
+        so retrieval can proceed (e.g. VectorStore.hybrid_search) while the request is in flight.
+        Cached and locally embedded queries come back as an already completed Future.
         """
-        embeddings = self.embed_texts([query])
-        if embeddings:
-            return embeddings[0]
-        return []
+        cached = self._encode_local([query])[0] if self.embedder is not None else self._cached_query(query)
+        if cached is not None:
+            future = Future()
+            future.set_result(cached)
+            return future
+        return self._executor.submit(self._embed_query_uncached, query)
+
+    def query_cache_stats(self) -> Dict[str, Any]:
+        lookups = self.query_hits + self.query_misses
+        return {
+            "hits": self.query_hits,
+            "misses": self.query_misses,
+            "hit_rate": self.query_hits / lookups if lookups else 0.0,
+            "entries": len(self._query_cache),
+            "max_entries": self.query_cache_size
+        }
+
+    def _query_key(self, query: str) -> str:
+        # Same normalization as the persistent EmbeddingCache (whitespace runs collapsed)
+        return f"{self.model_embed}\0{' '.join(query.split())}"
+
+    def _cached_query(self, query: str) -> Optional[List[float]]:
+        if self.query_cache_size <= 0:
+            return None
+        key = self._query_key(query)
+        with self._query_lock:
+            vec = self._query_cache.get(key)
+            if vec is None:
+                self.query_misses += 1
+                return None
+            self._query_cache.move_to_end(key)
+            self.query_hits += 1
+            return vec
 
     def summarize_short(self, text: str, language: str = "tr") -> str:
         """
-        Generates a concise 1-2 sentence summary.
+        Generates a concise 1-2 sentence summary (of the whole document, see Summarizer).
         """
-        prompt = (
-            f"Please provide a concise summary (1-2 sentences) of the following text. "
-            f"Language: {language}.\n\nText:\n{text[:3000]}" # Limit chars to avoid huge costs
-        )
-        return self._call_chat(prompt, system_prompt="You are a helpful summarization assistant.")
+        try:
+            text = self._condensed(text)
+        except SummaryError as e:
+            return str(e)
+        return self._call_chat(*self._short_summary_prompts(text, language))
+
+    def stream_summarize_short(self, text: str, language: str = "tr") -> Iterator[str]:
+        """
+        Streaming summarize_short(): yields text deltas as they are generated.
+        """
+        return self._stream_summary(self._short_summary_prompts, text, language)
+
+    async def asummarize_short(self, text: Union[str, Sequence[Chunk]], language: str = "tr") -> str:
+        try:
+            text = await self.summarizer.acondense(text)
+        except SummaryError as e:
+            return str(e)
+        return await self._acall_chat(*self._short_summary_prompts(text, language))
 
     def summarize_detailed(self, text: str, language: str = "tr") -> str:
         """
-        Generates a detailed bullet-point summary.
+        Generates a detailed bullet-point summary (of the whole document, see Summarizer).
+        """
+        try:
+            text = self._condensed(text)
+        except SummaryError as e:
+            return str(e)
+        return self._call_chat(*self._detailed_summary_prompts(text, language))
+
+    def stream_summarize_detailed(self, text: str, language: str = "tr") -> Iterator[str]:
+        """
+        Streaming summarize_detailed(): yields text deltas as they are generated.
         """
+        return self._stream_summary(self._detailed_summary_prompts, text, language)
+
+    async def asummarize_detailed(self, text: str, language: str = "tr") -> str:
+        try:
+            text = await self.summarizer.acondense(text)
+        except SummaryError as e:
+            return str(e)
+        return await self._acall_chat(*self._detailed_summary_prompts(text, language))
+
+    def _condensed(self, text: str) -> str:
+        """
+        Sync Summarizer.acondense(); short texts skip the hop to the shared loop.
+        """
+        if isinstance(text, str) and len(text) <= self.summarizer.single_pass_chars:
+            return text
+        return run_async(self.summarizer.acondense(text))
+
+    def _stream_summary(self, prompts_fn, text: str, language: str) -> Iterator[str]:
+        # Map/reduce runs on first iteration, then the final summary streams
+        try:
+            text = self._condensed(text)
+        except SummaryError as e:
+            yield str(e)
+            return
+        yield from self._stream_chat(*prompts_fn(text, language))
+
+    async def _anotes_chat(self, prompt: str, system_prompt: str) -> str:
+        # Summarizer's chat: failures raise, so error messages are never cached as notes
+        notes = await self._acall_chat(prompt, system_prompt=system_prompt, temperature=0.1)
+        if notes.startswith(CHAT_ERROR_PREFIX):
+            raise SummaryError(notes)
+        return notes
+
+    @staticmethod
+    def _short_summary_prompts(text: str, language: str) -> Tuple[str, str]:
+        # `text` is bounded by Summarizer.single_pass_chars (the document or its notes)
+        prompt = (
+            f"Please provide a concise summary (1-2 sentences) of the following text. "
+            f"Language: {language}.\n\nText:\n{text}"
+        )
+        return prompt, "You are a helpful summarization assistant."
+
+    @staticmethod
+    def _detailed_summary_prompts(text: str, language: str) -> Tuple[str, str]:
         prompt = (
             f"Please provide a detailed summary of the following text using bullet points. "
-            f"Capture key concepts. Language: {language}.\n\nText:\n{text[:4000]}"
+            f"Capture key concepts. Language: {language}.\n\nText:\n{text}"
         )
-        return self._call_chat(prompt, system_prompt="You are a detailed analyzer.")
+        return prompt, "You are a detailed analyzer."
+
+    def embed_and_summarize(
+        self,
+        chunks: List[str],
+        text: Union[str, Sequence[Chunk]],
+        language: str = "tr"
+    ) -> Tuple[List[List[float]], str]:
+        """
+        Ingest path: embeds the chunks and writes the short summary concurrently,
+        so an upload takes max(embed, summarize) rather than their sum.
+
+        Args:
+            chunks (List[str]): Texts to embed.
+            text (str | Sequence[Chunk]): What to summarize: the document text, or all its chunk
+                records (no whole-text copy is needed, see Summarizer.acondense).
+
+        Returns:
+            Tuple: (chunk embeddings, short summary).
+
+        Raises:
+            EmbeddingError: Embedding failed after retries.
+        """
+        async def both():
+            return await asyncio.gather(self.aembed_texts(chunks), self.asummarize_short(text, language))
+
+        embeddings, summary = run_async(both())
+        return embeddings, summary
 
     def answer_question(
         self, 
@@ -89,11 +427,92 @@ class LLMInterface:
             Dict: {'answer': str, 'citations': List[Dict]}
         """
         if not contexts:
-            return {
-                "answer": "I don't have enough information in the uploaded documents to answer this." if language == "en" else "Yüklenen belgelerde bu soruyu yanıtlamak için yeterli bilgi bulunamadı.",
-                "citations": []
-            }
+            return self._no_context_answer(language)
+
+        sources = self.pack_contexts(contexts)
+        user_content, sys_prompt, temp = self._answer_prompts(question, sources, language, debug_force_wrong_citation)
+        answer = self._call_chat(user_content, system_prompt=sys_prompt, temperature=temp)
         
+        return {
+            "answer": answer,
+            "citations": sources[:3] # Return top verified sources (user sees what should have been used)
+        }
+
+    def stream_answer_question(
+        self,
+        question: str,
+        contexts: List[Dict[str, Any]],
+        language: str = "tr",
+        debug_force_wrong_citation: bool = False
+    ) -> Dict[str, Any]:
+        """
+        Streaming answer_question(). Citations are known before generation starts,
+        so they are returned immediately alongside an iterator over the answer deltas
+        (e.g. for st.write_stream).
+
+        Returns:
+            Dict: {'citations': List[Dict], 'stream': Iterator[str]}
+        """
+        if not contexts:
+            empty = self._no_context_answer(language)
+            return {"citations": [], "stream": iter([empty["answer"]])}
+
+        sources = self.pack_contexts(contexts)
+        user_content, sys_prompt, temp = self._answer_prompts(question, sources, language, debug_force_wrong_citation)
+        return {
+            "citations": sources[:3],
+            "stream": self._stream_chat(user_content, system_prompt=sys_prompt, temperature=temp)
+        }
+
+    async def aanswer_question(
+        self,
+        question: str,
+        contexts: List[Dict[str, Any]],
+        language: str = "tr",
+        debug_force_wrong_citation: bool = False
+    ) -> Dict[str, Any]:
+        """
+        Async answer_question() on the shared client.
+        """
+        if not contexts:
+            return self._no_context_answer(language)
+
+        sources = self.pack_contexts(contexts)
+        user_content, sys_prompt, temp = self._answer_prompts(question, sources, language, debug_force_wrong_citation)
+        answer = await self._acall_chat(user_content, system_prompt=sys_prompt, temperature=temp)
+        return {
+            "answer": answer,
+            "citations": sources[:3]
+        }
+
+    def pack_contexts(self, contexts: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        The sources an answer prompt is built from: retrieved chunks with overlapping/adjacent
+        ones merged and the rest cut to the context token budget (SOURCE i = i-th span).
+        """
+        sources = self.context_packer.pack(contexts)
+        if METRICS.enabled:
+            METRICS.inc("llm_context_chunks", len(contexts))
+            METRICS.inc("llm_context_sources", len(sources))
+        return sources
+
+    @staticmethod
+    def _no_context_answer(language: str) -> Dict[str, Any]:
+        return {
+            "answer": "I don't have enough information in the uploaded documents to answer this." if language == "en" else "Yüklenen belgelerde bu soruyu yanıtlamak için yeterli bilgi bulunamadı.",
+            "citations": []
+        }
+
+    @staticmethod
+    def _answer_prompts(
+        question: str,
+        contexts: List[Dict[str, Any]],
+        language: str,
+        debug_force_wrong_citation: bool
+    ) -> Tuple[str, str, float]:
+        """
+        Builds (user prompt, system prompt, temperature) for a grounded answer.
+        """
         # --- INTENTIONAL AI FAILURE MECHANISM (For Project Report) ---
         # Goal: Make the AI fail to ground its answer correctly.
         active_contexts = contexts.copy()
@@ -125,27 +544,92 @@ class LLMInterface:
             context_str += f"--- SOURCE {i+1} ({ctx.get('filename', 'Unknown')}) ---\n{ctx.get('chunk_text', '')}\n\n"
 
         user_content = f"Sources:\n{context_str}\n\nQuestion: {question}"
-
-        answer = self._call_chat(user_content, system_prompt=sys_prompt, temperature=temp)
-        
-        return {
-            "answer": answer,
-            "citations": contexts[:3] # Return top verified contexts (user sees what should have been used)
-        }
+        return user_content, sys_prompt, temp
 
     def _call_chat(self, user_prompt: str, system_prompt: str = "You are a helpful assistant.", temperature: float = 0.1) -> str:
         """
         Helper method to call OpenAI ChatCompletion with error handling.
         """
         try:
-            response = self.client.chat.completions.create(
+            with METRICS.span("llm_chat"):
+                response = self.client.chat.completions.create(
+                    model=self.model_chat,
+                    messages=[
+                        {"role": "system", "content": system_prompt},
+                        {"role": "user", "content": user_prompt}
+                    ],
+                    temperature=temperature
+                )
+            self._record_usage(self.model_chat, response)
+            return response.choices[0].message.content.strip()
+        except OpenAIError as e:
+            return f"{CHAT_ERROR_PREFIX}: {str(e)}"
+
+    def _stream_chat(self, user_prompt: str, system_prompt: str = "You are a helpful assistant.", temperature: float = 0.1) -> Iterator[str]:
+        """
+        Streaming _call_chat(): yields content deltas. The request is sent on first iteration.
+        """
+        # Token usage only arrives on a stream when asked for; skip it while metrics are off
+        extra = {"stream_options": {"include_usage": True}} if METRICS.enabled else {}
+        start = time.perf_counter()
+        first = True
+        try:
+            stream = self.client.chat.completions.create(
                 model=self.model_chat,
                 messages=[
                     {"role": "system", "content": system_prompt},
                     {"role": "user", "content": user_prompt}
                 ],
-                temperature=temperature
+                temperature=temperature,
+                stream=True,
+                **extra
             )
+            for chunk in stream:
+                # The final chunk(s) carry no content (finish_reason / usage only)
+                if chunk.choices and chunk.choices[0].delta.content:
+                    if first:
+                        METRICS.observe("llm_chat_first_token", time.perf_counter() - start)
+                        first = False
+                    yield chunk.choices[0].delta.content
+                elif getattr(chunk, "usage", None) is not None:
+                    self._record_usage(self.model_chat, chunk)
+            METRICS.observe("llm_chat_stream", time.perf_counter() - start)
+        except OpenAIError as e:
+            METRICS.inc("llm_chat_stream_errors")
+            yield f"{CHAT_ERROR_PREFIX}: {str(e)}"
+
+    @staticmethod
+    def _record_usage(model: str, response: Any, texts: int = 0) -> None:
+        """
+        Counts the tokens an API response reports (and embedded texts) under the model's label.
+        """
+        if not METRICS.enabled:
+            return
+        if texts:
+            METRICS.inc("llm_embedded_texts", texts, model=model)
+        usage = getattr(response, "usage", None)
+        if usage is None:
+            return
+        for kind in ("prompt", "completion"):
+            tokens = getattr(usage, f"{kind}_tokens", None)
+            if tokens:
+                METRICS.inc("llm_tokens", tokens, model=model, kind=kind)
+
+    async def _acall_chat(self, user_prompt: str, system_prompt: str = "You are a helpful assistant.", temperature: float = 0.1) -> str:
+        """
+        Async _call_chat() on the shared client.
+        """
+        try:
+            with METRICS.span("llm_chat"):
+                response = await self.aclient.chat.completions.create(
+                    model=self.model_chat,
+                    messages=[
+                        {"role": "system", "content": system_prompt},
+                        {"role": "user", "content": user_prompt}
+                    ],
+                    temperature=temperature
+                )
+            self._record_usage(self.model_chat, response)
             return response.choices[0].message.content.strip()
         except OpenAIError as e:
-            return f"Error communicating with AI: {str(e)}"
+            return f"{CHAT_ERROR_PREFIX}: {str(e)}"
@@ -0,0 +1,293 @@
+import os
+import time
+import bisect
+import inspect
+import functools
+import threading
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List, Dict, Any, Optional, Tuple, Callable, Deque
+
+# Latency histogram bounds in seconds (Prometheus `le` buckets)
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+# Recent samples kept per timer for the p50/p95/p99 shown in the app
+RECENT_SAMPLES = 1024
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+def _label_key(labels: Dict[str, Any]) -> LabelKey:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+class _Timer:
+    __slots__ = ("counts", "total", "count", "recent")
+
+    def __init__(self, n_buckets: int):
+        self.counts = [0] * (n_buckets + 1)  # last slot is +Inf
+        self.total = 0.0
+        self.count = 0
+        self.recent: Deque[float] = deque(maxlen=RECENT_SAMPLES)
+
+
+class _NullSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc) -> bool:
+        return False
+
+_NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    __slots__ = ("metrics", "name", "labels", "start")
+
+    def __init__(self, metrics: "Metrics", name: str, labels: Dict[str, Any]):
+        self.metrics = metrics
+        self.name = name
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        self.metrics.observe(self.name, time.perf_counter() - self.start, **self.labels)
+        if exc_type is not None:
+            self.metrics.inc(self.name + "_errors", **self.labels)
+        return False
+
+
+class Metrics:
+    def __init__(self, enabled: bool = False, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        """
+        Process-wide timers (latency histograms) and counters for the hot paths.
+        While disabled, every recording call returns after one attribute check.
+
+        Args:
+            enabled (bool): Start recording immediately.
+            buckets (Tuple[float]): Histogram upper bounds in seconds.
+        """
+        self.enabled = enabled
+        self.buckets = tuple(sorted(buckets))
+        self._lock = threading.Lock()
+        self._timers: Dict[str, Dict[LabelKey, _Timer]] = {}
+        self._counters: Dict[str, Dict[LabelKey, float]] = {}
+
+    def enable(self) -> None:
+        self.enabled = True
+
+    def disable(self) -> None:
+        self.enabled = False
+
+    def reset(self) -> None:
+        with self._lock:
+            self._timers.clear()
+            self._counters.clear()
+
+    def inc(self, name: str, value: float = 1.0, **labels: Any) -> None:
+        """
+        Adds `value` to the counter `name` (exported as `<name>_total`).
+        """
+        if not self.enabled:
+            return
+        key = _label_key(labels)
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0.0) + value
+
+    def observe(self, name: str, seconds: float, **labels: Any) -> None:
+        """
+        Records one duration in the timer `name` (exported as `<name>_seconds`).
+        """
+        if not self.enabled:
+            return
+        key = _label_key(labels)
+        with self._lock:
+            series = self._timers.setdefault(name, {})
+            timer = series.get(key)
+            if timer is None:
+                timer = series[key] = _Timer(len(self.buckets))
+            timer.counts[bisect.bisect_left(self.buckets, seconds)] += 1
+            timer.total += seconds
+            timer.count += 1
+            timer.recent.append(seconds)
+
+    def span(self, name: str, **labels: Any):
+        """
+        Context manager timing its block into `name`; exceptions also count `<name>_errors`.
+        """
+        if not self.enabled:
+            return _NULL_SPAN
+        return _Span(self, name, labels)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Current values for display: timers with count, mean and recent p50/p95/p99 (ms),
+        and counters, keyed by `name{label=value,...}`.
+        """
+        with self._lock:
+            timers = {
+                _series_name(name, key): (t.count, t.total, sorted(t.recent))
+                for name, series in self._timers.items() for key, t in series.items()
+            }
+            counters = {
+                _series_name(name, key): value
+                for name, series in self._counters.items() for key, value in series.items()
+            }
+
+        def pct(samples: List[float], q: float) -> float:
+            return samples[min(len(samples) - 1, int(q * len(samples)))] * 1000.0
+
+        return {
+            "enabled": self.enabled,
+            "timers": {
+                name: {
+                    "count": count,
+                    "total_s": total,
+                    "mean_ms": total / count * 1000.0 if count else 0.0,
+                    "p50_ms": pct(recent, 0.50) if recent else 0.0,
+                    "p95_ms": pct(recent, 0.95) if recent else 0.0,
+                    "p99_ms": pct(recent, 0.99) if recent else 0.0
+                }
+                for name, (count, total, recent) in sorted(timers.items())
+            },
+            "counters": dict(sorted(counters.items()))
+        }
+
+    def to_prometheus(self, prefix: str = "docassist_") -> str:
+        """
+        All series in the Prometheus text exposition format (version 0.0.4).
+        """
+        lines: List[str] = []
+        with self._lock:
+            for name in sorted(self._timers):
+                metric = f"{prefix}{name}_seconds"
+                lines.append(f"# TYPE {metric} histogram")
+                for key, timer in sorted(self._timers[name].items()):
+                    cumulative = 0
+                    for bound, n in zip(self.buckets + (float("inf"),), timer.counts):
+                        cumulative += n
+                        le = "+Inf" if bound == float("inf") else repr(bound)
+                        lines.append(f"{metric}_bucket{_format_labels(key + (('le', le),))} {cumulative}")
+                    lines.append(f"{metric}_sum{_format_labels(key)} {timer.total!r}")
+                    lines.append(f"{metric}_count{_format_labels(key)} {timer.count}")
+            for name in sorted(self._counters):
+                metric = f"{prefix}{name}_total"
+                lines.append(f"# TYPE {metric} counter")
+                for key, value in sorted(self._counters[name].items()):
+                    lines.append(f"{metric}{_format_labels(key)} {value!r}")
+        return "\n".join(lines) + "\n"
+
+
+def _series_name(name: str, key: LabelKey) -> str:
+    if not key:
+        return name
+    return name + "{" + ",".join(f"{k}={v}" for k, v in key) + "}"
+
+def _format_labels(key: LabelKey) -> str:
+    if not key:
+        return ""
+    escaped = (
+        (k, v.replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")) for k, v in key
+    )
+    return "{" + ",".join(f'{k}="{v}"' for k, v in escaped) + "}"
+
+
+# Shared by every module; METRICS_ENABLED=1 turns it on at import (app.py enables it as well)
+METRICS = Metrics(enabled=os.getenv("METRICS_ENABLED", "0") == "1")
+
+def timed(name: str, metrics: Optional[Metrics] = None) -> Callable:
+    """
+    Decorator timing each call of a function, coroutine function or generator function
+    into `name`. Generators are timed by the work done inside them (summed over next()
+    calls), not by how long the consumer holds on to them.
+    """
+    def decorate(fn: Callable) -> Callable:
+        if inspect.isgeneratorfunction(fn):
+            @functools.wraps(fn)
+            def gen_wrapper(*args, **kwargs):
+                registry = metrics or METRICS
+                if not registry.enabled:
+                    return fn(*args, **kwargs)
+                return _timed_generator(registry, name, fn(*args, **kwargs))
+            return gen_wrapper
+
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                registry = metrics or METRICS
+                if not registry.enabled:
+                    return await fn(*args, **kwargs)
+                with _Span(registry, name, {}):
+                    return await fn(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            registry = metrics or METRICS
+            if not registry.enabled:
+                return fn(*args, **kwargs)
+            with _Span(registry, name, {}):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+def _timed_generator(registry: Metrics, name: str, gen):
+    elapsed = 0.0
+    failed = False
+    try:
+        while True:
+            start = time.perf_counter()
+            try:
+                item = next(gen)
+            except StopIteration as stop:
+                elapsed += time.perf_counter() - start
+                return stop.value
+            except BaseException:
+                elapsed += time.perf_counter() - start
+                failed = True
+                raise
+            elapsed += time.perf_counter() - start
+            yield item
+    finally:
+        gen.close()
+        registry.observe(name, elapsed)
+        if failed:
+            registry.inc(name + "_errors")
+
+
+_server: Optional[ThreadingHTTPServer] = None
+_server_lock = threading.Lock()
+
+def serve(port: int, host: str = "127.0.0.1", metrics: Optional[Metrics] = None) -> ThreadingHTTPServer:
+    """
+    Serves `/metrics` for Prometheus scraping from a daemon thread. Idempotent per
+    process, so a Streamlit rerun doesn't try to bind the port again.
+    Only reachable from this machine by default; pass host="0.0.0.0" to expose it
+    (the endpoint has no authentication).
+    """
+    global _server
+    registry = metrics or METRICS
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = registry.to_prometheus().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", PROMETHEUS_CONTENT_TYPE)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass  # scrapes every few seconds would flood the console
+
+    with _server_lock:
+        if _server is None:
+            _server = ThreadingHTTPServer((host, port), Handler)
+            threading.Thread(target=_server.serve_forever, name="metrics-http", daemon=True).start()
+        return _server
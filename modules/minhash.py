@@ -0,0 +1,132 @@
+import copy
+import zlib
+import numpy as np
+from typing import List, Dict, Optional, Tuple, Hashable, Callable
+from modules.keyword_index import tokenize
+
+# Mersenne prime for the (a * x + b) mod P permutations
+_PRIME = np.uint64((1 << 61) - 1)
+
+
+class MinHashLSH:
+    def __init__(
+        self,
+        threshold: float = 0.9,
+        num_perm: int = 64,
+        bands: int = 16,
+        shingle_size: int = 3,
+        seed: int = 1
+    ):
+        """
+        Near-duplicate detection over chunk texts: MinHash signatures of word shingles,
+        bucketed by LSH bands so a lookup only compares against a few candidates.
+        Two texts are near-duplicates when their estimated Jaccard similarity (the
+        fraction of equal signature slots) is at least `threshold`.
+
+        Args:
+            threshold (float): Minimum estimated Jaccard similarity of the shingle sets.
+            num_perm (int): Signature length (hash permutations).
+            bands (int): LSH bands; `num_perm` must be divisible by it.
+            shingle_size (int): Words per shingle.
+            seed (int): Seed of the permutation coefficients (fixed, so signatures are stable).
+        """
+        if num_perm % bands:
+            raise ValueError("num_perm must be divisible by bands.")
+
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows_per_band = num_perm // bands
+        self.shingle_size = shingle_size
+
+        rng = np.random.default_rng(seed)
+        self._a = rng.integers(1, 1 << 32, size=(num_perm, 1), dtype=np.uint64)
+        self._b = rng.integers(0, 1 << 32, size=(num_perm, 1), dtype=np.uint64)
+
+        # key -> signature, and per band: band bytes -> keys sharing it
+        self._signatures: Dict[Hashable, np.ndarray] = {}
+        self._buckets: List[Dict[bytes, List[Hashable]]] = [{} for _ in range(bands)]
+
+    def __len__(self) -> int:
+        return len(self._signatures)
+
+    def copy(self) -> "MinHashLSH":
+        """
+        Independent copy of the index (signatures are never modified, so they are shared).
+        """
+        other = copy.copy(self)
+        other._signatures = dict(self._signatures)
+        other._buckets = [{band: list(keys) for band, keys in bucket.items()} for bucket in self._buckets]
+        return other
+
+    def signature(self, text: str) -> Optional[np.ndarray]:
+        """
+        MinHash signature (num_perm,) uint32 of a text, None if it has no words.
+        """
+        tokens = tokenize(text)
+        if not tokens:
+            return None
+        k = min(self.shingle_size, len(tokens))
+        shingles = {" ".join(tokens[i:i + k]) for i in range(len(tokens) - k + 1)}
+        hashes = np.fromiter((zlib.crc32(s.encode("utf-8")) for s in shingles), dtype=np.uint64, count=len(shingles))
+
+        # (num_perm, 1) x (n_shingles,) -> min over shingles per permutation
+        permuted = (self._a * hashes + self._b) % _PRIME
+        return (permuted.min(axis=1) & np.uint64(0xFFFFFFFF)).astype(np.uint32)
+
+    def signatures(self, texts: List[str]) -> List[Optional[np.ndarray]]:
+        return [self.signature(t) for t in texts]
+
+    def add(self, key: Hashable, signature: Optional[np.ndarray]) -> None:
+        if signature is None or key in self._signatures:
+            return
+        self._signatures[key] = signature
+        for band, bucket in zip(self._bands(signature), self._buckets):
+            bucket.setdefault(band, []).append(key)
+
+    def remove(self, key: Hashable) -> None:
+        signature = self._signatures.pop(key, None)
+        if signature is None:
+            return
+        for band, bucket in zip(self._bands(signature), self._buckets):
+            keys = bucket.get(band)
+            if keys is None:
+                continue
+            keys.remove(key)
+            if not keys:
+                del bucket[band]
+
+    def query(
+        self,
+        signature: Optional[np.ndarray],
+        exclude: Optional[Callable[[Hashable], bool]] = None
+    ) -> Optional[Tuple[Hashable, float]]:
+        """
+        Most similar indexed key at or above the threshold.
+
+        Args:
+            signature (np.ndarray): Signature of the text to look up.
+            exclude (Callable, optional): Keys it returns True for are never matched.
+
+        Returns:
+            Tuple or None: (key, estimated Jaccard similarity).
+        """
+        if signature is None:
+            return None
+        candidates = {key for band, bucket in zip(self._bands(signature), self._buckets) for key in bucket.get(band, ())}
+
+        best, best_sim = None, self.threshold
+        for key in candidates:
+            if exclude is not None and exclude(key):
+                continue
+            sim = float(np.mean(self._signatures[key] == signature))
+            # Ties go to the smallest key, so the result doesn't depend on set order
+            if sim > best_sim or (sim == best_sim and (best is None or key < best)):
+                best, best_sim = key, sim
+        return (best, best_sim) if best is not None else None
+
+    def _bands(self, signature: np.ndarray) -> List[bytes]:
+        return [
+            signature[i * self.rows_per_band:(i + 1) * self.rows_per_band].tobytes()
+            for i in range(self.bands)
+        ]
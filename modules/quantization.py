@@ -0,0 +1,82 @@
+import numpy as np
+from typing import Dict, Any, Optional
+
+class Quantizer:
+    MODES = ("float16", "int8")
+
+    def __init__(self, mode: str):
+        """
+        Compact codes for unit-normalized embedding rows, used for the search scan.
+
+        Modes:
+        - float16: half precision, 2 bytes/dim.
+        - int8: per-dimension symmetric scaling (scale[d] = max|x[:, d]| / 127), 1 byte/dim.
+
+        Args:
+            mode (str): "float16" or "int8".
+        """
+        if mode not in self.MODES:
+            raise ValueError(f"Unsupported quantization mode: {mode}. Use one of {self.MODES}.")
+        self.mode = mode
+        self.scale: Optional[np.ndarray] = None  # int8 only
+
+    @property
+    def dtype(self) -> np.dtype:
+        return np.dtype('float16' if self.mode == "float16" else 'int8')
+
+    @property
+    def is_fitted(self) -> bool:
+        return self.mode == "float16" or self.scale is not None
+
+    def fit(self, vectors: np.ndarray) -> None:
+        """
+        Calibrates int8 scales from a sample of rows (no-op for float16).
+        Rows added later that fall outside the calibrated range are clipped.
+        """
+        if self.mode != "int8":
+            return
+        max_abs = np.abs(vectors).max(axis=0).astype('float32')
+        max_abs[max_abs == 0] = 1.0
+        self.scale = max_abs / 127.0
+
+    def encode(self, vectors: np.ndarray) -> np.ndarray:
+        """
+        Encodes float32 rows (N, Dim) into codes (N, Dim).
+        """
+        if not self.is_fitted:
+            self.fit(vectors)
+        if self.mode == "float16":
+            return vectors.astype('float16')
+        return np.clip(np.rint(vectors / self.scale), -127, 127).astype('int8')
+
+    def score(self, codes: np.ndarray, queries: np.ndarray, batch_size: int = 32768) -> np.ndarray:
+        """
+        Approximate dot products of queries (Dim,) or (N_queries, Dim) against coded rows.
+        Codes are widened to float32 one batch at a time so no (N, Dim) float32 copy is made.
+        """
+        # Fold the int8 scale into the query instead of decoding every row
+        q = queries * self.scale if self.mode == "int8" else queries
+        q = q.astype('float32', copy=False)
+
+        out_shape = (len(codes),) if q.ndim == 1 else (len(q), len(codes))
+        scores = np.empty(out_shape, dtype='float32')
+        for start in range(0, len(codes), batch_size):
+            block = codes[start:start + batch_size].astype('float32')
+            scores[..., start:start + batch_size] = q @ block.T
+        return scores
+
+    def bytes_per_vector(self, dim: int) -> int:
+        return dim * self.dtype.itemsize
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "mode": self.mode,
+            "scale": None if self.scale is None else self.scale.tolist()
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "Quantizer":
+        quantizer = cls(data["mode"])
+        if data.get("scale") is not None:
+            quantizer.scale = np.asarray(data["scale"], dtype='float32')
+        return quantizer
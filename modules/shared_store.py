@@ -0,0 +1,72 @@
+import threading
+from contextlib import contextmanager
+from typing import List, Dict, Optional, Tuple, Iterator, Iterable
+from modules.vector_store import VectorStore
+
+
+class SharedStore:
+    def __init__(self, store: Optional[VectorStore] = None):
+        """
+        One VectorStore shared by every session of the process, with snapshot isolation.
+        Readers take the current version with snapshot() and search it without locks; it
+        never changes under them. Writers build the next version on a fork() of the current
+        one (vectors are shared, not copied) and publish it atomically when they are done.
+        Writers are serialized; a failed write publishes nothing.
+
+        Args:
+            store (VectorStore, optional): Initial contents (e.g. loaded from disk).
+        """
+        self._current = store if store is not None else VectorStore()
+        self._write_lock = threading.Lock()
+        self.publishes = 0
+
+    def snapshot(self) -> VectorStore:
+        """
+        The current version. Treat it as read-only: changes go through write().
+        """
+        # A single attribute read: always a complete, published version
+        return self._current
+
+    @property
+    def version(self) -> int:
+        return self._current.version
+
+    @contextmanager
+    def write(self) -> Iterator[VectorStore]:
+        """
+        Context manager yielding a private copy of the current version to modify. On a clean
+        exit it replaces the current version; readers see it on their next snapshot().
+
+        Example:
+            with shared.write() as store:
+                store.replace_document(...)
+                store.save(STORE_DIR)
+        """
+        with self._write_lock:
+            draft = self._current.fork()
+            yield draft
+            self._current = draft
+            self.publishes += 1
+
+    def near_duplicates(
+        self,
+        doc_id: str,
+        chunks: List[str],
+        exclude: Iterable[Optional[str]] = ()
+    ) -> List[Optional[Tuple[str, int]]]:
+        """
+        VectorStore.near_duplicates() on the current version. Runs under the write lock,
+        since it may build the version's near-duplicate index (which later forks copy).
+        Writers should recheck the result on their draft: targets can be removed meanwhile.
+        """
+        with self._write_lock:
+            return self._current.near_duplicates(doc_id, chunks, exclude)
+
+    def stats(self) -> Dict[str, int]:
+        store = self._current
+        return {
+            "version": store.version,
+            "publishes": self.publishes,
+            "live_chunks": store.num_live,
+            "documents": len(store.documents())
+        }
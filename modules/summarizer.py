@@ -0,0 +1,181 @@
+import asyncio
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import List, Dict, Any, Optional, Callable, Awaitable, Sequence, Union
+from modules.document_processor import DocumentProcessor, Chunk
+from modules.metrics import METRICS, timed
+
+# Language-neutral notes: the map/reduce stages are shared by every language and summary type
+MAP_PROMPT = (
+    "Summarize the following section of a longer document as concise bullet-point notes. "
+    "Keep names, numbers, dates and definitions. Write in the section's own language.\n\nSection:\n{text}"
+)
+REDUCE_PROMPT = (
+    "The following are notes on consecutive sections of one document. Merge them into a single set "
+    "of concise bullet-point notes, in document order, without losing names, numbers, dates or "
+    "definitions. Write in the notes' own language.\n\nNotes:\n{text}"
+)
+NOTES_SYSTEM_PROMPT = "You are a careful note-taker. Never add information that is not in the text."
+
+
+class SummaryError(Exception):
+    """
+    A map/reduce request failed; nothing is cached for it.
+    """
+
+
+class Summarizer:
+    def __init__(
+        self,
+        chat: Callable[[str, str], Awaitable[str]],
+        model: str = "",
+        processor: Optional[DocumentProcessor] = None,
+        single_pass_chars: int = 12000,
+        section_chars: int = 12000,
+        fan_in: int = 8,
+        max_concurrency: int = 16,
+        cache_size: int = 4096
+    ):
+        """
+        Map-reduce condensing of long documents for the summary prompts. Texts up to
+        `single_pass_chars` are summarized directly. Longer ones are split with the chunker
+        into sections that are condensed into notes concurrently (map), then groups of
+        `fan_in` notes are merged level by level (reduce) until they fit in one prompt.
+        Each level runs its requests concurrently, so latency grows with the tree depth
+        (log_fan_in of the section count) rather than the page count, as long as a level
+        fits in `max_concurrency`.
+
+        Notes are cached by content hash of their input, independently of the target
+        language and summary type: a second summary of the same document (or of a changed
+        document's unchanged sections) only pays for what changed plus the final prompt.
+
+        Args:
+            chat (Callable): Coroutine function (prompt, system prompt) -> text; raises SummaryError on failure.
+            model (str): Chat model name, part of the cache key.
+            processor (DocumentProcessor, optional): Chunker used to split sections.
+            single_pass_chars (int): Largest text (or joined notes) sent to the final prompt as is.
+            section_chars (int): Characters per map section.
+            fan_in (int): Notes merged per reduce request.
+            max_concurrency (int): Max chat requests in flight per document.
+            cache_size (int): Max cached notes (least recently used are evicted).
+        """
+        if fan_in < 2:
+            raise ValueError("fan_in must be at least 2.")
+        self.chat = chat
+        self.model = model
+        self.processor = processor or DocumentProcessor()
+        self.single_pass_chars = single_pass_chars
+        self.section_chars = section_chars
+        self.fan_in = fan_in
+        self.max_concurrency = max_concurrency
+        self.cache_size = cache_size
+
+        self._cache: "OrderedDict[str, str]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @timed("llm_summarize_condense")
+    async def acondense(self, text: Union[str, Sequence[Chunk]]) -> str:
+        """
+        The text a summary prompt should see: `text` itself if it is short enough,
+        otherwise ordered notes covering the whole document.
+
+        Args:
+            text (str | Sequence[Chunk]): The document text, or its chunks in order (e.g. from
+                iter_chunks()); sections are then joined from the chunks only while their map
+                request runs, so the whole text is never held at once.
+
+        Raises:
+            SummaryError: A map/reduce request failed.
+        """
+        if not isinstance(text, str):
+            chunks = list(text)
+            if not chunks or chunks[-1].end - chunks[0].start <= self.single_pass_chars:
+                return self.processor.join_chunks(chunks)
+            sections = self._chunk_sections(chunks)
+        elif len(text) <= self.single_pass_chars:
+            return text
+        else:
+            sections = self.processor.chunk_text(text, chunk_size=self.section_chars, overlap=0)
+
+        # One slot pool per document: a level never has more than max_concurrency requests in flight
+        slots = asyncio.Semaphore(self.max_concurrency)
+
+        # 1. Map: sections -> notes
+        notes = await asyncio.gather(*(self._notes("map", section, slots) for section in sections))
+
+        # 2. Reduce: merge groups of fan_in notes until they fit in one prompt
+        while len(notes) > 1 and len("\n\n".join(notes)) > self.single_pass_chars:
+            groups = [notes[i:i + self.fan_in] for i in range(0, len(notes), self.fan_in)]
+            notes = await asyncio.gather(*(
+                self._notes("reduce", "\n\n".join(group), slots) if len(group) > 1 else self._passthrough(group[0])
+                for group in groups
+            ))
+        return "\n\n".join(notes)
+
+    def _chunk_sections(self, chunks: List[Chunk]) -> List[List[Chunk]]:
+        """
+        Groups consecutive chunks into runs covering at most `section_chars` of text
+        (a single longer chunk is a section of its own).
+        """
+        sections: List[List[Chunk]] = []
+        for chunk in chunks:
+            if sections and chunk.end - sections[-1][0].start <= self.section_chars:
+                sections[-1].append(chunk)
+            else:
+                sections.append([chunk])
+        return sections
+
+    async def _notes(self, stage: str, section: Union[str, List[Chunk]], slots: asyncio.Semaphore) -> str:
+        async with slots:
+            # Chunk runs are joined here, so only in-flight sections exist as text
+            text = section if isinstance(section, str) else self.processor.join_chunks(section)
+            key = self._key(stage, text)
+            cached = self._cached(key)
+            if cached is not None:
+                return cached
+
+            prompt = (MAP_PROMPT if stage == "map" else REDUCE_PROMPT).format(text=text)
+            with METRICS.span(f"llm_summarize_{stage}"):
+                notes = await self.chat(prompt, NOTES_SYSTEM_PROMPT)
+        self._store(key, notes)
+        return notes
+
+    @staticmethod
+    async def _passthrough(notes: str) -> str:
+        return notes
+
+    def cache_stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": len(self._cache),
+            "max_entries": self.cache_size
+        }
+
+    def _key(self, stage: str, text: str) -> str:
+        # Same normalization as EmbeddingCache: re-extracted copies map to the same entry
+        normalized = " ".join(text.split())
+        return hashlib.sha256(f"{self.model}\0{stage}\0{normalized}".encode("utf-8")).hexdigest()
+
+    def _cached(self, key: str) -> Optional[str]:
+        with self._lock:
+            notes = self._cache.get(key)
+            if notes is None:
+                self.misses += 1
+                return None
+            self._cache.move_to_end(key)
+            self.hits += 1
+            return notes
+
+    def _store(self, key: str, notes: str) -> None:
+        if self.cache_size <= 0:
+            return
+        with self._lock:
+            self._cache[key] = notes
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
@@ -1,118 +1,1548 @@
 import os
+import copy
 import json
+import sqlite3
 import numpy as np
-from typing import List, Dict, Any, Optional
-from sklearn.metrics.pairwise import cosine_similarity
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import List, Dict, Any, Optional, Tuple, Union, Iterable, Set, Sequence
+from modules.ivf_index import IVFIndex
+from modules.quantization import Quantizer
+from modules.keyword_index import KeywordIndex, tokenize
+from modules.minhash import MinHashLSH
+from modules.metrics import timed
+
+# On-disk layout (see save/load):
+#   manifest.json        -> dim, generation, metadata db name, ordered list of vector segments
+#   vectors_G_NNNNN.npy  -> append-only float32 segments, opened with mmap_mode='r'
+#   codes_G_NNNNN.npy    -> float16/int8 scan codes for the same rows (quantized stores only)
+#   keywords_G_NNNNN.npz -> BM25 postings for the same rows
+#   metadata_G.sqlite    -> chunk rows + tombstones + near-duplicate references
+#   ivf_G_NNNNN.npz      -> optional IVF index (centroids + posting lists), rewritten on each save
+MANIFEST_FILE = "manifest.json"
+FORMAT_VERSION = 1
+
+# Optional per-chunk source location (from DocumentProcessor.iter_chunks), stored when provided
+PROVENANCE_FIELDS = ("page_start", "page_end", "start_offset", "end_offset")
+
+# Near-duplicate chunks stored as references to a canonical (doc_id, chunk_index) row
+REF_COLUMNS = ("doc_id", "filename", "chunk_index", "chunk_text", "canonical_doc", "canonical_index") + PROVENANCE_FIELDS
+REF_TABLE_SQL = (
+    "CREATE TABLE refs (doc_id TEXT, filename TEXT, chunk_index INTEGER, chunk_text TEXT, "
+    "canonical_doc TEXT, canonical_index INTEGER, "
+    + ", ".join(f"{field} INTEGER" for field in PROVENANCE_FIELDS) + ")"
+)
+REF_INDEX_SQL = "CREATE INDEX IF NOT EXISTS refs_doc_id ON refs (doc_id)"
+
+# Shared by all stores: runs the lexical leg of hybrid_search next to the vector leg
+_SEARCH_POOL = ThreadPoolExecutor(max_workers=4, thread_name_prefix="hybrid-search")
 
 class VectorStore:
-    def __init__(self):
+    # Rebuild the IVF index once the live row count has grown by this factor since training
+    IVF_RETRAIN_GROWTH = 4
+
+    def __init__(
+        self,
+        compact_threshold: float = 0.25,
+        quantization: Optional[str] = None,
+        rerank_factor: int = 4,
+        near_dup_threshold: Optional[float] = 0.9,
+        embedding_backend: Optional[str] = None
+    ):
         """
         Initialize the VectorStore using in-memory Numpy arrays + List storage.
+
+        Args:
+            compact_threshold (float): Fraction of tombstoned rows that triggers an automatic compact().
+            quantization (str, optional): "float16" or "int8" to scan compact codes instead of float32.
+                Full-precision rows are still written to (memory-mapped) segments for re-ranking.
+            rerank_factor (int): With quantization, re-score top_k * rerank_factor candidates
+                against full-precision vectors (0 disables re-ranking).
+            near_dup_threshold (float, optional): Estimated Jaccard similarity above which
+                near_duplicates() reports a chunk as a copy of a stored one (None disables it).
+            embedding_backend (str, optional): Name of the embedding backend the vectors come from
+                (e.g. "openai:text-embedding-3-small", "hashing:1024:1-2"); see bind_embedding_backend().
+        """
+        self.compact_threshold = compact_threshold
+        self.rerank_factor = rerank_factor
+        self.near_dup_threshold = near_dup_threshold
+        self.quantizer: Optional[Quantizer] = Quantizer(quantization) if quantization else None
+        # Which backend produced the vectors (persisted in the manifest); None = not recorded
+        self.embedding_backend = embedding_backend
+
+        # Bumped on every content change (add/remove/load), so caches can tell they are stale
+        self.version = 0
+        self._reset()
+
+    def _reset(self) -> None:
+        """
+        Clears all stored chunks, vectors and bookkeeping.
         """
-        # Metadata storage: List of dicts
+        self.version += 1
+
+        # Metadata storage: List of dicts (row-aligned with the vector buffer)
         self.chunks: List[Dict[str, Any]] = []
-        
-        # Vector storage: Numpy matrix (N_chunks, Embedding_Dim)
-        self.embeddings_matrix: Optional[np.ndarray] = None
 
-    def add_document(self, doc_id: str, filename: str, chunks: List[str], embeddings: List[List[float]]) -> None:
+        # Vector storage, all rows unit-normalized so cosine similarity is a plain dot product:
+        # - sealed segments: read-only blocks (memory-mapped after save/load), never modified
+        # - tail buffer: preallocated (Capacity, Embedding_Dim), first `_size` rows are used
+        # Row ids run across segments first, then the tail.
+        self._segments: List[np.ndarray] = []
+        self._sealed_rows = 0
+        self._buffer: Optional[np.ndarray] = None
+        self._size = 0
+        # Rows written into the tail buffer by any fork sharing it (one-element list, shared):
+        # a store may only append in place while this still equals its own `_size`
+        self._tail_end = [0]
+        self._dim: Optional[int] = None
+
+        # Scan codes for quantized stores, laid out exactly like the float32 blocks
+        self._code_segments: List[np.ndarray] = []
+        self._code_buffer: Optional[np.ndarray] = None
+
+        # Tombstones: rows of removed documents stay in place until compact()
+        self._deleted = np.zeros(0, dtype=bool)
+        self._num_deleted = 0
+
+        # doc_id -> list of (start_row, end_row) ranges of live rows, filename -> doc_ids
+        # (used to restrict search to a few documents without scanning everything)
+        self._doc_rows: Dict[str, List[Tuple[int, int]]] = {}
+        self._filename_docs: Dict[str, Set[str]] = {}
+
+        # Lexical (BM25) index over chunk texts, row-aligned with the vectors
+        self.keyword_index = KeywordIndex()
+
+        # Near-duplicate chunks have no row: doc_id -> reference chunks, and
+        # canonical (doc_id, chunk_index) -> references pointing at it
+        self._refs: Dict[str, List[Dict[str, Any]]] = {}
+        self._ref_targets: Dict[Tuple[str, int], List[Dict[str, Any]]] = {}
+        # MinHash/LSH over row chunks keyed by (doc_id, chunk_index), built on first use
+        self._lsh: Optional[MinHashLSH] = None
+
+        # Optional approximate index; exact brute-force search is used while it is None
+        self.ivf: Optional[IVFIndex] = None
+        self._ivf_settings: Dict[str, Any] = {}
+        self._ivf_built_rows = 0
+
+        # Persistence bookkeeping: which directory/generation the sealed rows were written to,
+        # and the tombstoned row ranges / documents with changed references not saved there yet
+        self._saved_dir: Optional[str] = None
+        self._saved_generation = -1
+        self._unsaved_tombstones: List[Tuple[int, int]] = []
+        self._unsaved_ref_docs: Set[str] = set()
+
+    def fork(self) -> "VectorStore":
+        """
+        Copy-on-write copy to build the next version of a store that readers keep searching
+        (see SharedStore). No vectors are copied: sealed segments are immutable, and the tail
+        buffer is shared because writes only append past this store's last row. What changes
+        in place (tombstones, row maps, references, index postings) is copied, which costs
+        O(rows) pointers, and so is the near-duplicate index, so the source stays untouched.
+
+        Returns:
+            VectorStore: An independent store with the same contents and version.
+        """
+        other = copy.copy(self)
+        other.chunks = list(self.chunks)
+        other._segments = list(self._segments)
+        other._code_segments = list(self._code_segments)
+        other._deleted = self._deleted.copy()
+        other._doc_rows = {doc_id: list(ranges) for doc_id, ranges in self._doc_rows.items()}
+        other._filename_docs = {name: set(doc_ids) for name, doc_ids in self._filename_docs.items()}
+        other.keyword_index = self.keyword_index.copy()
+        other.quantizer = copy.copy(self.quantizer)
+        other.ivf = self.ivf.copy() if self.ivf is not None else None
+        other._ivf_settings = dict(self._ivf_settings)
+
+        # Reference dicts are re-pointed in place on promotion: copy them, keeping list order
+        copies = {id(ref): dict(ref) for refs in self._refs.values() for ref in refs}
+        other._refs = {doc_id: [copies[id(r)] for r in refs] for doc_id, refs in self._refs.items()}
+        other._ref_targets = {key: [copies[id(r)] for r in refs] for key, refs in self._ref_targets.items()}
+        other._lsh = self._lsh.copy() if self._lsh is not None else None
+        other._unsaved_tombstones = list(self._unsaved_tombstones)
+        other._unsaved_ref_docs = set(self._unsaved_ref_docs)
+        return other
+
+    @property
+    def embeddings_matrix(self) -> Optional[np.ndarray]:
+        """
+        All rows (N_chunks, Embedding_Dim), tombstones included.
+        Zero-copy when the store is a single block; otherwise the blocks are concatenated.
+        """
+        blocks = [block for _, block in self._blocks()]
+        if not blocks:
+            return None
+        if len(blocks) == 1:
+            return blocks[0]
+        return np.concatenate(blocks)
+
+    def memory_report(self) -> Dict[str, Any]:
+        """
+        Bytes per chunk of the scan representation vs full precision, and what is resident in RAM
+        (sealed segments are memory-mapped and only paged in on access).
+        """
+        dim = self._dim or 0
+        scan_bytes = self.quantizer.bytes_per_vector(dim) if self.quantizer else dim * 4
+        resident = 0
+        if self._buffer is not None:
+            resident += self._buffer.nbytes
+        if self._code_buffer is not None:
+            resident += self._code_buffer.nbytes
+        return {
+            "mode": self.quantizer.mode if self.quantizer else "float32",
+            "rows": self.num_rows,
+            "dim": dim,
+            "scan_bytes_per_chunk": scan_bytes,
+            "full_precision_bytes_per_chunk": dim * 4,
+            "resident_buffer_bytes": resident
+        }
+
+    @property
+    def embedding_info(self) -> Dict[str, Any]:
+        """
+        Backend name and dimension of the stored vectors (None while unknown).
+        """
+        return {"backend": self.embedding_backend, "dim": self._dim}
+
+    def bind_embedding_backend(self, name: str, dim: Optional[int] = None) -> None:
+        """
+        Records `name` as the producer of this store's vectors, or checks that it already is.
+        Vectors from different backends (or fits) live in different spaces: a query embedded
+        by one is meaningless against vectors of another, even at the same dimension.
+
+        Args:
+            name (str): Backend name (EmbeddingBackend.name / LLMInterface.embedding_backend).
+            dim (int, optional): Dimension the backend produces, checked against stored vectors.
+
+        Raises:
+            ValueError: If the store already holds vectors of another backend or dimension.
+        """
+        if self.num_rows and self.embedding_backend not in (None, name):
+            raise ValueError(
+                f"Store vectors were produced by {self.embedding_backend}, not {name}. "
+                "Re-ingest into a new store to switch embedding backends."
+            )
+        if self.num_rows and dim is not None and self._dim is not None and dim != self._dim:
+            raise ValueError(f"{name} produces {dim}-d vectors, the store holds {self._dim}-d vectors.")
+        self.embedding_backend = name
+
+    @property
+    def num_rows(self) -> int:
+        """
+        Number of stored rows, tombstones included.
+        """
+        return self._sealed_rows + self._size
+
+    @property
+    def num_live(self) -> int:
+        """
+        Number of chunks that are searchable (not tombstoned).
+        """
+        return self.num_rows - self._num_deleted
+
+    @property
+    def num_references(self) -> int:
+        """
+        Number of near-duplicate chunks stored as references (no row, no embedding).
+        """
+        return sum(len(refs) for refs in self._refs.values())
+
+    @timed("store_add_document")
+    def add_document(
+        self,
+        doc_id: str,
+        filename: str,
+        chunks: List[str],
+        embeddings: List[Optional[List[float]]],
+        provenance: Optional[List[Dict[str, Any]]] = None,
+        duplicate_of: Optional[List[Optional[Tuple[str, int]]]] = None
+    ) -> None:
         """
         Adds document chunks and their corresponding embeddings to the store.
-        
+
         Args:
             doc_id (str): Unique document ID.
             filename (str): Name of source file.
             chunks (List[str]): List of text chunks.
-            embeddings (List[List[float]]): List of embedding vectors corresponding to chunks.
+            embeddings (List[List[float]]): List of embedding vectors corresponding to chunks
+                (None for chunks that are references, see `duplicate_of`).
+            provenance (List[Dict], optional): Per-chunk page_start/page_end/start_offset/end_offset,
+                copied into the chunk metadata.
+            duplicate_of (List, optional): Per chunk, the (doc_id, chunk_index) of a stored chunk it
+                nearly duplicates (from near_duplicates()), or None. Such chunks get no row: they are
+                kept as references and reported in the `sources` of the canonical chunk's results.
         """
         if not chunks or not embeddings:
             return
-            
+        self._insert(doc_id, filename, chunks, provenance, *self._validate(doc_id, chunks, embeddings, provenance, duplicate_of))
+
+    def _validate(
+        self,
+        doc_id: str,
+        chunks: List[str],
+        embeddings: List[Optional[List[float]]],
+        provenance: Optional[List[Dict[str, Any]]],
+        duplicate_of: Optional[List[Optional[Tuple[str, int]]]],
+        replacing: bool = False
+    ) -> Tuple[List[Optional[Tuple[str, int]]], List[int], List[int], Optional[np.ndarray]]:
+        """
+        Checks add_document() arguments against the store without changing it.
+
+        Args:
+            replacing (bool): The document's stored chunks are about to be removed, so they
+                are not valid `duplicate_of` targets.
+
+        Returns:
+            Tuple: (per-chunk targets, row chunk ids, reference chunk ids, normalized row vectors).
+
+        Raises:
+            ValueError: Mismatched lengths, unknown duplicate_of targets or a wrong dimension.
+        """
         if len(chunks) != len(embeddings):
             raise ValueError("Number of chunks and embeddings must match.")
+        if provenance is not None and len(provenance) != len(chunks):
+            raise ValueError("Number of chunks and provenance records must match.")
+        if duplicate_of is not None and len(duplicate_of) != len(chunks):
+            raise ValueError("Number of chunks and duplicate_of entries must match.")
 
-        # 1. Update Metadata
-        start_index = len(self.chunks)
+        targets = duplicate_of or [None] * len(chunks)
+        row_ids = [i for i, target in enumerate(targets) if target is None]
+        ref_ids = [i for i, target in enumerate(targets) if target is not None]
+
+        # References must point at a live row: another document's, or a row chunk of this call
+        own = {(doc_id, i) for i in row_ids}
+        foreign = [tuple(targets[i]) for i in ref_ids if tuple(targets[i]) not in own]
+        unknown = set(foreign) - set(self._rows_of(foreign))
+        if replacing:
+            unknown |= {key for key in foreign if key[0] == doc_id}
+        if unknown:
+            raise ValueError(f"duplicate_of points at chunks that are not stored: {sorted(unknown)[:3]}")
+
+        new_vecs = None
+        if row_ids:
+            # Normalized once here instead of on every query
+            new_vecs = self._normalize(np.array([embeddings[i] for i in row_ids], dtype='float32'))
+            if self._dim is not None and new_vecs.shape[1] != self._dim:
+                raise ValueError(
+                    f"Embedding dimension mismatch: store has {self._dim}, got {new_vecs.shape[1]}."
+                )
+        return targets, row_ids, ref_ids, new_vecs
+
+    def _insert(
+        self,
+        doc_id: str,
+        filename: str,
+        chunks: List[str],
+        provenance: Optional[List[Dict[str, Any]]],
+        targets: List[Optional[Tuple[str, int]]],
+        row_ids: List[int],
+        ref_ids: List[int],
+        new_vecs: Optional[np.ndarray]
+    ) -> None:
+        """
+        Stores chunks already checked by _validate().
+        """
+        # 1. Build Metadata
+        records = []
         for i, text in enumerate(chunks):
-            self.chunks.append({
+            record = {
                 "doc_id": doc_id,
                 "filename": filename,
                 "chunk_index": i,
-                "chunk_text": text,
-                "global_index": start_index + i
-            })
-
-        # 2. Update Embeddings Matrix
-        new_vecs = np.array(embeddings, dtype='float32')
-        
-        if self.embeddings_matrix is None:
-            self.embeddings_matrix = new_vecs
+                "chunk_text": text
+            }
+            if provenance is not None:
+                record.update({k: provenance[i][k] for k in PROVENANCE_FIELDS if provenance[i].get(k) is not None})
+            records.append(record)
+
+        # 2. Rows first (references may point at them), then references
+        if row_ids:
+            self._append_rows(doc_id, filename, [records[i] for i in row_ids], new_vecs)
+        for i in ref_ids:
+            self._add_reference(dict(records[i], canonical=tuple(targets[i])))
+        if ref_ids:
+            self._unsaved_ref_docs.add(doc_id)
+        self.version += 1
+
+    @timed("store_remove_document")
+    def remove_document(self, doc_id: str) -> int:
+        """
+        Tombstones all chunks of a document so they no longer show up in search.
+        Compacts automatically once the tombstoned fraction exceeds `compact_threshold`.
+        Other documents' references to its chunks are promoted to rows (reusing the vector).
+
+        Args:
+            doc_id (str): The document to remove.
+
+        Returns:
+            int: Number of chunks removed (0 if the document is unknown).
+        """
+        refs = self._refs.pop(doc_id, [])
+        for ref in refs:
+            self._drop_target(ref)
+        ranges = self._doc_rows.pop(doc_id, None)
+        if not ranges and not refs:
+            return 0
+
+        filename = refs[0]["filename"] if refs else self.chunks[ranges[0][0]]["filename"]
+        self._filename_docs[filename].discard(doc_id)
+        if not self._filename_docs[filename]:
+            del self._filename_docs[filename]
+
+        removed = len(refs)
+        if refs:
+            self._unsaved_ref_docs.add(doc_id)
+        rows = [row for start, end in ranges or [] for row in range(start, end)]
+        self._promote_references(rows)
+        if self._lsh is not None:
+            for row in rows:
+                self._lsh.remove((doc_id, self.chunks[row]["chunk_index"]))
+        for start, end in ranges or []:
+            removed += int(np.count_nonzero(~self._deleted[start:end]))
+            self._deleted[start:end] = True
+        self._unsaved_tombstones.extend(ranges or [])
+        self._num_deleted += removed - len(refs)
+        self.version += 1
+
+        if self.num_rows and self._num_deleted / self.num_rows > self.compact_threshold:
+            self.compact()
+        return removed
+
+    def replace_document(
+        self,
+        doc_id: str,
+        filename: str,
+        chunks: List[str],
+        embeddings: List[Optional[List[float]]],
+        provenance: Optional[List[Dict[str, Any]]] = None,
+        duplicate_of: Optional[List[Optional[Tuple[str, int]]]] = None
+    ) -> None:
+        """
+        Replaces a document's chunks (e.g. a re-uploaded revision) under the same doc_id.
+
+        Args:
+            doc_id (str): Document ID to replace (added fresh if unknown).
+            filename (str): Name of source file.
+            chunks (List[str]): New list of text chunks.
+            embeddings (List[List[float]]): New embedding vectors corresponding to chunks.
+            provenance (List[Dict], optional): Per-chunk source locations (see add_document).
+            duplicate_of (List, optional): Per-chunk near-duplicate targets (see add_document).
+        """
+        # Validate everything add_document() checks before removing, so a bad call doesn't drop the old version
+        checked = None
+        if chunks and embeddings:
+            checked = self._validate(doc_id, chunks, embeddings, provenance, duplicate_of, replacing=True)
+
+        self.remove_document(doc_id)
+        if checked is not None:
+            self._insert(doc_id, filename, chunks, provenance, *checked)
+
+    @timed("store_compact")
+    def compact(self) -> None:
+        """
+        Physically drops tombstoned rows and renumbers `global_index` of the remaining chunks.
+        The next save() into a directory rewrites it completely.
+        """
+        if self._num_deleted == 0:
+            return
+
+        live_rows = np.flatnonzero(~self._deleted[:self.num_rows])
+        vectors = self._gather(live_rows)
+        self.chunks = [self.chunks[i] for i in live_rows]
+
+        self._segments = []
+        self._sealed_rows = 0
+        self._buffer = None
+        self._size = 0
+        self._tail_end = [0]
+        self._deleted = np.zeros(0, dtype=bool)
+        self._num_deleted = 0
+        self._code_segments = []
+        self._code_buffer = None
+        # Row ids changed: the next save rewrites everything
+        self._saved_dir = None
+        self._unsaved_tombstones = []
+        if self.quantizer is not None:
+            # Recalibrate scales on the surviving rows
+            self.quantizer = Quantizer(self.quantizer.mode)
+
+        if len(live_rows):
+            self._append_vectors(vectors)
+        self._reindex_chunks()
+        self._rebuild_keyword_index()
+
+        # Row ids changed, so posting lists are stale
+        if self.ivf is not None:
+            if self.num_rows:
+                self.build_ivf(**self._ivf_settings)
+            else:
+                self.ivf = None
+
+    @timed("store_build_ivf")
+    def build_ivf(self, n_lists: Optional[int] = None, nprobe: int = 8, n_iter: int = 10) -> None:
+        """
+        Builds (or rebuilds) the IVF approximate index over all live rows.
+        Afterwards search() probes `nprobe` lists unless called with exact=True.
+
+        Args:
+            n_lists (int, optional): Number of centroids; defaults to ~sqrt(N_live).
+            nprobe (int): Default number of lists probed per query.
+            n_iter (int): k-means iterations.
+        """
+        if self.num_live == 0:
+            raise ValueError("Cannot build an IVF index on an empty store.")
+
+        live_rows = np.flatnonzero(~self._deleted[:self.num_rows])
+        lists = n_lists or max(1, int(np.sqrt(len(live_rows))))
+
+        # k-means only needs a sample (~256 rows per centroid)
+        rng = np.random.default_rng(0)
+        sample_size = min(len(live_rows), 256 * lists)
+        sample_rows = np.sort(rng.choice(live_rows, size=sample_size, replace=False))
+
+        ivf = IVFIndex(n_lists=lists, nprobe=nprobe, n_iter=n_iter)
+        ivf.train(self._gather(sample_rows))
+        for offset, block in self._blocks():
+            rows = np.arange(offset, offset + len(block))
+            live = ~self._deleted[offset:offset + len(block)]
+            ivf.add(rows[live], block[live])
+
+        self.ivf = ivf
+        self._ivf_settings = {"n_lists": n_lists, "nprobe": nprobe, "n_iter": n_iter}
+        self._ivf_built_rows = len(live_rows)
+
+    def drop_ivf(self) -> None:
+        """
+        Removes the IVF index; search() goes back to exact brute force.
+        """
+        self.ivf = None
+        self._ivf_settings = {}
+        self._ivf_built_rows = 0
+
+    @timed("store_near_duplicates")
+    def near_duplicates(
+        self,
+        doc_id: str,
+        chunks: List[str],
+        exclude: Iterable[Optional[str]] = ()
+    ) -> List[Optional[Tuple[str, int]]]:
+        """
+        Finds chunks that nearly duplicate a stored chunk of another document, or an earlier
+        chunk of the same list (MinHash/LSH over word shingles). Pass the result as
+        `duplicate_of` to add/replace_document so those chunks don't need an embedding.
+
+        Args:
+            doc_id (str): The document the chunks will be stored under (its stored chunks are ignored).
+            chunks (List[str]): Chunk texts to check.
+            exclude (Iterable[str]): Other documents whose chunks are ignored, e.g. the previous
+                version this one replaces: its slightly edited chunks must be re-embedded (unchanged
+                ones are found by reusable_vectors()), not kept as references to text about to go.
+
+        Returns:
+            List: Per chunk, the canonical (doc_id, chunk_index) or None if it is new.
+        """
+        if self.near_dup_threshold is None:
+            return [None] * len(chunks)
+        if self._lsh is None:
+            self._lsh = self._new_lsh()
+            for chunk in self.live_chunks():
+                self._lsh.add((chunk["doc_id"], chunk["chunk_index"]), self._lsh.signature(chunk["chunk_text"]))
+
+        excluded = {doc_id, *exclude}
+        local = self._new_lsh()
+        results: List[Optional[Tuple[str, int]]] = []
+        for i, signature in enumerate(self._lsh.signatures(chunks)):
+            match = self._lsh.query(signature, exclude=lambda key: key[0] in excluded)
+            if match is None:
+                local_match = local.query(signature)
+                if local_match is not None:
+                    match = ((doc_id, local_match[0]), local_match[1])
+            if match is None:
+                local.add(i, signature)
+            results.append(match[0] if match else None)
+        return results
+
+    def has_document(self, doc_id: str) -> bool:
+        """
+        True if the document has live (searchable) chunks or references.
+        """
+        return doc_id in self._doc_rows or doc_id in self._refs
+
+    def reusable_vectors(self, doc_id: str, chunks: List[str]) -> List[Optional[np.ndarray]]:
+        """
+        Looks up stored vectors of a document's live chunks by chunk text, so a changed
+        revision only has to embed the chunks whose text actually changed.
+
+        Args:
+            doc_id (str): The previous version of the document.
+            chunks (List[str]): Chunk texts of the new version.
+
+        Returns:
+            List: Unit-normalized float32 vector per chunk, None where the text is new.
+        """
+        rows = [row for start, end in self._doc_rows.get(doc_id, []) for row in range(start, end)]
+        if not rows:
+            return [None] * len(chunks)
+        by_text = {self.chunks[row]["chunk_text"]: i for i, row in enumerate(rows)}
+        wanted = [by_text.get(text) for text in chunks]
+        found = [i for i in wanted if i is not None]
+        vectors = self._gather(np.array([rows[i] for i in found], dtype=np.int64)) if found else None
+
+        out: List[Optional[np.ndarray]] = []
+        pos = 0
+        for i in wanted:
+            if i is None:
+                out.append(None)
+            else:
+                out.append(vectors[pos])
+                pos += 1
+        return out
+
+    def documents(self) -> Dict[str, str]:
+        """
+        Returns {doc_id: filename} for every document that still has live chunks.
+        """
+        return {
+            doc_id: filename
+            for filename, doc_ids in self._filename_docs.items()
+            for doc_id in doc_ids
+        }
+
+    def live_chunks(self) -> List[Dict[str, Any]]:
+        """
+        Returns the chunk metadata of all non-tombstoned rows.
+        """
+        if self._num_deleted == 0:
+            return self.chunks
+        return [chunk for chunk, dead in zip(self.chunks, self._deleted) if not dead]
+
+    @timed("store_keyword_search")
+    def keyword_search(
+        self,
+        query: str,
+        top_k: int = 5,
+        phrase: bool = False,
+        doc_ids: Optional[Iterable[str]] = None,
+        filenames: Optional[Iterable[str]] = None
+    ) -> List[Dict]:
+        """
+        Lexical search over the inverted index, ranked by BM25.
+
+        Args:
+            query (str): Keywords (or an exact phrase).
+            top_k (int): Number of results to return.
+            phrase (bool): Only return chunks containing the query as a case-insensitive substring
+                (so "net" also finds "network"). Candidates come from the index (every query token,
+                matched as part of a term where the query may cut a word); only those texts are checked.
+            doc_ids / filenames (optional): Restrict results to these documents (see search()).
+
+        Returns:
+            List[Dict]: List of result chunks with BM25 scores.
+        """
+        excluded = self._deleted[:self.num_rows]
+        ranges = self._filter_ranges(doc_ids, filenames)
+        if ranges is not None:
+            excluded = np.ones(self.num_rows, dtype=bool)
+            for start, end in ranges:
+                excluded[start:end] = self._deleted[start:end]
+
+        if phrase and not tokenize(query):
+            # Punctuation only: nothing to look up, every row is a candidate
+            rows = np.flatnonzero(~excluded)
+            scores = np.zeros(len(rows), dtype='float32')
         else:
-            self.embeddings_matrix = np.vstack([self.embeddings_matrix, new_vecs])
+            rows, scores = self.keyword_index.search(
+                query,
+                top_k=0 if phrase else top_k,
+                require_all=phrase,
+                deleted=excluded,
+                substring=phrase
+            )
+        if not phrase:
+            return self._build_results(rows, scores)
+
+        needle = query.lower()
+        results = []
+        for row, score in zip(rows, scores):
+            if needle in self.chunks[row]['chunk_text'].lower():
+                results.extend(self._build_results([row], [score]))
+                if len(results) >= top_k:
+                    break
+        return results
 
-    def search(self, query_embedding: List[float], top_k: int = 5) -> List[Dict]:
+    @timed("store_hybrid_search")
+    def hybrid_search(
+        self,
+        query_text: str,
+        query_embedding: Union[List[float], "Future", None],
+        top_k: int = 5,
+        num_candidates: Optional[int] = None,
+        rrf_k: int = 60,
+        embedding_timeout: Optional[float] = None,
+        doc_ids: Optional[Iterable[str]] = None,
+        filenames: Optional[Iterable[str]] = None
+    ) -> List[Dict]:
+        """
+        Semantic + BM25 retrieval fused with Reciprocal Rank Fusion (score = sum 1 / (rrf_k + rank)).
+        The lexical leg runs on a worker thread while the vector leg runs here.
+
+        If the embedding is missing (embed_query returned []) or is a Future that fails or
+        isn't done within `embedding_timeout` seconds, lexical-only results are returned.
+
+        Args:
+            query_text (str): The raw query (lexical leg).
+            query_embedding: Query vector, or a Future resolving to it, or None/[].
+            top_k (int): Number of fused results to return.
+            num_candidates (int, optional): Candidates per leg (default: 4 * top_k).
+            rrf_k (int): RRF damping constant.
+            embedding_timeout (float, optional): Max seconds to wait for a Future embedding.
+            doc_ids / filenames (optional): Restrict both legs to these documents (see search()).
+
+        Returns:
+            List[Dict]: Result chunks with the fused 'score', plus 'vector_score' / 'keyword_score'
+            where that leg found the chunk.
+        """
+        num_candidates = num_candidates or 4 * top_k
+        filters = {"doc_ids": doc_ids, "filenames": filenames}
+        lexical_future = _SEARCH_POOL.submit(self.keyword_search, query_text, num_candidates, **filters)
+
+        if isinstance(query_embedding, Future):
+            try:
+                query_embedding = query_embedding.result(timeout=embedding_timeout)
+            except Exception:
+                # Slow or failed embedding call: don't make the user wait for it
+                query_embedding = None
+
+        vector_results = []
+        if query_embedding is not None and len(query_embedding) > 0:
+            vector_results = self.search(query_embedding, top_k=num_candidates, **filters)
+        lexical_results = lexical_future.result()
+
+        fused: Dict[int, Dict[str, Any]] = {}
+        for leg, results in (("vector_score", vector_results), ("keyword_score", lexical_results)):
+            for rank, item in enumerate(results, start=1):
+                entry = fused.setdefault(item['global_index'], {**item, 'score': 0.0})
+                entry['score'] += 1.0 / (rrf_k + rank)
+                entry[leg] = item['score']
+
+        return sorted(fused.values(), key=lambda r: r['score'], reverse=True)[:top_k]
+
+    @timed("store_search")
+    def search(
+        self,
+        query_embedding: List[float],
+        top_k: int = 5,
+        nprobe: Optional[int] = None,
+        exact: bool = False,
+        doc_ids: Optional[Iterable[str]] = None,
+        filenames: Optional[Iterable[str]] = None
+    ) -> List[Dict]:
         """
         Finds the top_k most similar chunks to the query_embedding.
-        
+        Uses the IVF index when one is built, otherwise scores every row.
+        With doc_ids/filenames only those documents' row ranges are scored.
+
         Args:
             query_embedding (List[float]): The embedding vector of the user's question.
             top_k (int): Number of results to return.
-            
+            nprobe (int, optional): IVF lists to probe (defaults to the index's nprobe).
+            exact (bool): Force exact full-precision brute-force search (skips IVF and quantized codes).
+            doc_ids (Iterable[str], optional): Only search these documents.
+            filenames (Iterable[str], optional): Only search documents with these filenames
+                (combined with doc_ids as AND when both are given).
+
         Returns:
             List[Dict]: List of result chunks with scores.
         """
-        if self.embeddings_matrix is None or len(self.chunks) == 0:
+        if self.num_live == 0:
             return []
 
-        # Ensure query is 2D array (1, Dim) for scikit-learn
-        query_vec = np.array([query_embedding], dtype='float32')
-        
-        # Calculate Cosine Similarity: Returns (1, N_chunks) array of scores
+        query_vec = self._normalize(np.asarray(query_embedding, dtype='float32'))
+
+        ranges = self._filter_ranges(doc_ids, filenames)
+        if ranges is not None:
+            # A few documents: score just their rows, IVF probing would only add overhead
+            rows, scores = self._score_ranges(query_vec, ranges, use_codes=not exact)
+            return self._select(query_vec, scores, top_k, rerank=not exact, rows=rows)
+
+        if self.ivf is not None and not exact:
+            rows = self.ivf.candidates(query_vec, nprobe)
+            if self._num_deleted:
+                rows = rows[~self._deleted[rows]]
+            # Too few candidates in the probed lists: fall back to exact search
+            if len(rows) >= top_k:
+                scores = self._gather(rows) @ query_vec
+                top = self._top_k_indices(scores, top_k)
+                return self._build_results(rows[top], scores[top])
+
+        # Cosine Similarity against pre-normalized rows: one (N, Dim) x (Dim,) product
         # Values range from -1 to 1 (1 being identical)
-        similarity_scores = cosine_similarity(query_vec, self.embeddings_matrix)[0]
-        
-        # Get indices of top_k scores (sorted descending)
-        # argsort gives ascending, so we slice from end [::-1]
-        top_indices = np.argsort(similarity_scores)[::-1][:top_k]
-        
-        results = []
-        for idx in top_indices:
-            score = similarity_scores[idx]
-            
-            # Create a copy of the chunk data to avoid mutating store
-            result_item = self.chunks[idx].copy()
-            result_item['score'] = float(score)  # Convert numpy float to native float
-            results.append(result_item)
-            
-        return results
+        similarity_scores = self._score(query_vec, use_codes=not exact)
+        self._mask_deleted(similarity_scores)
 
+        return self._select(query_vec, similarity_scores, top_k, rerank=not exact, rows=None)
+
+    @timed("store_search_batch")
+    def search_batch(self, query_embeddings: List[List[float]], top_k: int = 5) -> List[List[Dict]]:
+        """
+        Runs several queries at once with a single matrix-matrix product.
+
+        Args:
+            query_embeddings (List[List[float]]): One embedding vector per query.
+            top_k (int): Number of results to return per query.
+
+        Returns:
+            List[List[Dict]]: One result list per query, in input order.
+        """
+        if len(query_embeddings) == 0:
+            return []
+        if self.num_live == 0:
+            return [[] for _ in query_embeddings]
+
+        query_mat = self._normalize(np.asarray(query_embeddings, dtype='float32'))
+
+        # (N_queries, Dim) x (Dim, N_chunks) -> (N_queries, N_chunks)
+        score_mat = self._score(query_mat, use_codes=True)
+        self._mask_deleted(score_mat)
+
+        return [
+            self._select(query_vec, scores, top_k, rerank=True)
+            for query_vec, scores in zip(query_mat, score_mat)
+        ]
+
+    def _select(
+        self,
+        query_vec: np.ndarray,
+        scores: np.ndarray,
+        top_k: int,
+        rerank: bool,
+        rows: Optional[np.ndarray] = None
+    ) -> List[Dict]:
+        """
+        Picks the top_k rows from a score vector. When the scores came from quantized codes,
+        a wider candidate set is re-scored against the full-precision vectors first.
+
+        Args:
+            scores (np.ndarray): One score per row id, or per entry of `rows` when given
+                (tombstoned rows must already be masked / left out).
+            rows (np.ndarray, optional): Row ids the scores belong to (filtered search).
+        """
+        n_valid = self.num_live if rows is None else len(rows)
+        k = min(top_k, n_valid)
+
+        if rerank and self.quantizer is not None and self.rerank_factor > 0:
+            candidates = self._top_k_indices(scores, min(n_valid, k * self.rerank_factor))
+            candidates = candidates if rows is None else rows[candidates]
+            exact_scores = self._gather(candidates) @ query_vec
+            top = self._top_k_indices(exact_scores, k)
+            return self._build_results(candidates[top], exact_scores[top])
+
+        top_indices = self._top_k_indices(scores, k)
+        return self._build_results(top_indices if rows is None else rows[top_indices], scores[top_indices])
+
+    def _filter_ranges(
+        self,
+        doc_ids: Optional[Iterable[str]],
+        filenames: Optional[Iterable[str]]
+    ) -> Optional[List[Tuple[int, int]]]:
+        """
+        Resolves doc_id / filename filters to sorted live row ranges (None means no filter).
+        """
+        if doc_ids is None and filenames is None:
+            return None
+
+        allowed: Optional[Set[str]] = set(doc_ids) if doc_ids is not None else None
+        if filenames is not None:
+            by_name = set()
+            for name in filenames:
+                by_name |= self._filename_docs.get(name, set())
+            allowed = by_name if allowed is None else allowed & by_name
+
+        ranges = [r for doc_id in allowed for r in self._doc_rows.get(doc_id, [])]
+        # A document's near-duplicate chunks are found through their canonical rows
+        targets = [ref["canonical"] for doc_id in allowed for ref in self._refs.get(doc_id, [])]
+        ranges += [(row, row + 1) for row in set(self._rows_of(targets).values())]
+        return sorted(ranges)
+
+    def _score_ranges(
+        self,
+        query_vec: np.ndarray,
+        ranges: List[Tuple[int, int]],
+        use_codes: bool
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Scores only the rows inside `ranges`, slicing each block (no copy of unrelated rows).
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: live row ids and their scores.
+        """
+        codes = use_codes and self.quantizer is not None
+        blocks = self._code_blocks() if codes else self._blocks()
+
+        row_parts, score_parts = [], []
+        for start, end in ranges:
+            for offset, block in blocks:
+                lo, hi = max(start, offset), min(end, offset + len(block))
+                if lo >= hi:
+                    continue
+                part = block[lo - offset:hi - offset]
+                row_parts.append(np.arange(lo, hi))
+                score_parts.append(self.quantizer.score(part, query_vec) if codes else part @ query_vec)
+
+        if not row_parts:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype='float32')
+        rows, scores = np.concatenate(row_parts), np.concatenate(score_parts)
+        live = ~self._deleted[rows]
+        return rows[live], scores[live]
+
+    @timed("store_save")
     def save(self, dir_path: str) -> None:
         """
-        Persist store to disk (JSON for metadata, NPY for vectors).
+        Persist store to disk as append-only vector segments + SQLite metadata.
+
+        Saving again into the directory the store was loaded from / last saved to only writes
+        the rows added since (one new segment) and the new tombstones. Any other directory,
+        or a store that was compacted since, gets a full rewrite under a new generation.
         """
         if not os.path.exists(dir_path):
             os.makedirs(dir_path, exist_ok=True)
-            
-        # 1. Save Metadata
-        meta_path = os.path.join(dir_path, "metadata.json")
-        with open(meta_path, 'w', encoding='utf-8') as f:
-            json.dump(self.chunks, f, indent=2, ensure_ascii=False)
-            
-        # 2. Save Vectors
-        if self.embeddings_matrix is not None:
-            vec_path = os.path.join(dir_path, "vectors.npy")
-            np.save(vec_path, self.embeddings_matrix)
+        dir_path = os.path.abspath(dir_path)
+
+        manifest = self._read_manifest(dir_path)
+        incremental = (
+            manifest is not None
+            and self._saved_dir == dir_path
+            and manifest["generation"] == self._saved_generation
+        )
+
+        if incremental:
+            self._save_incremental(dir_path, manifest)
+        else:
+            generation = manifest["generation"] + 1 if manifest else 0
+            self._save_full(dir_path, generation, manifest)
 
+    @timed("store_load")
     def load(self, dir_path: str) -> None:
         """
-        Load store from disk.
+        Load store from disk. Vector segments are memory-mapped (zero-copy),
+        only chunk metadata is read into memory.
+        """
+        dir_path = os.path.abspath(dir_path)
+        manifest = self._read_manifest(dir_path)
+        if manifest is None:
+            self._load_legacy(dir_path)
+            return
+
+        self._reset()
+        self._dim = manifest["dim"]
+        self.embedding_backend = manifest.get("embedding_backend")
+        # The directory's quantization setting wins over the constructor's
+        quant = manifest.get("quantization")
+        self.quantizer = Quantizer.from_dict(quant) if quant else None
+        self._open_segments(dir_path, manifest)
+
+        conn = sqlite3.connect(os.path.join(dir_path, manifest["metadata"]))
+        try:
+            # Stores written before provenance was tracked lack those columns
+            columns = {r[1] for r in conn.execute("PRAGMA table_info(chunks)")}
+            extra = [f for f in PROVENANCE_FIELDS if f in columns]
+            rows = conn.execute(
+                f"SELECT {', '.join(['doc_id', 'filename', 'chunk_index', 'chunk_text'] + extra)} "
+                "FROM chunks WHERE row_id < ? ORDER BY row_id",
+                (self._sealed_rows,)
+            ).fetchall()
+            dead = [r[0] for r in conn.execute("SELECT row_id FROM tombstones WHERE row_id < ?", (self._sealed_rows,))]
+            tables = {r[0] for r in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+            ref_rows = conn.execute(f"SELECT {', '.join(REF_COLUMNS)} FROM refs").fetchall() if "refs" in tables else []
+        finally:
+            conn.close()
+
+        for d, f, ci, t, canonical_doc, canonical_index, *prov in ref_rows:
+            ref = {"doc_id": d, "filename": f, "chunk_index": ci, "chunk_text": t}
+            ref.update({k: v for k, v in zip(PROVENANCE_FIELDS, prov) if v is not None})
+            ref["canonical"] = (canonical_doc, canonical_index)
+            self._add_reference(ref)
+
+        self.chunks = []
+        for d, f, ci, t, *prov in rows:
+            chunk = {"doc_id": d, "filename": f, "chunk_index": ci, "chunk_text": t}
+            chunk.update({k: v for k, v in zip(extra, prov) if v is not None})
+            self.chunks.append(chunk)
+        if len(self.chunks) != self._sealed_rows:
+            raise ValueError(f"Corrupt store at {dir_path}: {len(self.chunks)} chunks for {self._sealed_rows} vectors.")
+
+        self._deleted = np.zeros(self._sealed_rows, dtype=bool)
+        self._deleted[dead] = True
+        self._num_deleted = len(dead)
+        self._reindex_chunks()
+
+        if all(seg.get("keywords") for seg in manifest["segments"]):
+            for seg in manifest["segments"]:
+                with np.load(os.path.join(dir_path, seg["keywords"])) as arrays:
+                    self.keyword_index.merge_arrays(dict(arrays))
+        else:
+            self._rebuild_keyword_index()
+
+        if manifest.get("ivf"):
+            with np.load(os.path.join(dir_path, manifest["ivf"])) as arrays:
+                self.ivf = IVFIndex.from_arrays(dict(arrays))
+            self._ivf_settings = manifest.get("ivf_settings", {})
+            self._ivf_built_rows = manifest.get("ivf_built_rows", self.num_live)
+
+        self._saved_dir = dir_path
+        self._saved_generation = manifest["generation"]
+
+    def _save_incremental(self, dir_path: str, manifest: Dict[str, Any]) -> None:
+        """
+        Appends the tail buffer as a new segment and records new chunks/tombstones.
+        """
+        generation = manifest["generation"]
+        start = self._sealed_rows
+
+        if self._size:
+            seg_file = f"vectors_{generation:04d}_{len(manifest['segments']):05d}.npy"
+            np.save(os.path.join(dir_path, seg_file), self._buffer[:self._size])
+            segment = {"file": seg_file, "rows": self._size}
+            if self.quantizer is not None:
+                segment["codes"] = seg_file.replace("vectors_", "codes_", 1)
+                np.save(os.path.join(dir_path, segment["codes"]), self._code_buffer[:self._size])
+            segment["keywords"] = self._write_keywords(dir_path, seg_file, start, self.num_rows)
+            manifest["segments"].append(segment)
+
+        conn = sqlite3.connect(os.path.join(dir_path, manifest["metadata"]))
+        try:
+            with conn:
+                columns = {r[1] for r in conn.execute("PRAGMA table_info(chunks)")}
+                for field in PROVENANCE_FIELDS:
+                    if field not in columns:
+                        conn.execute(f"ALTER TABLE chunks ADD COLUMN {field} INTEGER")
+                conn.execute(REF_TABLE_SQL.replace("CREATE TABLE", "CREATE TABLE IF NOT EXISTS", 1))
+                conn.execute(REF_INDEX_SQL)
+                self._write_chunk_rows(conn, start, self.num_rows, full=False)
+        finally:
+            conn.close()
+
+        manifest["dim"] = self._dim
+        manifest["embedding_backend"] = self.embedding_backend
+        old_ivf = manifest.get("ivf")
+        self._write_ivf(dir_path, manifest)
+        self._write_manifest(dir_path, manifest)
+        if old_ivf and old_ivf != manifest.get("ivf"):
+            os.remove(os.path.join(dir_path, old_ivf))
+        self._seal(dir_path, manifest)
+
+    def _save_full(self, dir_path: str, generation: int, old_manifest: Optional[Dict[str, Any]]) -> None:
+        """
+        Writes every row into a fresh generation (one segment + new metadata db),
+        then switches the manifest over and deletes the previous generation's files.
+        """
+        manifest = {
+            "format": FORMAT_VERSION,
+            "dim": self._dim,
+            "embedding_backend": self.embedding_backend,
+            "generation": generation,
+            "metadata": f"metadata_{generation:04d}.sqlite",
+            "segments": []
+        }
+
+        if self.num_rows:
+            seg_file = f"vectors_{generation:04d}_00000.npy"
+            # Stream block by block into the new file instead of concatenating in memory
+            out = np.lib.format.open_memmap(
+                os.path.join(dir_path, seg_file), mode='w+', dtype='float32', shape=(self.num_rows, self._dim)
+            )
+            for offset, block in self._blocks():
+                out[offset:offset + len(block)] = block
+            out.flush()
+            del out
+            segment = {"file": seg_file, "rows": self.num_rows}
+
+            if self.quantizer is not None:
+                segment["codes"] = f"codes_{generation:04d}_00000.npy"
+                out = np.lib.format.open_memmap(
+                    os.path.join(dir_path, segment["codes"]), mode='w+',
+                    dtype=self.quantizer.dtype, shape=(self.num_rows, self._dim)
+                )
+                for offset, block in self._code_blocks():
+                    out[offset:offset + len(block)] = block
+                out.flush()
+                del out
+            segment["keywords"] = self._write_keywords(dir_path, seg_file, 0, self.num_rows)
+            manifest["segments"].append(segment)
+
+        db_path = os.path.join(dir_path, manifest["metadata"])
+        if os.path.exists(db_path):
+            os.remove(db_path)
+        conn = sqlite3.connect(db_path)
+        try:
+            with conn:
+                conn.execute(
+                    "CREATE TABLE chunks (row_id INTEGER PRIMARY KEY, doc_id TEXT, filename TEXT, "
+                    "chunk_index INTEGER, chunk_text TEXT, "
+                    + ", ".join(f"{field} INTEGER" for field in PROVENANCE_FIELDS) + ")"
+                )
+                conn.execute("CREATE TABLE tombstones (row_id INTEGER PRIMARY KEY)")
+                conn.execute(REF_TABLE_SQL)
+                conn.execute(REF_INDEX_SQL)
+                self._write_chunk_rows(conn, 0, self.num_rows, full=True)
+        finally:
+            conn.close()
+
+        self._write_ivf(dir_path, manifest)
+        self._write_manifest(dir_path, manifest)
+
+        # Previous generation is unreachable now
+        if old_manifest is not None:
+            old_files = [seg["file"] for seg in old_manifest["segments"]] + [old_manifest["metadata"]]
+            old_files += [seg[key] for seg in old_manifest["segments"] for key in ("codes", "keywords") if seg.get(key)]
+            if old_manifest.get("ivf"):
+                old_files.append(old_manifest["ivf"])
+            for name in old_files:
+                path = os.path.join(dir_path, name)
+                if os.path.exists(path):
+                    os.remove(path)
+
+        self._seal(dir_path, manifest)
+
+    def _write_chunk_rows(self, conn: sqlite3.Connection, start: int, end: int, full: bool) -> None:
+        """
+        Inserts chunk metadata for rows [start, end), plus the tombstones and references changed
+        since the last save. A full save writes all of them into the fresh (empty) tables instead.
+        """
+        columns = ("row_id", "doc_id", "filename", "chunk_index", "chunk_text") + PROVENANCE_FIELDS
+        conn.executemany(
+            f"INSERT OR REPLACE INTO chunks ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})",
+            (
+                (row, c["doc_id"], c["filename"], c["chunk_index"], c["chunk_text"])
+                + tuple(c.get(field) for field in PROVENANCE_FIELDS)
+                for row, c in enumerate(self.chunks[start:end], start)
+            )
+        )
+        if full:
+            dead = np.flatnonzero(self._deleted[:self.num_rows]) if self._num_deleted else []
+            ref_docs = list(self._refs)
+        else:
+            dead = [row for s, e in self._unsaved_tombstones for row in range(s, e)]
+            # A changed document's references are replaced as a whole (removal, promotion, re-pointing)
+            ref_docs = sorted(self._unsaved_ref_docs)
+            conn.executemany("DELETE FROM refs WHERE doc_id = ?", ((doc_id,) for doc_id in ref_docs))
+        conn.executemany("INSERT OR IGNORE INTO tombstones VALUES (?)", ((int(r),) for r in dead))
+        conn.executemany(
+            f"INSERT INTO refs ({', '.join(REF_COLUMNS)}) VALUES ({', '.join('?' * len(REF_COLUMNS))})",
+            (
+                (r["doc_id"], r["filename"], r["chunk_index"], r["chunk_text"]) + tuple(r["canonical"])
+                + tuple(r.get(field) for field in PROVENANCE_FIELDS)
+                for doc_id in ref_docs for r in self._refs.get(doc_id, [])
+            )
+        )
+
+    def _write_keywords(self, dir_path: str, seg_file: str, start: int, end: int) -> str:
+        """
+        Writes the BM25 postings for rows [start, end) next to their vector segment.
+        Re-tokenizes just those rows, so an incremental save stays proportional to the new rows.
+        """
+        kw_file = seg_file.replace("vectors_", "keywords_", 1).replace(".npy", ".npz")
+        texts = [c["chunk_text"] for c in self.chunks[start:end]]
+        np.savez(os.path.join(dir_path, kw_file), **KeywordIndex.build_arrays(start, texts))
+        return kw_file
+
+    def _rebuild_keyword_index(self) -> None:
+        """
+        Re-tokenizes every chunk (used after compaction and for stores saved without postings).
+        """
+        self.keyword_index = KeywordIndex()
+        self.keyword_index.add(0, [c["chunk_text"] for c in self.chunks])
+
+    def _write_ivf(self, dir_path: str, manifest: Dict[str, Any]) -> None:
+        """
+        Writes the IVF index (if any) under a fresh name and records it in the manifest,
+        together with the quantizer calibration.
+        """
+        manifest["quantization"] = self.quantizer.to_dict() if self.quantizer else None
+        manifest.pop("ivf", None)
+        if self.ivf is None:
+            return
+        ivf_file = f"ivf_{manifest['generation']:04d}_{len(manifest['segments']):05d}.npz"
+        np.savez(os.path.join(dir_path, ivf_file), **self.ivf.to_arrays())
+        manifest["ivf"] = ivf_file
+        manifest["ivf_settings"] = self._ivf_settings
+        manifest["ivf_built_rows"] = self._ivf_built_rows
+
+    def _seal(self, dir_path: str, manifest: Dict[str, Any]) -> None:
+        """
+        Re-points the store at the memory-mapped segments just written and frees the tail buffer.
+        """
+        self._open_segments(dir_path, manifest)
+        self._buffer = None
+        self._code_buffer = None
+        self._size = 0
+        self._tail_end = [0]
+        self._saved_dir = dir_path
+        self._saved_generation = manifest["generation"]
+        self._unsaved_tombstones = []
+        self._unsaved_ref_docs = set()
+
+    def _open_segments(self, dir_path: str, manifest: Dict[str, Any]) -> None:
+        """
+        Memory-maps every vector (and code) segment listed in the manifest.
+        """
+        self._segments = [
+            np.load(os.path.join(dir_path, seg["file"]), mmap_mode='r') for seg in manifest["segments"]
+        ]
+        self._code_segments = [
+            np.load(os.path.join(dir_path, seg["codes"]), mmap_mode='r')
+            for seg in manifest["segments"] if seg.get("codes")
+        ]
+        self._sealed_rows = sum(len(seg) for seg in self._segments)
+
+    def _load_legacy(self, dir_path: str) -> None:
+        """
+        Loads the older metadata.json + vectors.npy layout.
         """
         meta_path = os.path.join(dir_path, "metadata.json")
         vec_path = os.path.join(dir_path, "vectors.npy")
-        
+
+        self._reset()
+        self.embedding_backend = None
+        if self.quantizer is not None:
+            self.quantizer = Quantizer(self.quantizer.mode)
+
         if os.path.exists(meta_path):
             with open(meta_path, 'r', encoding='utf-8') as f:
                 self.chunks = json.load(f)
-                
+
         if os.path.exists(vec_path):
-            self.embeddings_matrix = np.load(vec_path)
+            # Older saves may hold raw (non-normalized) vectors, normalize once on load
+            self._append_vectors(self._normalize(np.load(vec_path).astype('float32', copy=False)))
+
+        self._deleted = np.zeros(max(self.num_rows, len(self.chunks)), dtype=bool)
+        self._reindex_chunks()
+        self._rebuild_keyword_index()
+
+    @staticmethod
+    def _read_manifest(dir_path: str) -> Optional[Dict[str, Any]]:
+        path = os.path.join(dir_path, MANIFEST_FILE)
+        if not os.path.exists(path):
+            return None
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    @staticmethod
+    def _write_manifest(dir_path: str, manifest: Dict[str, Any]) -> None:
+        # Write-then-rename so a crash never leaves a half-written manifest
+        tmp_path = os.path.join(dir_path, MANIFEST_FILE + ".tmp")
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f)
+        os.replace(tmp_path, os.path.join(dir_path, MANIFEST_FILE))
+
+    def _append_rows(self, doc_id: str, filename: str, records: List[Dict[str, Any]], vectors: np.ndarray) -> None:
+        """
+        Appends row chunks of one document: metadata, normalized vectors and every index over them.
+        """
+        start_index = len(self.chunks)
+        for offset, record in enumerate(records):
+            record["global_index"] = start_index + offset
+            self.chunks.append(record)
+        texts = [record["chunk_text"] for record in records]
+
+        # Tail buffer append is amortized O(1) per row, no full-matrix copy
+        self._append_vectors(vectors)
+        self.keyword_index.add(start_index, texts)
+
+        self._doc_rows.setdefault(doc_id, []).append((start_index, self.num_rows))
+        self._filename_docs.setdefault(filename, set()).add(doc_id)
+        if self._lsh is not None:
+            for record, signature in zip(records, self._lsh.signatures(texts)):
+                self._lsh.add((doc_id, record["chunk_index"]), signature)
+
+        # Keep the IVF index current: assign new rows, retrain once the store has grown a lot
+        if self.ivf is not None:
+            if self.num_live > self.IVF_RETRAIN_GROWTH * self._ivf_built_rows:
+                self.build_ivf(**self._ivf_settings)
+            else:
+                self.ivf.add(np.arange(start_index, self.num_rows), vectors)
+
+    def _add_reference(self, ref: Dict[str, Any]) -> None:
+        self._refs.setdefault(ref["doc_id"], []).append(ref)
+        self._ref_targets.setdefault(ref["canonical"], []).append(ref)
+        self._filename_docs.setdefault(ref["filename"], set()).add(ref["doc_id"])
+
+    def _drop_target(self, ref: Dict[str, Any]) -> None:
+        targets = [r for r in self._ref_targets.get(ref["canonical"], []) if r is not ref]
+        if targets:
+            self._ref_targets[ref["canonical"]] = targets
+        else:
+            self._ref_targets.pop(ref["canonical"], None)
+
+    def _promote_references(self, rows: List[int]) -> None:
+        """
+        Before rows are removed: the first reference to each of them becomes a row with the
+        same vector (no re-embedding), and the other references are re-pointed at it.
+        """
+        referenced = [
+            (row, key) for row in rows
+            for key in [(self.chunks[row]["doc_id"], self.chunks[row]["chunk_index"])]
+            if key in self._ref_targets
+        ]
+        if not referenced:
+            return
+
+        vectors = self._gather(np.array([row for row, _ in referenced], dtype=np.int64))
+        for (_, key), vector in zip(referenced, vectors):
+            first, *rest = self._ref_targets.pop(key)
+            self._unsaved_ref_docs.update(r["doc_id"] for r in [first, *rest])
+            siblings = [r for r in self._refs[first["doc_id"]] if r is not first]
+            if siblings:
+                self._refs[first["doc_id"]] = siblings
+            else:
+                del self._refs[first["doc_id"]]
+
+            record = {k: v for k, v in first.items() if k != "canonical"}
+            self._append_rows(first["doc_id"], first["filename"], [record], vector[None, :])
+            new_key = (first["doc_id"], first["chunk_index"])
+            for ref in rest:
+                ref["canonical"] = new_key
+            if rest:
+                self._ref_targets[new_key] = rest
+
+    def _rows_of(self, keys: Iterable[Tuple[str, int]]) -> Dict[Tuple[str, int], int]:
+        """
+        Resolves (doc_id, chunk_index) keys to live row ids (unknown keys are left out).
+        """
+        wanted: Dict[str, Set[int]] = {}
+        for doc_id, chunk_index in keys:
+            wanted.setdefault(doc_id, set()).add(chunk_index)
+
+        found = {}
+        for doc_id, indices in wanted.items():
+            for start, end in self._doc_rows.get(doc_id, []):
+                for row in range(start, end):
+                    if self.chunks[row]["chunk_index"] in indices:
+                        found[(doc_id, self.chunks[row]["chunk_index"])] = row
+        return found
+
+    def _new_lsh(self) -> MinHashLSH:
+        return MinHashLSH(threshold=self.near_dup_threshold)
+
+    def _append_vectors(self, vectors: np.ndarray) -> None:
+        """
+        Appends normalized rows to the tail buffer.
+        """
+        if self._dim is None:
+            self._dim = vectors.shape[1]
+        self._ensure_capacity(self._size + len(vectors), self._dim)
+        self._buffer[self._size:self._size + len(vectors)] = vectors
+        if self.quantizer is not None:
+            self._code_buffer[self._size:self._size + len(vectors)] = self.quantizer.encode(vectors)
+        self._size += len(vectors)
+        self._tail_end[0] = self._size
+
+    def _ensure_capacity(self, rows: int, dim: int) -> None:
+        """
+        Grows the tail buffer (doubling) so it can hold at least `rows` rows,
+        and the tombstone mask so it covers every row id. A tail another fork has
+        appended to since it was shared is copied instead of written over.
+        """
+        capacity = 0 if self._buffer is None else len(self._buffer)
+        if rows > capacity or self._tail_end[0] != self._size:
+            new_capacity = max(rows, capacity * 2 if rows > capacity else capacity, 64)
+            new_buffer = np.empty((new_capacity, dim), dtype='float32')
+            if self._buffer is not None:
+                new_buffer[:self._size] = self._buffer[:self._size]
+            self._buffer = new_buffer
+
+            if self.quantizer is not None:
+                new_codes = np.empty((new_capacity, dim), dtype=self.quantizer.dtype)
+                if self._code_buffer is not None:
+                    new_codes[:self._size] = self._code_buffer[:self._size]
+                self._code_buffer = new_codes
+            self._tail_end = [self._size]
+
+        total = self._sealed_rows + rows
+        if total > len(self._deleted):
+            new_deleted = np.zeros(max(total, len(self._deleted) * 2), dtype=bool)
+            new_deleted[:len(self._deleted)] = self._deleted
+            self._deleted = new_deleted
+
+    def _blocks(self) -> List[Tuple[int, np.ndarray]]:
+        """
+        Returns (first_row_id, block) for every sealed segment and the used part of the tail.
+        """
+        blocks = []
+        offset = 0
+        for seg in self._segments:
+            blocks.append((offset, seg))
+            offset += len(seg)
+        if self._size:
+            blocks.append((offset, self._buffer[:self._size]))
+        return blocks
+
+    def _code_blocks(self) -> List[Tuple[int, np.ndarray]]:
+        """
+        Same as _blocks() but over the quantized scan codes.
+        """
+        blocks = []
+        offset = 0
+        for seg in self._code_segments:
+            blocks.append((offset, seg))
+            offset += len(seg)
+        if self._size:
+            blocks.append((offset, self._code_buffer[:self._size]))
+        return blocks
+
+    def _score(self, queries: np.ndarray, use_codes: bool = False) -> np.ndarray:
+        """
+        Dot products of normalized queries (Dim,) or (N_queries, Dim) against every row.
+        Scored block by block so memory-mapped segments are never copied as a whole.
+        With use_codes (and a quantizer) the compact codes are scanned instead of float32.
+        """
+        if use_codes and self.quantizer is not None:
+            parts = [self.quantizer.score(block, queries) for _, block in self._code_blocks()]
+        else:
+            parts = [queries @ block.T for _, block in self._blocks()]
+        if len(parts) == 1:
+            return parts[0]
+        return np.concatenate(parts, axis=-1)
+
+    def _gather(self, rows: np.ndarray) -> np.ndarray:
+        """
+        Fetches the vectors for the given row ids (in order) across blocks.
+        """
+        rows = np.asarray(rows, dtype=np.int64)
+        out = np.empty((len(rows), self._dim or 0), dtype='float32')
+        for offset, block in self._blocks():
+            sel = (rows >= offset) & (rows < offset + len(block))
+            if sel.any():
+                out[sel] = block[rows[sel] - offset]
+        return out
+
+    def _reindex_chunks(self) -> None:
+        """
+        Rewrites `global_index` to match row positions and rebuilds the doc_id -> row ranges map
+        (tombstoned rows are left out of the map).
+        """
+        self._doc_rows = {}
+        self._filename_docs = {}
+        for row, chunk in enumerate(self.chunks):
+            if chunk.get("global_index") != row:
+                # New dict rather than an in-place edit: forks may share the old one
+                chunk = self.chunks[row] = dict(chunk, global_index=row)
+            if self._deleted[row]:
+                continue
+            self._filename_docs.setdefault(chunk["filename"], set()).add(chunk["doc_id"])
+            ranges = self._doc_rows.setdefault(chunk["doc_id"], [])
+            if ranges and ranges[-1][1] == row:
+                ranges[-1] = (ranges[-1][0], row + 1)
+            else:
+                ranges.append((row, row + 1))
+        for doc_id, refs in self._refs.items():
+            self._filename_docs.setdefault(refs[0]["filename"], set()).add(doc_id)
+
+    def _mask_deleted(self, scores: np.ndarray) -> None:
+        """
+        Pushes tombstoned rows to -inf (in place) so top-k never selects them.
+        """
+        if self._num_deleted:
+            scores[..., self._deleted[:self.num_rows]] = -np.inf
+
+    def _build_results(self, rows: np.ndarray, scores: np.ndarray) -> List[Dict]:
+        """
+        Helper to turn row ids (and their aligned scores) into result dicts.
+        """
+        results = []
+        for idx, score in zip(rows, scores):
+            # Create a copy of the chunk data to avoid mutating store
+            result_item = self.chunks[idx].copy()
+            result_item['score'] = float(score)  # Convert numpy float to native float
+            refs = self._ref_targets.get((result_item['doc_id'], result_item['chunk_index']))
+            if refs:
+                # Every document this text appears in (canonical first)
+                result_item['sources'] = [self._source(result_item)] + [self._source(ref) for ref in refs]
+            results.append(result_item)
+        return results
+
+    @staticmethod
+    def _source(chunk: Dict[str, Any]) -> Dict[str, Any]:
+        return {k: chunk[k] for k in ("doc_id", "filename", "chunk_index") + PROVENANCE_FIELDS if k in chunk}
+
+    @staticmethod
+    def _top_k_indices(scores: np.ndarray, top_k: int) -> np.ndarray:
+        """
+        Returns indices of the top_k highest scores, sorted descending.
+        Uses argpartition (O(N)) and only sorts the k selected candidates.
+        """
+        n = scores.shape[0]
+        if top_k <= 0 or n == 0:
+            return np.empty(0, dtype=np.int64)
+        if top_k < n:
+            candidates = np.argpartition(scores, n - top_k)[n - top_k:]
+        else:
+            candidates = np.arange(n)
+        return candidates[np.argsort(scores[candidates])[::-1]]
+
+    @staticmethod
+    def _normalize(vectors: np.ndarray) -> np.ndarray:
+        """
+        Scales vectors (1D or 2D rows) to unit length. Zero vectors are left as zeros.
+        """
+        norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return vectors / norms
+
+
+def quantization_report(
+    store,
+    query_embeddings: Sequence[Sequence[float]],
+    top_k: int = 5,
+    rerank_factor: int = 4,
+    modes: Sequence[str] = Quantizer.MODES
+) -> List[Dict[str, Any]]:
+    """
+    Compares each quantization mode against exact float32 search on the store's live rows:
+    bytes/chunk of the scan codes and recall@k, with and without full-precision re-rank.
+
+    Args:
+        store (VectorStore): Populated store (any quantization setting). Lives next to the store
+            since it reads the live rows straight from the store's buffers.
+        query_embeddings: Sample of query vectors.
+        top_k (int): k used for recall@k.
+        rerank_factor (int): Candidates re-scored per result (top_k * rerank_factor).
+        modes: Modes to evaluate.
+
+    Returns:
+        List[Dict]: One row per mode ('float32' baseline first).
+    """
+    live_rows = np.flatnonzero(~store._deleted[:store.num_rows])
+    vectors = store._gather(live_rows)
+    queries = VectorStore._normalize(np.asarray(query_embeddings, dtype='float32'))
+    k = min(top_k, len(live_rows))
+
+    exact_scores = queries @ vectors.T
+    truth = [set(VectorStore._top_k_indices(s, k).tolist()) for s in exact_scores]
+
+    def recall(found: List[np.ndarray]) -> float:
+        return float(np.mean([len(t & set(f.tolist())) / max(1, len(t)) for t, f in zip(truth, found)]))
+
+    report = [{
+        "mode": "float32",
+        "bytes_per_chunk": vectors.shape[1] * 4,
+        "recall": 1.0,
+        "recall_reranked": 1.0
+    }]
+    for mode in modes:
+        quantizer = Quantizer(mode)
+        codes = quantizer.encode(vectors)
+        approx_scores = quantizer.score(codes, queries)
+
+        plain, reranked = [], []
+        for q_scores, q_exact in zip(approx_scores, exact_scores):
+            plain.append(VectorStore._top_k_indices(q_scores, k))
+            cand = VectorStore._top_k_indices(q_scores, min(len(live_rows), k * rerank_factor))
+            reranked.append(cand[VectorStore._top_k_indices(q_exact[cand], k)])
+
+        report.append({
+            "mode": mode,
+            "bytes_per_chunk": quantizer.bytes_per_vector(vectors.shape[1]),
+            "recall": recall(plain),
+            "recall_reranked": recall(reranked)
+        })
+    return report
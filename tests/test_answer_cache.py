@@ -0,0 +1,84 @@
+import unittest
+from types import SimpleNamespace
+from modules.answer_cache import AnswerCache
+from modules.vector_store import VectorStore
+from modules.llm_interface import LLMInterface
+
+CONTEXTS = [{"doc_id": "d1", "chunk_index": 0, "chunk_text": "a"}, {"doc_id": "d1", "chunk_index": 1, "chunk_text": "b"}]
+
+class TestAnswerCache(unittest.TestCase):
+    def setUp(self):
+        self.cache = AnswerCache(threshold=0.95, ttl_seconds=60, max_entries=2)
+        self.cache.put("what is x?", [1.0, 0.0], CONTEXTS, "en", 1, "x is a", CONTEXTS[:1])
+
+    def test_similar_question_same_contexts_hits(self):
+        hit = self.cache.get([0.99, 0.05], CONTEXTS, "en", 1)
+        self.assertEqual(hit['answer'], "x is a")
+        self.assertEqual(hit['question'], "what is x?")
+
+    def test_misses(self):
+        self.assertIsNone(self.cache.get([0.0, 1.0], CONTEXTS, "en", 1))         # different question
+        self.assertIsNone(self.cache.get([1.0, 0.0], CONTEXTS[::-1], "en", 1))   # different context set
+        self.assertIsNone(self.cache.get([1.0, 0.0], CONTEXTS, "tr", 1))         # different language
+        self.assertEqual(self.cache.stats()['misses'], 3)
+
+    def test_store_change_invalidates(self):
+        self.assertIsNone(self.cache.get([1.0, 0.0], CONTEXTS, "en", 2))
+        self.assertEqual(self.cache.stats()['entries'], 0)
+        self.assertEqual(self.cache.stats()['invalidations'], 1)
+
+    def test_older_snapshot_neither_clears_nor_fills(self):
+        # Sessions sharing the cache may still read an earlier store version
+        self.cache.put("what is y?", [0.0, 1.0], CONTEXTS, "en", 2, "y is b", [])
+        self.assertIsNone(self.cache.get([0.0, 1.0], CONTEXTS, "en", 1))
+        self.cache.put("stale", [0.7, 0.7], CONTEXTS, "en", 1, "old", [])
+
+        self.assertEqual(self.cache.get([0.0, 1.0], CONTEXTS, "en", 2)['answer'], "y is b")
+        self.assertEqual(self.cache.stats()['entries'], 1)
+        self.assertEqual(self.cache.stats()['invalidations'], 1)
+
+    def test_ttl_and_size_eviction(self):
+        self.cache.put("q2", [0.0, 1.0], CONTEXTS, "en", 1, "a2", [])
+        self.cache.get([1.0, 0.0], CONTEXTS, "en", 1)  # touch the first entry
+        self.cache.put("q3", [0.7, 0.7], CONTEXTS, "en", 1, "a3", [])
+        self.assertIsNone(self.cache.get([0.0, 1.0], CONTEXTS, "en", 1))
+        self.assertIsNotNone(self.cache.get([1.0, 0.0], CONTEXTS, "en", 1))
+
+        self.cache.ttl_seconds = -1
+        self.assertIsNone(self.cache.get([1.0, 0.0], CONTEXTS, "en", 1))
+
+    def test_vector_store_version_tracks_changes(self):
+        store = VectorStore()
+        v0 = store.version
+        store.add_document("d1", "a.txt", ["a"], [[1.0, 0.0]])
+        v1 = store.version
+        store.search([1.0, 0.0], top_k=1)
+        self.assertEqual(store.version, v1)
+        store.remove_document("d1")
+        self.assertTrue(v0 < v1 < store.version)
+
+class TestQueryEmbeddingLRU(unittest.TestCase):
+    def test_repeated_queries_skip_the_api(self):
+        requests = []
+        def create(input, model):
+            requests.append(list(input))
+            return SimpleNamespace(data=[SimpleNamespace(embedding=[float(len(t))]) for t in input])
+
+        llm = LLMInterface(api_key="test-key", query_cache_size=2)
+        llm.client = SimpleNamespace(embeddings=SimpleNamespace(create=create))
+
+        self.assertEqual(llm.embed_query("hello"), [5.0])
+        self.assertEqual(llm.embed_query("  hello "), [5.0])
+        self.assertEqual(llm.submit_embed_query("hello").result(), [5.0])
+        self.assertEqual(requests, [["hello"]])
+
+        llm.embed_query("a")
+        llm.embed_query("bb")  # evicts "hello"
+        llm.embed_query("hello")
+        self.assertEqual(len(requests), 4)
+
+        stats = llm.query_cache_stats()
+        self.assertEqual((stats['hits'], stats['misses'], stats['entries']), (2, 4, 2))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,81 @@
+import os
+import json
+import tempfile
+import unittest
+import numpy as np
+from benchmarks import run, compare
+from benchmarks.corpus import synthetic_document, synthetic_vectors
+from benchmarks.fake_backend import FakeOpenAI, FakeAsyncOpenAI, fake_embedding
+from modules.llm_interface import LLMInterface, run_async
+
+class TestFakeBackend(unittest.TestCase):
+    def test_embeddings_deterministic_and_similar_for_shared_words(self):
+        a = fake_embedding("invoice total amount due", dim=64)
+        self.assertEqual(a, fake_embedding("invoice total amount due", dim=64))
+        self.assertAlmostEqual(float(np.linalg.norm(a)), 1.0, places=5)
+
+        near = np.dot(a, fake_embedding("invoice total amount overdue", dim=64))
+        far = np.dot(a, fake_embedding("weather forecast rain tomorrow", dim=64))
+        self.assertGreater(near, far)
+
+    def test_plugs_into_llm_interface(self):
+        client = FakeOpenAI(dim=32)
+        llm = LLMInterface(api_key="offline", client=client, async_client=FakeAsyncOpenAI(dim=32))
+
+        vectors = llm.embed_texts(["alpha beta", "gamma delta"])
+        self.assertEqual(len(vectors), 2)
+        self.assertEqual(len(vectors[0]), 32)
+        self.assertEqual(len(run_async(llm.aembed_texts(["epsilon"]))[0]), 32)
+
+        contexts = [{"chunk_text": "alpha beta", "doc_id": "d", "filename": "a.txt"}]
+        answer = llm.answer_question("alpha?", contexts, language="en")["answer"]
+        self.assertEqual(answer, llm.answer_question("alpha?", contexts, language="en")["answer"])
+        self.assertIn("[SOURCE 1]", answer)
+
+        streamed = "".join(llm.stream_answer_question("alpha?", contexts, language="en")["stream"])
+        self.assertIn("Synthetic answer", streamed)
+        self.assertGreater(client.requests, 0)
+
+class TestCorpus(unittest.TestCase):
+    def test_synthetic_inputs_are_seeded(self):
+        self.assertEqual(synthetic_document(2000, seed=3), synthetic_document(2000, seed=3))
+        self.assertIn("\r\n", synthetic_document(2000))
+
+        vectors, centers = synthetic_vectors(100, 16, n_clusters=4)
+        self.assertEqual(vectors.shape, (100, 16))
+        self.assertEqual(centers.shape, (4, 16))
+        np.testing.assert_allclose(np.linalg.norm(vectors, axis=1), 1.0, rtol=1e-5)
+
+class TestRun(unittest.TestCase):
+    def test_small_run_writes_comparable_json(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            out = os.path.join(tmp, "result.json")
+            run.main([
+                "--sizes", "300", "--dim", "16", "--queries", "5", "--text-mb", "0.02",
+                "--llm-chunks", "20", "--questions", "2", "--ivf", "--in-process", "--out", out
+            ])
+            with open(out, encoding='utf-8') as f:
+                results = json.load(f)
+
+        store = results["stores"]["300"]
+        for key in ("add_document_chunks_per_s", "save_seconds", "load_seconds", "build_ivf_seconds"):
+            self.assertGreater(store[key], 0)
+        self.assertEqual(set(store["search"]), {"p50_ms", "p95_ms", "p99_ms", "mean_ms", "samples"})
+        self.assertLessEqual(store["search"]["p50_ms"], store["search"]["p99_ms"])
+        self.assertGreater(results["text"]["clean_text_mb_per_s"], 0)
+        self.assertIn("commit", results["environment"])
+
+        report = compare.compare(results, results)
+        self.assertIn("stores.300.search.p99_ms", report)
+        self.assertNotIn("stores.300.search.samples", report)
+        self.assertTrue(all(row["verdict"] == "same" for row in report.values()))
+
+    def test_compare_direction(self):
+        old = {"stores": {"10": {"search": {"p99_ms": 10.0}, "add_document_chunks_per_s": 100.0}}}
+        new = {"stores": {"10": {"search": {"p99_ms": 5.0}, "add_document_chunks_per_s": 50.0}}}
+        report = compare.compare(old, new)
+        self.assertEqual(report["stores.10.search.p99_ms"]["verdict"], "better")
+        self.assertEqual(report["stores.10.add_document_chunks_per_s"]["verdict"], "worse")
+
+if __name__ == '__main__':
+    unittest.main()
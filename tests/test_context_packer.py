@@ -0,0 +1,84 @@
+import unittest
+from modules.context_packer import ContextPacker, SOURCE_HEADER_TOKENS
+from modules.document_processor import DocumentProcessor
+from modules.llm_interface import LLMInterface
+from benchmarks.corpus import synthetic_document
+
+def store_results(doc_id, chunks, scores):
+    """
+    Chunks shaped like VectorStore search results (text, index, offsets, score).
+    """
+    return [
+        dict(chunk.provenance(), doc_id=doc_id, filename=f"{doc_id}.txt", chunk_index=chunk.index,
+             chunk_text=chunk.text, score=score)
+        for chunk, score in zip(chunks, scores)
+    ]
+
+class TestContextPacker(unittest.TestCase):
+    def setUp(self):
+        processor = DocumentProcessor()
+        self.text = processor.clean_text(synthetic_document(6000, seed=2))
+        self.chunks = list(processor.iter_chunks([(1, self.text)], chunk_size=400, overlap=80))
+        self.packer = ContextPacker(token_budget=10_000, count_tokens=len)
+
+    def test_adjacent_chunks_merge_into_one_span(self):
+        contexts = store_results("a", [self.chunks[3], self.chunks[1], self.chunks[2]], [0.9, 0.8, 0.7])
+        spans = self.packer.pack(contexts)
+
+        self.assertEqual(len(spans), 1)
+        span = spans[0]
+        # Exactly the document text the three chunks cover, overlaps written once
+        self.assertEqual(span["chunk_text"], self.text[self.chunks[1].start:self.chunks[3].end])
+        self.assertEqual(span["chunk_indices"], [1, 2, 3])
+        self.assertEqual([c["chunk_index"] for c in span["chunks"]], [1, 2, 3])
+        self.assertEqual(span["score"], 0.9)
+        self.assertEqual((span["start_offset"], span["end_offset"]), (self.chunks[1].start, self.chunks[3].end))
+        self.assertLess(len(span["chunk_text"]), sum(len(c["chunk_text"]) for c in contexts))
+
+    def test_separate_runs_and_documents_ordered_by_score(self):
+        contexts = (
+            store_results("a", [self.chunks[0], self.chunks[5]], [0.5, 0.95])
+            + store_results("b", [self.chunks[0]], [0.7])
+        )
+        spans = self.packer.pack(contexts)
+        # a's chunk 0 text is identical to b's: sent once, under the better-scored copy
+        self.assertEqual([(s["doc_id"], s["chunk_index"]) for s in spans], [("a", 5), ("b", 0)])
+        # Unmerged spans are the original result dicts
+        self.assertIs(spans[0], contexts[1])
+
+    def test_budget_is_filled_in_score_order(self):
+        c = self.chunks
+        contexts = store_results("a", [c[0], c[8], c[4], c[1]], [0.9, 0.6, 0.2, 0.1])
+        # Room for chunks 0 and 8, plus the part of chunk 1 that chunk 0 doesn't already cover
+        budget = len(c[0].text) + len(c[8].text) + 2 * SOURCE_HEADER_TOKENS + (c[1].end - c[0].end)
+        self.assertLess(c[1].end - c[0].end, len(c[4].text) + SOURCE_HEADER_TOKENS)
+        packer = ContextPacker(token_budget=budget, count_tokens=len)
+
+        self.assertEqual([s["chunk_index"] for s in packer.pack(contexts[:3])], [0, 8])
+        # Overlapping text is only paid for once: a neighbour fits where a distant chunk didn't
+        spans = packer.pack(contexts)
+        self.assertEqual([s.get("chunk_indices", s["chunk_index"]) for s in spans], [[0, 1], 8])
+
+        # The best chunk is kept even if it alone exceeds the budget
+        self.assertEqual(len(ContextPacker(token_budget=1).pack(contexts)), 1)
+
+    def test_chunks_without_offsets_merge_by_index(self):
+        contexts = store_results("a", [self.chunks[2], self.chunks[3]], [0.5, 0.4])
+        for c in contexts:
+            del c["start_offset"], c["end_offset"]
+        spans = self.packer.pack(contexts)
+        self.assertEqual(len(spans), 1)
+        self.assertEqual(spans[0]["chunk_text"], self.text[self.chunks[2].start:self.chunks[3].end])
+
+    def test_answer_prompt_uses_packed_sources(self):
+        llm = LLMInterface(api_key="test-key", context_token_budget=10_000)
+        contexts = store_results("a", self.chunks[:3], [0.9, 0.8, 0.7])
+        sources = llm.pack_contexts(contexts)
+        prompt, _, _ = llm._answer_prompts("q?", sources, "en", False)
+
+        self.assertIn("--- SOURCE 1 (a.txt) ---", prompt)
+        self.assertNotIn("SOURCE 2", prompt)
+        self.assertEqual(prompt.count(self.chunks[1].text), 1)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,7 +1,35 @@
 import unittest
 import os
+import time
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+from pypdf import PdfWriter
+from pypdf.generic import DictionaryObject, NameObject, StreamObject
+from modules import document_processor
 from modules.document_processor import DocumentProcessor
 
+def write_text_pdf(path, page_texts):
+    """
+    Writes a minimal PDF with one line of Helvetica text per page.
+    """
+    writer = PdfWriter()
+    font = writer._add_object(DictionaryObject({
+        NameObject("/Type"): NameObject("/Font"),
+        NameObject("/Subtype"): NameObject("/Type1"),
+        NameObject("/BaseFont"): NameObject("/Helvetica")
+    }))
+    for text in page_texts:
+        page = writer.add_blank_page(612, 792)
+        content = StreamObject()
+        content.set_data(f"BT /F1 12 Tf 72 720 Td ({text}) Tj ET".encode())
+        page[NameObject("/Contents")] = writer._add_object(content)
+        page[NameObject("/Resources")] = DictionaryObject({
+            NameObject("/Font"): DictionaryObject({NameObject("/F1"): font})
+        })
+    writer.write(path)
+
 class TestDocumentProcessor(unittest.TestCase):
     def setUp(self):
         self.processor = DocumentProcessor()
@@ -36,6 +64,13 @@ class TestDocumentProcessor(unittest.TestCase):
         self.assertEqual(doc.filename, "test_doc.txt")
         self.assertTrue("Hello World" in doc.text)
 
+    def test_doc_id_is_content_hash(self):
+        first = self.processor.build_document(self.test_file_path)
+        self.assertEqual(first.doc_id, self.processor.build_document(self.test_file_path).doc_id)
+        with open(self.test_file_path, "a") as f:
+            f.write("One more line.")
+        self.assertNotEqual(first.doc_id, self.processor.build_document(self.test_file_path).doc_id)
+
     def test_file_not_found(self):
         with self.assertRaises(FileNotFoundError):
             self.processor.build_document("non_existent_file.pdf")
@@ -51,5 +86,148 @@ class TestDocumentProcessor(unittest.TestCase):
             if os.path.exists(bad_file):
                 os.remove(bad_file)
 
+class TestStreamingChunker(unittest.TestCase):
+    def setUp(self):
+        self.processor = DocumentProcessor()
+
+    def test_matches_chunk_text_on_single_page(self):
+        text = "word " * 500
+        streamed = [c.text for c in self.processor.iter_chunks([(1, text)], chunk_size=100, overlap=20)]
+        self.assertEqual(streamed, self.processor.chunk_text(self.processor.clean_text(text), 100, 20))
+
+    def test_consumes_pages_lazily(self):
+        consumed = []
+        def pages():
+            for n in range(1, 1001):
+                consumed.append(n)
+                yield n, f"page {n} " + "x" * 200
+
+        first = next(self.processor.iter_chunks(pages(), chunk_size=100, overlap=10))
+        self.assertEqual(first.page_start, 1)
+        self.assertLess(len(consumed), 3)
+
+    def test_token_sizing(self):
+        count_words = lambda s: len(s.split())
+        text = " ".join(f"w{i}" for i in range(100))
+        chunks = list(self.processor.iter_chunks([(1, text)], chunk_size=10, overlap=2, count_tokens=count_words))
+
+        self.assertTrue(all(count_words(c.text) <= 10 for c in chunks))
+        self.assertEqual(chunks[0].text.split(), [f"w{i}" for i in range(10)])
+        self.assertTrue(chunks[-1].text.endswith("w99"))
+
+    def test_join_chunks_rebuilds_document_text(self):
+        pages = [(1, "alpha beta gamma " * 40), (2, "delta epsilon " * 60)]
+        doc_text = self.processor._join_pages(self.processor._iter_clean_pages(pages))
+        chunks = list(self.processor.iter_chunks(pages, chunk_size=120, overlap=30))
+
+        self.assertEqual(self.processor.join_chunks(chunks), doc_text)
+        self.assertEqual(self.processor.join_chunks(chunks[2:5]), doc_text[chunks[2].start:chunks[4].end])
+        # Chunks that don't touch are separated by a space
+        self.assertEqual(self.processor.join_chunks([chunks[0], chunks[3]]), chunks[0].text + " " + chunks[3].text)
+
+class TestStreamingTxt(unittest.TestCase):
+    def setUp(self):
+        self.processor = DocumentProcessor()
+        self.tmp = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write(self, name, data):
+        path = os.path.join(self.tmp.name, name)
+        with open(path, "wb") as f:
+            f.write(data)
+        return path
+
+    def test_encoding_detection(self):
+        utf8 = self.write("u.txt", "çalışma şekli".encode("utf-8"))
+        bom = self.write("b.txt", "\ufeffhello".encode("utf-8"))
+        latin = self.write("l.txt", "café crème".encode("latin-1"))
+
+        self.assertEqual(self.processor.extract_text(utf8), "çalışma şekli")
+        self.assertEqual(self.processor.extract_text(bom), "hello")
+        self.assertEqual(self.processor.extract_text(latin), "café crème")
+
+    def test_multibyte_characters_split_across_reads(self):
+        path = self.write("u.txt", ("ğüş" * 50).encode("utf-8"))
+        blocks = list(self.processor.iter_txt_blocks(path, block_size=7))
+        self.assertGreater(len(blocks), 1)
+        self.assertEqual("".join(blocks), "ğüş" * 50)
+
+    def test_block_cleaning_matches_whole_text(self):
+        raw = "  Title\r\n\r\n\r\nPara  one\t\tcontinues.\r\n \r\nPara two   ends.\r\n\r\n  "
+        path = self.write("w.txt", raw.encode("utf-8"))
+        blocks = self.processor.iter_txt_blocks(path, block_size=3)
+
+        cleaned = "".join(text for _, text in self.processor._iter_clean_pages((1, b) for b in blocks))
+        self.assertEqual(cleaned, self.processor.clean_text(raw))
+        self.assertEqual(cleaned, "Title\n\nPara one continues.\n\nPara two ends.")
+
+    def test_chunks_over_blocks_match_document(self):
+        path = self.write("long.txt", ("sentence number one.  \r\n" * 300).encode("utf-8"))
+        doc = self.processor.build_document(path)
+        pages = ((1, b) for b in self.processor.iter_txt_blocks(path, block_size=100))
+        chunks = list(self.processor.iter_chunks(pages, chunk_size=200, overlap=20))
+
+        self.assertEqual([c.text for c in chunks], self.processor.chunk_text(doc.text, 200, 20))
+        for chunk in chunks:
+            self.assertEqual(doc.text[chunk.start:chunk.end], chunk.text)
+            self.assertEqual((chunk.page_start, chunk.page_end), (1, 1))
+
+class TestPdfExtraction(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.pdf_path = os.path.join(self.tmp.name, "doc.pdf")
+        self.page_texts = [f"Page {i + 1} content" for i in range(7)]
+        write_text_pdf(self.pdf_path, self.page_texts)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_parallel_shards_yield_pages_in_order(self):
+        processor = DocumentProcessor(max_workers=3, pages_per_shard=2, parallel_min_pages=1)
+        pages = list(processor.iter_pdf_pages(self.pdf_path))
+        self.assertEqual(pages, list(enumerate(self.page_texts, start=1)))
+
+    def test_chunks_carry_pages_and_offsets(self):
+        processor = DocumentProcessor(max_workers=1)
+        doc = processor.build_document(self.pdf_path)
+        chunks = list(processor.iter_chunks(processor.iter_pages(self.pdf_path), chunk_size=40, overlap=5))
+
+        self.assertEqual([c.index for c in chunks], list(range(len(chunks))))
+        for chunk in chunks:
+            self.assertEqual(doc.text[chunk.start:chunk.end], chunk.text)
+            # One line per page in this PDF, so the page is the line number
+            self.assertEqual(chunk.page_start, doc.text.count("\n", 0, chunk.start) + 1)
+            self.assertEqual(chunk.page_end, doc.text.count("\n", 0, chunk.end - 1) + 1)
+        self.assertEqual((chunks[0].page_start, chunks[-1].page_end), (1, 7))
+
+    def test_stopping_early_does_not_wait_for_running_shards(self):
+        release = threading.Event()
+        extract = document_processor._extract_page_range
+
+        def slow_after_first_shard(file_path, start, end):
+            if start > 0:
+                release.wait(timeout=5)
+            return extract(file_path, start, end)
+
+        processor = DocumentProcessor(max_workers=3, pages_per_shard=2, parallel_min_pages=1)
+        # Threads stand in for the worker processes, so the shard function can be patched
+        with mock.patch.object(document_processor, "ProcessPoolExecutor", ThreadPoolExecutor), \
+                mock.patch.object(document_processor, "_extract_page_range", slow_after_first_shard):
+            pages = processor.iter_pdf_pages(self.pdf_path)
+            self.assertEqual(next(pages), (1, "Page 1 content"))
+            start = time.perf_counter()
+            pages.close()
+            elapsed = time.perf_counter() - start
+        release.set()
+        self.assertLess(elapsed, 1.0)
+
+    def test_parallel_matches_sequential(self):
+        parallel = DocumentProcessor(max_workers=2, pages_per_shard=3, parallel_min_pages=1)
+        sequential = DocumentProcessor(max_workers=1)
+        self.assertEqual(parallel.extract_text(self.pdf_path), sequential.extract_text(self.pdf_path))
+        self.assertIn("Page 7 content", sequential.build_document(self.pdf_path).text)
+
 if __name__ == '__main__':
     unittest.main()
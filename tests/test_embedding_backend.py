@@ -0,0 +1,150 @@
+import os
+import tempfile
+import unittest
+import numpy as np
+from modules.embedding_backend import (
+    EmbeddingBackend, HashingEmbedder, TfidfSvdEmbedder, EMBEDDER_FILE, backend_for
+)
+from modules.vector_store import VectorStore
+from modules.llm_interface import LLMInterface, run_async
+from modules.ingest_pipeline import IngestPipeline
+from benchmarks.corpus import synthetic_chunks
+from benchmarks.fake_backend import FakeOpenAI, FakeAsyncOpenAI
+
+class TestHashingEmbedder(unittest.TestCase):
+    def setUp(self):
+        self.embedder = HashingEmbedder(dim=256)
+
+    def test_deterministic_unit_vectors(self):
+        texts = ["invoice total amount due", "weather forecast", ""]
+        vectors = self.embedder.encode(texts)
+        self.assertEqual(vectors.shape, (3, 256))
+        self.assertEqual(vectors.dtype, np.float32)
+        np.testing.assert_allclose(np.linalg.norm(vectors[:2], axis=1), 1.0, rtol=1e-5)
+        self.assertFalse(vectors[2].any())
+        np.testing.assert_array_equal(vectors, HashingEmbedder(dim=256).encode(texts))
+
+    def test_single_text_fast_path_matches_batch(self):
+        texts = synthetic_chunks(50, words_per_chunk=8) + ["Çağrı merkezi fatura fatura"]
+        batch = self.embedder.encode(texts)
+        singles = np.vstack([self.embedder.encode([t]) for t in texts])
+        np.testing.assert_allclose(singles, batch, atol=1e-6)
+
+    def test_backends_must_implement_encode(self):
+        with self.assertRaises(TypeError):
+            EmbeddingBackend()
+
+    def test_name_round_trip(self):
+        embedder = HashingEmbedder(dim=128, ngram_range=(1, 3))
+        rebuilt = HashingEmbedder.from_name(embedder.name)
+        self.assertEqual(rebuilt.name, "hashing:128:1-3")
+        np.testing.assert_array_equal(rebuilt.encode(["a b c"]), embedder.encode(["a b c"]))
+        with self.assertRaises(ValueError):
+            HashingEmbedder.from_name("tfidf-svd:64:abc")
+
+class TestTfidfSvdEmbedder(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.texts = synthetic_chunks(300, words_per_chunk=60)
+        cls.embedder = TfidfSvdEmbedder(dim=32).fit(cls.texts)
+
+    def test_fit_and_encode(self):
+        self.assertTrue(self.embedder.name.startswith("tfidf-svd:32:"))
+        vectors = self.embedder.encode(self.texts[:10])
+        self.assertEqual(vectors.shape, (10, 32))
+        np.testing.assert_allclose(np.linalg.norm(vectors, axis=1), 1.0, rtol=1e-5)
+        # A chunk is closer to a part of itself than to an unrelated chunk
+        part = self.embedder.encode([" ".join(self.texts[0].split()[:30])])[0]
+        self.assertGreater(part @ vectors[0], part @ vectors[5])
+
+    def test_single_text_fast_path_matches_batch(self):
+        texts = self.texts[:20] + ["words the model never saw"]
+        batch = self.embedder.encode(texts)
+        singles = np.vstack([self.embedder.encode([t]) for t in texts])
+        np.testing.assert_allclose(singles, batch, atol=1e-5)
+
+    def test_unfitted_and_tiny_corpora(self):
+        with self.assertRaises(ValueError):
+            TfidfSvdEmbedder().encode(["x"])
+        with self.assertRaises(ValueError):
+            TfidfSvdEmbedder().fit(["only one", ""])
+
+    def test_save_load_and_backend_for(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            self.embedder.encode(["warm the analyzer cache"])
+            self.embedder.save(os.path.join(tmp, EMBEDDER_FILE))
+            loaded = backend_for(self.embedder.name, tmp)
+            self.assertEqual(loaded.name, self.embedder.name)
+            np.testing.assert_array_equal(loaded.encode(self.texts[:5]), self.embedder.encode(self.texts[:5]))
+
+            # A different fit is a different vector space
+            with self.assertRaises(ValueError):
+                backend_for("tfidf-svd:32:000000000000", tmp)
+        with tempfile.TemporaryDirectory() as empty:
+            with self.assertRaises(ValueError):
+                backend_for(self.embedder.name, empty)
+
+    def test_backend_for_remote_and_stateless(self):
+        self.assertIsNone(backend_for(None))
+        self.assertIsNone(backend_for("openai:text-embedding-3-small"))
+        self.assertIsInstance(backend_for("hashing:64:1-2"), HashingEmbedder)
+
+class TestStoreRecordsBackend(unittest.TestCase):
+    def test_bind_persist_and_reject_mismatch(self):
+        embedder = HashingEmbedder(dim=64)
+        store = VectorStore()
+        store.bind_embedding_backend(embedder.name, embedder.dim)
+        store.add_document("a", "a.txt", ["alpha beta"], embedder.encode(["alpha beta"]).tolist())
+        self.assertEqual(store.embedding_info, {"backend": "hashing:64:1-2", "dim": 64})
+
+        with self.assertRaises(ValueError):
+            store.bind_embedding_backend("openai:text-embedding-3-small")
+        with self.assertRaises(ValueError):
+            store.bind_embedding_backend(embedder.name, 128)
+        # Re-binding the same backend is a no-op; forks keep the record
+        store.bind_embedding_backend(embedder.name, 64)
+        self.assertEqual(store.fork().embedding_backend, embedder.name)
+
+        with tempfile.TemporaryDirectory() as tmp:
+            store.save(tmp)
+            store.add_document("b", "b.txt", ["gamma"], embedder.encode(["gamma"]).tolist())
+            store.save(tmp)  # incremental
+            reloaded = VectorStore()
+            reloaded.load(tmp)
+        self.assertEqual(reloaded.embedding_info, {"backend": "hashing:64:1-2", "dim": 64})
+
+    def test_empty_store_can_switch(self):
+        store = VectorStore(embedding_backend="openai:text-embedding-3-small")
+        store.bind_embedding_backend("hashing:64:1-2")
+        self.assertEqual(store.embedding_backend, "hashing:64:1-2")
+
+    def test_pipeline_refuses_other_backend(self):
+        store = VectorStore(embedding_backend="hashing:64:1-2")
+        store.add_document("a", "a.txt", ["x"], [[1.0, 0.0]])
+        with tempfile.TemporaryDirectory() as tmp:
+            pipeline = IngestPipeline(
+                store=store, store_dir=tmp, embed_fn=lambda texts: [],
+                embedding_backend="openai:text-embedding-3-small", log=lambda msg: None
+            )
+            with self.assertRaises(ValueError):
+                pipeline.run(tmp)
+
+class TestLLMInterfaceWithEmbedder(unittest.TestCase):
+    def test_local_embeddings_skip_the_api(self):
+        client = FakeOpenAI(dim=16)
+        embedder = HashingEmbedder(dim=128)
+        llm = LLMInterface(api_key="offline", client=client, async_client=FakeAsyncOpenAI(dim=16), embedder=embedder)
+
+        self.assertEqual(llm.embedding_backend, embedder.name)
+        vectors = llm.embed_texts(["alpha\nbeta", "gamma"])
+        self.assertEqual(vectors[0], embedder.encode(["alpha beta"])[0].tolist())
+        self.assertEqual(len(run_async(llm.aembed_texts(["delta"]))[0]), 128)
+        self.assertEqual(llm.embed_query("alpha beta"), vectors[0])
+        self.assertEqual(llm.submit_embed_query("alpha beta").result(timeout=1), vectors[0])
+        self.assertEqual(client.requests, 0)
+
+        remote = LLMInterface(api_key="offline", client=client, async_client=FakeAsyncOpenAI(dim=16))
+        self.assertEqual(remote.embedding_backend, "openai:text-embedding-3-small")
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,182 @@
+import os
+import asyncio
+import unittest
+import tempfile
+import threading
+from types import SimpleNamespace
+from modules.embedding_batcher import EmbeddingBatcher, EmbeddingError, AdaptiveLimiter
+from modules.embedding_cache import EmbeddingCache
+from modules.llm_interface import LLMInterface
+
+class FakeAPIError(Exception):
+    def __init__(self, status_code):
+        super().__init__(f"status {status_code}")
+        self.status_code = status_code
+
+class FakeEmbeddingServer:
+    """
+    Stands in for the embeddings endpoint: returns [len(text)] vectors, optionally failing
+    the first `fail_times` calls with `fail_status`, and records peak concurrency.
+    """
+    def __init__(self, fail_times=0, fail_status=429):
+        self.fail_times = fail_times
+        self.fail_status = fail_status
+        self.calls = []
+        self.active = 0
+        self.peak = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, texts):
+        with self._lock:
+            self.calls.append(list(texts))
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+            fail = self.fail_times > 0
+            if fail:
+                self.fail_times -= 1
+        try:
+            if fail:
+                raise FakeAPIError(self.fail_status)
+            return [[float(len(t))] for t in texts]
+        finally:
+            with self._lock:
+                self.active -= 1
+
+class TestEmbeddingBatcher(unittest.TestCase):
+    def make_batcher(self, **kwargs):
+        settings = dict(max_batch_tokens=10, max_concurrency=4, base_delay=0.0, max_delay=0.0)
+        settings.update(kwargs)
+        return EmbeddingBatcher(**settings)
+
+    def test_batches_by_tokens_and_inputs(self):
+        batcher = self.make_batcher(max_batch_inputs=3)
+        texts = ["x" * 12] * 5  # ~5 tokens each with the character estimate
+        batches = batcher.make_batches(texts)
+
+        self.assertEqual([start for start, _ in batches], [0, 2, 4])
+        self.assertTrue(all(len(b) <= 3 for _, b in batches))
+
+    def test_preserves_order_across_concurrent_batches(self):
+        batcher = self.make_batcher()
+        server = FakeEmbeddingServer()
+        texts = ["a" * i for i in range(1, 40)]
+
+        self.assertEqual(batcher.embed(texts, server), [[float(len(t))] for t in texts])
+        self.assertGreater(len(server.calls), 1)
+        self.assertLessEqual(server.peak, 4)
+
+    def test_retries_rate_limit_and_lowers_concurrency(self):
+        batcher = self.make_batcher()
+        server = FakeEmbeddingServer(fail_times=2)
+
+        self.assertEqual(batcher.embed(["abc"], server), [[3.0]])
+        self.assertEqual(len(server.calls), 3)
+        # 4 -> 2 -> 1 on the two 429s, then +1 after the success
+        self.assertEqual(batcher.limiter.limit, 2)
+
+    def test_permanent_error_raises(self):
+        batcher = self.make_batcher()
+        server = FakeEmbeddingServer(fail_times=1, fail_status=400)
+
+        with self.assertRaises(EmbeddingError):
+            batcher.embed(["abc"], server)
+        self.assertEqual(len(server.calls), 1)
+
+    def test_gives_up_after_max_retries(self):
+        batcher = self.make_batcher(max_retries=2)
+        server = FakeEmbeddingServer(fail_times=10, fail_status=503)
+
+        with self.assertRaises(EmbeddingError):
+            batcher.embed(["abc"], server)
+        self.assertEqual(len(server.calls), 3)
+
+    def test_llm_interface_raises_instead_of_empty(self):
+        llm = LLMInterface(api_key="test-key", embed_batcher=self.make_batcher(max_retries=0))
+        server = FakeEmbeddingServer(fail_times=1, fail_status=500)
+        llm.client = SimpleNamespace(embeddings=SimpleNamespace(
+            create=lambda input, model: SimpleNamespace(data=[SimpleNamespace(embedding=v) for v in server(input)])
+        ))
+
+        with self.assertRaises(EmbeddingError):
+            llm.embed_texts(["abc"])
+        # Queries degrade to [] so search can fall back to keywords
+        server.fail_times = 1
+        self.assertEqual(llm.embed_query("abc"), [])
+        self.assertEqual(llm.embed_texts(["abcd"]), [[4.0]])
+
+    def test_truncated_inputs_are_cached_under_the_original_text(self):
+        batcher = self.make_batcher(max_batch_tokens=100, max_input_tokens=5)
+        server = FakeEmbeddingServer()
+        long_text = "y" * 60
+        cached = []
+
+        vectors = batcher.embed(["short", long_text], server, on_batch=lambda texts, vecs: cached.extend(texts))
+        # Only the request sees the truncated text
+        self.assertEqual(server.calls, [["short", "y" * 15]])
+        self.assertEqual(vectors, [[5.0], [15.0]])
+        self.assertEqual(cached, ["short", long_text])
+
+        with tempfile.TemporaryDirectory() as tmp:
+            llm = LLMInterface(api_key="test-key", embed_batcher=batcher,
+                               embedding_cache=EmbeddingCache(os.path.join(tmp, "cache.db")))
+            llm.client = SimpleNamespace(embeddings=SimpleNamespace(
+                create=lambda input, model: SimpleNamespace(data=[SimpleNamespace(embedding=v) for v in server(input)])
+            ))
+            llm.embed_texts([long_text])
+            requests = len(server.calls)
+            # A second run over the same over-long chunk is served from the cache
+            self.assertEqual(llm.embed_texts([long_text]), [[15.0]])
+            self.assertEqual(len(server.calls), requests)
+
+class TestAdaptiveLimiter(unittest.TestCase):
+    def test_coroutines_get_slots_released_by_threads_in_order(self):
+        limiter = AdaptiveLimiter(1)
+        limiter.acquire()
+        order = []
+
+        async def worker(name):
+            await limiter.acquire_async()
+            order.append(name)
+
+        async def main():
+            tasks = [asyncio.create_task(worker(i)) for i in range(3)]
+            await asyncio.sleep(0.02)
+            self.assertEqual(order, [])
+            # A threaded caller frees the slot: the oldest waiter gets it, nobody polls
+            threading.Timer(0.01, limiter.release).start()
+            await asyncio.wait_for(asyncio.shield(tasks[0]), timeout=1.0)
+            self.assertEqual((order, limiter.in_flight), ([0], 1))
+            for expected in ([0, 1], [0, 1, 2]):
+                limiter.release()
+                await asyncio.sleep(0)
+                await asyncio.sleep(0)
+                self.assertEqual(order, expected)
+            await asyncio.gather(*tasks)
+
+        asyncio.run(main())
+        self.assertEqual(limiter.in_flight, 1)
+
+    def test_cancelled_waiter_does_not_keep_a_slot(self):
+        limiter = AdaptiveLimiter(1)
+        limiter.acquire()
+
+        async def main():
+            waiting = asyncio.create_task(limiter.acquire_async())
+            await asyncio.sleep(0.01)
+            waiting.cancel()
+            # Cancelled after the slot was handed over: it is given back
+            granted = asyncio.create_task(limiter.acquire_async())
+            await asyncio.sleep(0.01)
+            limiter.release()
+            granted.cancel()
+            for task in (waiting, granted):
+                with self.assertRaises(asyncio.CancelledError):
+                    await task
+            await asyncio.sleep(0)
+
+        asyncio.run(main())
+        self.assertEqual(limiter.in_flight, 0)
+        self.assertEqual(len(limiter._async_waiters), 0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,67 @@
+import unittest
+import os
+import tempfile
+from types import SimpleNamespace
+from modules.embedding_cache import EmbeddingCache
+from modules.llm_interface import LLMInterface
+
+class StubEmbeddings:
+    """
+    Stands in for client.embeddings: records requests, returns [len(text), 1.0] vectors.
+    """
+    def __init__(self):
+        self.requests = []
+
+    def create(self, input, model):
+        self.requests.append(list(input))
+        return SimpleNamespace(data=[SimpleNamespace(embedding=[float(len(t)), 1.0]) for t in input])
+
+class TestEmbeddingCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "cache", "emb.sqlite")
+        self.cache = EmbeddingCache(self.path, max_entries=3)
+
+    def tearDown(self):
+        self.cache.close()
+        self.tmp.cleanup()
+
+    def test_get_put_and_stats(self):
+        self.assertEqual(self.cache.get_many("m", ["a", "b"]), [None, None])
+        self.cache.put_many("m", ["a"], [[0.5, 0.25]])
+
+        self.assertEqual(self.cache.get_many("m", ["a", "b", "  a "]), [[0.5, 0.25], None, [0.5, 0.25]])
+        # Same text, different model -> different key
+        self.assertEqual(self.cache.get_many("other", ["a"]), [None])
+
+        stats = self.cache.stats()
+        self.assertEqual((stats['hits'], stats['misses'], stats['entries']), (2, 4, 1))
+
+    def test_lru_eviction(self):
+        self.cache.put_many("m", ["a", "b", "c"], [[1.0], [2.0], [3.0]])
+        self.cache.get_many("m", ["a"])  # touch "a" so "b" is the oldest
+        self.cache.put_many("m", ["d"], [[4.0]])
+
+        self.assertEqual(self.cache.get_many("m", ["a", "b", "c", "d"]), [[1.0], None, [3.0], [4.0]])
+
+    def test_persists_across_instances(self):
+        self.cache.put_many("m", ["a"], [[1.0, 2.0]])
+        reopened = EmbeddingCache(self.path)
+        self.assertEqual(reopened.get_many("m", ["a"]), [[1.0, 2.0]])
+        reopened.close()
+
+    def test_llm_interface_only_requests_misses(self):
+        llm = LLMInterface(api_key="test-key", embedding_cache=self.cache)
+        stub = StubEmbeddings()
+        llm.client = SimpleNamespace(embeddings=stub)
+
+        first = llm.embed_texts(["one", "three", "one"])
+        self.assertEqual(stub.requests, [["one", "three"]])
+        self.assertEqual(first, [[3.0, 1.0], [5.0, 1.0], [3.0, 1.0]])
+
+        second = llm.embed_texts(["three", "four", "one"])
+        self.assertEqual(stub.requests[-1], ["four"])
+        self.assertEqual(second, [[5.0, 1.0], [4.0, 1.0], [3.0, 1.0]])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,43 @@
+import unittest
+import os
+import tempfile
+from modules.file_manifest import FileManifest
+
+class TestFileManifest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "manifest.json")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_lookup_classifies_files(self):
+        manifest = FileManifest(self.path)
+        self.assertEqual(manifest.lookup("a.txt", 10, 1.0, "h1"), (FileManifest.NEW, None))
+
+        manifest.record("a.txt", 10, 1.0, "h1", "h1", chunks=2)
+        self.assertTrue(manifest.stat_matches("a.txt", 10, 1.0))
+        self.assertFalse(manifest.stat_matches("a.txt", 10, 2.0))
+
+        status, entry = manifest.lookup("a.txt", 12, 3.0, "h2")
+        self.assertEqual((status, entry["doc_id"]), (FileManifest.CHANGED, "h1"))
+
+        # Same bytes with a new mtime: unchanged, and the stat is refreshed
+        self.assertEqual(manifest.lookup("a.txt", 10, 5.0, "h1")[0], FileManifest.UNCHANGED)
+        self.assertTrue(manifest.stat_matches("a.txt", 10, 5.0))
+
+    def test_persists_and_tracks_references(self):
+        manifest = FileManifest(self.path)
+        manifest.record("a.txt", 10, 1.0, "h1", "h1")
+        manifest.record("copy/a.txt", 10, 2.0, "h1", "h1")
+        manifest.record("empty.txt", 0, 1.0, "h0", None)
+        manifest.save()
+
+        loaded = FileManifest(self.path)
+        self.assertEqual(loaded.references("h1"), 2)
+        self.assertEqual(loaded.references("h0"), 0)
+        loaded.record("a.txt", 11, 3.0, "h2", "h2")
+        self.assertEqual(loaded.references("h1"), 1)
+
+if __name__ == '__main__':
+    unittest.main()
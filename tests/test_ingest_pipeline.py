@@ -0,0 +1,233 @@
+import unittest
+import os
+import json
+import tempfile
+import threading
+import numpy as np
+from modules.vector_store import VectorStore
+from modules.ingest_pipeline import IngestPipeline, CHECKPOINT_FILE
+
+def prose(tag, sentences=20):
+    """
+    Text without repeated phrases (so no chunk is a near-duplicate of another).
+    """
+    return " ".join(f"{tag} sentence {j} mentions item{j * 7 + sum(map(ord, tag))}." for j in range(sentences))
+
+class FakeEmbedder:
+    """
+    Deterministic embed_fn that records every text it was asked to embed.
+    """
+    def __init__(self, fail_on=None):
+        self.fail_on = fail_on
+        self.calls = []
+        self._lock = threading.Lock()
+
+    def __call__(self, texts):
+        with self._lock:
+            self.calls.append(list(texts))
+        if self.fail_on and any(self.fail_on in t for t in texts):
+            raise RuntimeError("embedding failed")
+        return [[float(len(t)), float(sum(map(ord, t)) % 97), 1.0] for t in texts]
+
+    @property
+    def texts(self):
+        return [t for call in self.calls for t in call]
+
+class TestIngestPipeline(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = os.path.join(self.tmp.name, "docs")
+        self.store_dir = os.path.join(self.tmp.name, "store")
+        os.makedirs(os.path.join(self.root, "sub"))
+        for i in range(6):
+            self.write(f"doc{i}.txt", prose(f"Document {i}"))
+        self.write("sub/nested.txt", prose("Nested document"))
+        self.write("notes.md", "ignored")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def write(self, rel_path, text):
+        path = os.path.join(self.root, rel_path)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(text)
+        return path
+
+    def pipeline(self, embedder, store=None, **kwargs):
+        if store is None:
+            store = VectorStore()
+            if os.path.exists(self.store_dir):
+                store.load(self.store_dir)
+        return IngestPipeline(
+            store=store,
+            store_dir=self.store_dir,
+            embed_fn=embedder,
+            chunk_size=100,
+            overlap=10,
+            checkpoint_every=2,
+            log=lambda msg: None,
+            **kwargs
+        )
+
+    def test_ingests_tree_and_persists(self):
+        stats = self.pipeline(FakeEmbedder(), extract_workers=3, chunk_workers=2, embed_workers=3, queue_size=1).run(self.root)
+
+        self.assertEqual((stats["found"], stats["stored"], stats["failed"]), (7, 7, {}))
+        store = VectorStore()
+        store.load(self.store_dir)
+        self.assertEqual(store.num_live, stats["chunks"])
+        self.assertEqual(sorted(store.documents().values()), sorted([f"doc{i}.txt" for i in range(6)] + ["sub/nested.txt"]))
+        self.assertTrue(all("page_start" in c for c in store.live_chunks()))
+
+    def test_resume_skips_finished_files(self):
+        self.pipeline(FakeEmbedder()).run(self.root)
+
+        embedder = FakeEmbedder()
+        stats = self.pipeline(embedder).run(self.root)
+        self.assertEqual((stats["skipped"], stats["stored"]), (7, 0))
+        self.assertEqual(embedder.calls, [])
+
+    def test_changed_file_replaces_previous_version(self):
+        self.pipeline(FakeEmbedder()).run(self.root)
+        path = self.write("doc1.txt", prose("Rewritten content"))
+        os.utime(path, (1_000_000, 1_000_000))
+
+        embedder = FakeEmbedder()
+        stats = self.pipeline(embedder).run(self.root)
+        self.assertEqual((stats["skipped"], stats["stored"]), (6, 1))
+
+        store = VectorStore()
+        store.load(self.store_dir)
+        texts = [c["chunk_text"] for c in store.live_chunks() if c["filename"] == "doc1.txt"]
+        self.assertTrue(texts and all("Rewritten" in t for t in texts))
+        self.assertEqual(list(store.documents().values()).count("doc1.txt"), 1)
+
+    def test_touched_file_with_same_content_is_skipped(self):
+        self.pipeline(FakeEmbedder()).run(self.root)
+        os.utime(os.path.join(self.root, "doc2.txt"), (1_000_000, 1_000_000))
+
+        embedder = FakeEmbedder()
+        stats = self.pipeline(embedder).run(self.root)
+        self.assertEqual((stats["skipped"], stats["stored"]), (7, 0))
+        self.assertEqual(embedder.calls, [])
+
+        # The refreshed mtime is recorded, so the next run takes the fast path
+        with open(os.path.join(self.store_dir, CHECKPOINT_FILE), encoding="utf-8") as f:
+            self.assertEqual(json.load(f)["doc2.txt"]["mtime"], 1_000_000)
+
+    def test_changed_file_embeds_only_changed_chunks(self):
+        paragraphs = [prose(f"Paragraph {i}", sentences=2) for i in range(8)]
+        self.write("long.txt", "\n\n".join(paragraphs))
+        self.pipeline(FakeEmbedder()).run(self.root)
+
+        paragraphs.append(prose("Appended paragraph", sentences=2))
+        path = self.write("long.txt", "\n\n".join(paragraphs))
+        os.utime(path, (1_000_000, 1_000_000))
+
+        embedder = FakeEmbedder()
+        stats = self.pipeline(embedder).run(self.root)
+        self.assertEqual(stats["stored"], 1)
+        self.assertEqual(stats["embedded_chunks"], len(embedder.texts))
+        self.assertLess(len(embedder.texts), stats["chunks"])
+        # Unchanged chunks reuse the old version's vectors instead of becoming references to it
+        self.assertEqual(stats["duplicate_chunks"], 0)
+        self.assertEqual(stats["reused_chunks"] + stats["embedded_chunks"], stats["chunks"])
+
+        store = VectorStore()
+        store.load(self.store_dir)
+        self.assertEqual(list(store.documents().values()).count("long.txt"), 1)
+        self.assertEqual(store.num_references, 0)
+        self.assertEqual(sum(c["filename"] == "long.txt" for c in store.live_chunks()), stats["chunks"])
+
+    def test_changed_file_reuses_vectors_without_dedup(self):
+        paragraphs = [prose(f"Paragraph {i}", sentences=2) for i in range(8)]
+        self.write("long.txt", "\n\n".join(paragraphs))
+        self.pipeline(FakeEmbedder(), store=VectorStore(near_dup_threshold=None)).run(self.root)
+
+        path = self.write("long.txt", "\n\n".join(paragraphs + [prose("Appended paragraph", sentences=2)]))
+        os.utime(path, (1_000_000, 1_000_000))
+        store = VectorStore(near_dup_threshold=None)
+        store.load(self.store_dir)
+
+        embedder = FakeEmbedder()
+        stats = self.pipeline(embedder, store=store).run(self.root)
+        self.assertGreater(stats["reused_chunks"], 0)
+        self.assertEqual(stats["reused_chunks"] + len(embedder.texts), stats["chunks"])
+
+    def test_slightly_edited_chunk_is_embedded_again(self):
+        words = [f"word{i}" for i in range(200)]
+        self.write("memo.txt", " ".join(words))
+        first = self.pipeline(FakeEmbedder())
+        first.chunk_size = 5000
+        first.run(self.root)
+
+        # One word changed: a near-duplicate of the previous version's chunk, which is not a dedup target
+        edited = " ".join(words[:-1] + ["edited"])
+        path = self.write("memo.txt", edited)
+        os.utime(path, (1_000_000, 1_000_000))
+        embedder = FakeEmbedder()
+        second = self.pipeline(embedder)
+        second.chunk_size = 5000
+        stats = second.run(self.root)
+
+        self.assertEqual((stats["duplicate_chunks"], stats["embedded_chunks"]), (0, 1))
+        self.assertEqual(embedder.texts, [edited])
+        store = VectorStore()
+        store.load(self.store_dir)
+        self.assertEqual(store.num_references, 0)
+        doc_id = next(d for d, name in store.documents().items() if name == "memo.txt")
+        [vector] = store.reusable_vectors(doc_id, [edited])
+        expected = np.array(FakeEmbedder()([edited])[0])
+        np.testing.assert_allclose(vector, expected / np.linalg.norm(expected), rtol=1e-5)
+
+    def test_duplicate_content_is_not_embedded_twice(self):
+        self.write("sub/copy.txt", prose("Document 4"))
+        embedder = FakeEmbedder()
+        stats = self.pipeline(embedder, embed_workers=1, extract_workers=1).run(self.root)
+
+        self.assertEqual((stats["found"], stats["stored"], stats["skipped"]), (8, 7, 1))
+        with open(os.path.join(self.store_dir, CHECKPOINT_FILE), encoding="utf-8") as f:
+            manifest = json.load(f)
+        self.assertEqual(manifest["doc4.txt"]["doc_id"], manifest["sub/copy.txt"]["doc_id"])
+        self.assertEqual(len(embedder.texts), stats["chunks"])
+
+    def test_near_duplicate_chunks_are_stored_as_references(self):
+        footer = "Confidential. This document is the property of the company and may not be shared."
+        self.write("contract0.txt", prose("Contract 0", sentences=4) + "\n\n" + footer)
+        first = self.pipeline(FakeEmbedder()).run(self.root)
+        for i in (1, 2):
+            self.write(f"contract{i}.txt", prose(f"Contract {i}", sentences=4) + "\n\n" + footer)
+
+        # Only stored chunks are compared against, so the copies arrive in a second run
+        embedder = FakeEmbedder()
+        stats = self.pipeline(embedder).run(self.root)
+        self.assertEqual(stats["duplicate_chunks"], 2)
+        self.assertEqual(stats["embedded_chunks"] + stats["duplicate_chunks"], stats["chunks"])
+        self.assertEqual(len(embedder.texts), stats["embedded_chunks"])
+
+        store = VectorStore()
+        store.load(self.store_dir)
+        self.assertEqual(store.num_live + store.num_references, first["chunks"] + stats["chunks"])
+        hits = store.keyword_search("property company shared", top_k=3)
+        self.assertEqual(len(hits), 1)
+        self.assertEqual(
+            sorted(s["filename"] for s in hits[0]["sources"]),
+            ["contract0.txt", "contract1.txt", "contract2.txt"]
+        )
+
+    def test_failed_file_is_reported_and_retried(self):
+        stats = self.pipeline(FakeEmbedder(fail_on="Document 3")).run(self.root)
+        self.assertEqual(list(stats["failed"]), ["doc3.txt"])
+        self.assertEqual(stats["stored"], 6)
+
+        with open(os.path.join(self.store_dir, CHECKPOINT_FILE), encoding="utf-8") as f:
+            self.assertNotIn("doc3.txt", json.load(f))
+
+        embedder = FakeEmbedder()
+        stats = self.pipeline(embedder).run(self.root)
+        self.assertEqual((stats["stored"], stats["failed"]), (1, {}))
+        with open(os.path.join(self.store_dir, CHECKPOINT_FILE), encoding="utf-8") as f:
+            self.assertEqual(len(embedder.texts), json.load(f)["doc3.txt"]["chunks"])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,66 @@
+import unittest
+import tempfile
+import numpy as np
+from modules.vector_store import VectorStore
+from modules.ivf_index import IVFIndex, recall_latency_report
+
+class TestIVFIndex(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(42)
+        # 8 well separated clusters in 16 dims
+        centers = rng.normal(size=(8, 16))
+        self.vectors = np.repeat(centers, 50, axis=0) + 0.05 * rng.normal(size=(400, 16))
+        self.queries = centers + 0.05 * rng.normal(size=(8, 16))
+
+        self.store = VectorStore()
+        self.store.add_document("doc1", "a.txt", [f"c{i}" for i in range(400)], self.vectors.tolist())
+
+    def test_full_probe_matches_exact(self):
+        self.store.build_ivf(n_lists=8, nprobe=8)
+        for q in self.queries:
+            approx = [r['global_index'] for r in self.store.search(q.tolist(), top_k=5)]
+            exact = [r['global_index'] for r in self.store.search(q.tolist(), top_k=5, exact=True)]
+            self.assertEqual(approx, exact)
+
+    def test_incremental_add_and_remove(self):
+        self.store.build_ivf(n_lists=8, nprobe=2)
+        new_vec = (self.queries[3] * 10).tolist()
+        self.store.add_document("doc2", "b.txt", ["new"], [new_vec])
+
+        self.assertEqual(self.store.search(new_vec, top_k=1)[0]['doc_id'], "doc2")
+
+        self.store.remove_document("doc2")
+        self.assertNotEqual(self.store.search(new_vec, top_k=1)[0]['doc_id'], "doc2")
+
+    def test_save_load_keeps_index(self):
+        self.store.build_ivf(n_lists=8, nprobe=1)
+        with tempfile.TemporaryDirectory() as tmp:
+            self.store.save(tmp)
+            loaded = VectorStore()
+            loaded.load(tmp)
+
+        self.assertIsNotNone(loaded.ivf)
+        q = self.queries[0].tolist()
+        self.assertEqual(loaded.search(q, top_k=3), self.store.search(q, top_k=3))
+
+    def test_recall_latency_report(self):
+        self.store.build_ivf(n_lists=8)
+        report = recall_latency_report(self.store, self.queries.tolist(), top_k=5, nprobe_values=(1, 8))
+
+        self.assertEqual([row['nprobe'] for row in report], ["exact", 1, 8])
+        self.assertEqual(report[-1]['recall'], 1.0)
+        for row in report:
+            self.assertIn('p95_ms', row)
+
+    def test_arrays_round_trip(self):
+        index = IVFIndex(n_lists=4)
+        vecs = VectorStore._normalize(self.vectors.astype('float32'))
+        index.train(vecs)
+        index.add(np.arange(len(vecs)), vecs)
+
+        restored = IVFIndex.from_arrays(index.to_arrays())
+        q = vecs[0]
+        np.testing.assert_array_equal(np.sort(restored.candidates(q, 2)), np.sort(index.candidates(q, 2)))
+
+if __name__ == '__main__':
+    unittest.main()
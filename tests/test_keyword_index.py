@@ -0,0 +1,77 @@
+import unittest
+import tempfile
+from modules.vector_store import VectorStore
+from modules.keyword_index import KeywordIndex, tokenize
+
+class TestKeywordIndex(unittest.TestCase):
+    def setUp(self):
+        self.store = VectorStore()
+        self.store.add_document("doc1", "history.txt", [
+            "The AI Winter lasted from 1974 to 1980.",
+            "Winter is cold. Winter winter winter.",
+            "Alan Turing proposed the imitation game."
+        ], [[1.0, 0.0], [0.0, 1.0], [0.5, 0.5]])
+
+    def test_tokenize(self):
+        self.assertEqual(tokenize("Hello, World! Günler 1974"), ["hello", "world", "günler", "1974"])
+
+    def test_bm25_ranking(self):
+        results = self.store.keyword_search("winter", top_k=5)
+        self.assertEqual([r['global_index'] for r in results], [1, 0])
+        self.assertGreater(results[0]['score'], results[1]['score'])
+
+        self.assertEqual(self.store.keyword_search("nothing here"), [])
+
+    def test_phrase_search(self):
+        results = self.store.keyword_search("ai winter", top_k=5, phrase=True)
+        self.assertEqual([r['global_index'] for r in results], [0])
+
+        # Both terms present but not adjacent
+        self.assertEqual(self.store.keyword_search("winter ai", top_k=5, phrase=True), [])
+
+    def test_phrase_search_matches_substrings(self):
+        search = lambda q: [r['global_index'] for r in self.store.keyword_search(q, top_k=5, phrase=True)]
+        self.assertEqual(search("inter"), [1, 0])
+        self.assertEqual(search("uring prop"), [2])
+        self.assertEqual(search("974 to 19"), [0])
+        self.assertEqual(search("IMITATION"), [2])
+        # A leading space anchors the word start
+        self.assertEqual(search(" win"), [1, 0])
+        self.assertEqual(search(" inter"), [])
+        self.assertEqual(search("cold."), [1])
+        self.assertEqual(search("."), [0, 1, 2])
+
+    def test_removed_documents_are_skipped(self):
+        self.store.compact_threshold = 1.0
+        self.store.add_document("doc2", "b.txt", ["Turing again"], [[1.0, 1.0]])
+        self.store.remove_document("doc1")
+        self.assertEqual([r['doc_id'] for r in self.store.keyword_search("turing")], ["doc2"])
+
+        self.store.compact()
+        self.assertEqual([r['global_index'] for r in self.store.keyword_search("turing")], [0])
+
+    def test_save_load(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            self.store.save(tmp)
+            self.store.add_document("doc2", "b.txt", ["Expert systems boomed."], [[1.0, 1.0]])
+            self.store.save(tmp)
+
+            loaded = VectorStore()
+            loaded.load(tmp)
+            self.assertEqual(loaded.keyword_index.num_rows, 4)
+            self.assertEqual(loaded.keyword_search("winter"), self.store.keyword_search("winter"))
+            self.assertEqual(loaded.keyword_search("expert systems", phrase=True)[0]['doc_id'], "doc2")
+
+    def test_incremental_add_matches_bulk(self):
+        texts = ["a b c", "b c d", "c d e"]
+        bulk = KeywordIndex()
+        bulk.add(0, texts)
+        incremental = KeywordIndex()
+        for i, text in enumerate(texts):
+            incremental.add(i, [text])
+
+        for query in ["c", "a d", "e"]:
+            self.assertEqual([r.tolist() for r in bulk.search(query)], [r.tolist() for r in incremental.search(query)])
+
+if __name__ == '__main__':
+    unittest.main()
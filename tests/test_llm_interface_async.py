@@ -0,0 +1,53 @@
+import unittest
+import time
+import asyncio
+from types import SimpleNamespace
+from modules.llm_interface import LLMInterface, run_async, shared_async_client
+
+class SlowAsyncClient:
+    """
+    Stands in for AsyncOpenAI: each embeddings/chat call takes `delay` seconds.
+    """
+    def __init__(self, delay):
+        self.delay = delay
+        self.embeddings = SimpleNamespace(create=self._embed)
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._chat))
+
+    async def _embed(self, input, model):
+        await asyncio.sleep(self.delay)
+        return SimpleNamespace(data=[SimpleNamespace(embedding=[float(len(t))]) for t in input])
+
+    async def _chat(self, model, messages, temperature):
+        await asyncio.sleep(self.delay)
+        message = SimpleNamespace(content=f" summary of {len(messages[1]['content'])} chars ")
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+class TestAsyncLLMInterface(unittest.TestCase):
+    def setUp(self):
+        self.llm = LLMInterface(api_key="test-key")
+        self.llm.aclient = SlowAsyncClient(delay=0.2)
+
+    def test_clients_are_shared_per_key(self):
+        self.assertIs(shared_async_client("test-key"), LLMInterface(api_key="test-key").aclient)
+        self.assertIsNot(shared_async_client("test-key"), shared_async_client("other-key"))
+
+    def test_embed_and_summarize_overlap(self):
+        start = time.perf_counter()
+        embeddings, summary = self.llm.embed_and_summarize(["ab", "abc"], "some text", language="en")
+        elapsed = time.perf_counter() - start
+
+        self.assertEqual(embeddings, [[2.0], [3.0]])
+        self.assertTrue(summary.startswith("summary of"))
+        # max(embed, summarize), not their sum
+        self.assertLess(elapsed, 0.35)
+
+    def test_async_answer_question(self):
+        contexts = [{"chunk_text": "x", "doc_id": "d", "filename": "a.txt"}]
+        result = run_async(self.llm.aanswer_question("q?", contexts, language="en"))
+        self.assertEqual(result['citations'], contexts)
+
+        empty = run_async(self.llm.aanswer_question("q?", [], language="en"))
+        self.assertEqual(empty['citations'], [])
+
+if __name__ == '__main__':
+    unittest.main()
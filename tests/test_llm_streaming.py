@@ -0,0 +1,48 @@
+import unittest
+from types import SimpleNamespace
+from modules.llm_interface import LLMInterface
+
+def delta_chunk(content):
+    return SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=content))])
+
+class StubStreamingCompletions:
+    """
+    Stands in for client.chat.completions with stream=True: yields the configured deltas.
+    """
+    def __init__(self, deltas):
+        self.deltas = deltas
+        self.requests = []
+
+    def create(self, model, messages, temperature, stream=False):
+        self.requests.append({"messages": messages, "stream": stream})
+        # Trailing chunk without content, like the API's finish chunk
+        return iter([delta_chunk(d) for d in self.deltas] + [delta_chunk(None)])
+
+class TestLLMStreaming(unittest.TestCase):
+    def setUp(self):
+        self.llm = LLMInterface(api_key="test-key")
+        self.completions = StubStreamingCompletions(["Hel", "lo", " world"])
+        self.llm.client = SimpleNamespace(chat=SimpleNamespace(completions=self.completions))
+
+    def test_answer_citations_before_generation(self):
+        contexts = [{"chunk_text": f"c{i}", "doc_id": "d", "filename": "a.txt"} for i in range(5)]
+        response = self.llm.stream_answer_question("q?", contexts, language="en")
+
+        self.assertEqual(response['citations'], contexts[:3])
+        # Nothing is requested until the stream is consumed
+        self.assertEqual(self.completions.requests, [])
+
+        self.assertEqual(list(response['stream']), ["Hel", "lo", " world"])
+        self.assertTrue(self.completions.requests[0]['stream'])
+
+    def test_answer_without_contexts(self):
+        response = self.llm.stream_answer_question("q?", [], language="en")
+        self.assertEqual(response['citations'], [])
+        self.assertIn("enough information", "".join(response['stream']))
+
+    def test_summaries_stream(self):
+        self.assertEqual("".join(self.llm.stream_summarize_short("text", language="en")), "Hello world")
+        self.assertEqual("".join(self.llm.stream_summarize_detailed("text", language="en")), "Hello world")
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,129 @@
+import asyncio
+import unittest
+import urllib.request
+import numpy as np
+from modules import metrics as metrics_module
+from modules.metrics import Metrics, METRICS, timed
+from modules.vector_store import VectorStore
+from modules.llm_interface import LLMInterface
+from benchmarks.fake_backend import FakeOpenAI, FakeAsyncOpenAI
+
+class TestMetrics(unittest.TestCase):
+    def setUp(self):
+        self.metrics = Metrics(enabled=True, buckets=(0.01, 0.1))
+
+    def test_disabled_records_nothing(self):
+        metrics = Metrics(enabled=False)
+        metrics.inc("calls")
+        metrics.observe("work", 0.5)
+        with metrics.span("block"):
+            pass
+        self.assertEqual(metrics.snapshot()["timers"], {})
+        self.assertEqual(metrics.snapshot()["counters"], {})
+
+    def test_timers_and_counters(self):
+        for seconds in (0.005, 0.05, 0.5):
+            self.metrics.observe("work", seconds)
+        self.metrics.inc("tokens", 3, model="m", kind="prompt")
+        self.metrics.inc("tokens", 4, kind="prompt", model="m")
+
+        snapshot = self.metrics.snapshot()
+        work = snapshot["timers"]["work"]
+        self.assertEqual(work["count"], 3)
+        self.assertAlmostEqual(work["total_s"], 0.555)
+        self.assertAlmostEqual(work["p50_ms"], 50.0)
+        self.assertEqual(snapshot["counters"], {"tokens{kind=prompt,model=m}": 7.0})
+
+    def test_span_counts_errors(self):
+        with self.assertRaises(KeyError):
+            with self.metrics.span("lookup"):
+                raise KeyError("x")
+        snapshot = self.metrics.snapshot()
+        self.assertEqual(snapshot["timers"]["lookup"]["count"], 1)
+        self.assertEqual(snapshot["counters"]["lookup_errors"], 1.0)
+
+    def test_prometheus_export(self):
+        self.metrics.observe("work", 0.005)
+        self.metrics.observe("work", 0.05)
+        self.metrics.inc("tokens", 2, model='a"b')
+        text = self.metrics.to_prometheus()
+
+        self.assertIn("# TYPE docassist_work_seconds histogram", text)
+        self.assertIn('docassist_work_seconds_bucket{le="0.01"} 1', text)
+        self.assertIn('docassist_work_seconds_bucket{le="0.1"} 2', text)
+        self.assertIn('docassist_work_seconds_bucket{le="+Inf"} 2', text)
+        self.assertIn("docassist_work_seconds_count 2", text)
+        self.assertIn("# TYPE docassist_tokens_total counter", text)
+        self.assertIn('docassist_tokens_total{model="a\\"b"} 2.0', text)
+
+    def test_timed_functions_coroutines_and_generators(self):
+        @timed("plain", self.metrics)
+        def plain(x):
+            return x * 2
+
+        @timed("coro", self.metrics)
+        async def coro(x):
+            return x + 1
+
+        @timed("gen", self.metrics)
+        def gen(n):
+            yield from range(n)
+
+        self.assertEqual(plain(2), 4)
+        self.assertEqual(asyncio.run(coro(1)), 2)
+        self.assertEqual(list(gen(3)), [0, 1, 2])
+        # An abandoned generator is still recorded once
+        next(gen(5))
+
+        timers = self.metrics.snapshot()["timers"]
+        self.assertEqual(timers["plain"]["count"], 1)
+        self.assertEqual(timers["coro"]["count"], 1)
+        self.assertEqual(timers["gen"]["count"], 2)
+
+        self.metrics.disable()
+        self.assertEqual(list(gen(2)), [0, 1])
+        self.assertEqual(self.metrics.snapshot()["timers"]["gen"]["count"], 2)
+
+    def test_serve_binds_loopback_by_default(self):
+        self.metrics.inc("scrapes")
+        server = metrics_module.serve(0, metrics=self.metrics)
+        try:
+            host, port = server.server_address
+            self.assertEqual(host, "127.0.0.1")
+            with urllib.request.urlopen(f"http://127.0.0.1:{port}/metrics", timeout=5) as resp:
+                self.assertIn("scrapes", resp.read().decode("utf-8"))
+        finally:
+            server.shutdown()
+            server.server_close()
+            metrics_module._server = None
+
+class TestInstrumentation(unittest.TestCase):
+    def setUp(self):
+        self.was_enabled = METRICS.enabled
+        METRICS.reset()
+        METRICS.enable()
+
+    def tearDown(self):
+        METRICS.reset()
+        METRICS.enabled = self.was_enabled
+
+    def test_store_and_llm_spans_with_token_usage(self):
+        llm = LLMInterface(api_key="offline", client=FakeOpenAI(dim=16), async_client=FakeAsyncOpenAI(dim=16))
+        texts = ["alpha beta gamma", "delta epsilon zeta"]
+        store = VectorStore()
+        store.add_document("d1", "a.txt", texts, llm.embed_texts(texts))
+        contexts = store.search(np.array(llm.embed_query("alpha beta")), top_k=1)
+        llm.answer_question("alpha?", contexts, language="en")
+        "".join(llm.stream_answer_question("alpha?", contexts, language="en")["stream"])
+
+        snapshot = METRICS.snapshot()
+        for name in ("store_add_document", "store_search", "llm_embed_request", "llm_chat", "llm_chat_first_token"):
+            self.assertIn(name, snapshot["timers"])
+        counters = snapshot["counters"]
+        self.assertEqual(counters["llm_embedded_texts{model=text-embedding-3-small}"], 3.0)
+        # Usage from the plain response and from the stream's final usage chunk
+        self.assertGreater(counters["llm_tokens{kind=completion,model=gpt-4o-mini}"], 0)
+        self.assertIn("docassist_store_search_seconds_count 1", METRICS.to_prometheus())
+
+if __name__ == '__main__':
+    unittest.main()
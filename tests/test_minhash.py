@@ -0,0 +1,37 @@
+import unittest
+from modules.minhash import MinHashLSH
+
+BASE = ("This supply agreement is made between the buyer and the seller named below and "
+        "governs the delivery of goods, payment terms and warranties for the stated term.")
+
+class TestMinHashLSH(unittest.TestCase):
+    def setUp(self):
+        self.lsh = MinHashLSH(threshold=0.8)
+
+    def test_signatures_are_deterministic(self):
+        other = MinHashLSH(threshold=0.8)
+        self.assertTrue((self.lsh.signature(BASE) == other.signature(BASE)).all())
+        self.assertIsNone(self.lsh.signature("  ... "))
+
+    def test_finds_near_duplicates_only(self):
+        self.lsh.add("base", self.lsh.signature(BASE))
+        self.lsh.add("other", self.lsh.signature("Quarterly revenue grew in every region except the north."))
+
+        # Case and punctuation don't matter; a changed clause at the end barely moves the estimate
+        key, sim = self.lsh.query(self.lsh.signature(BASE.upper().replace(",", "")))
+        self.assertEqual((key, sim), ("base", 1.0))
+        near = self.lsh.query(self.lsh.signature(BASE + " Signed in Ankara."))
+        self.assertEqual(near[0], "base")
+        self.assertGreaterEqual(near[1], 0.8)
+
+        self.assertIsNone(self.lsh.query(self.lsh.signature("Completely unrelated text about mountain weather.")))
+        self.assertIsNone(self.lsh.query(self.lsh.signature(BASE), exclude=lambda key: key == "base"))
+
+    def test_remove(self):
+        self.lsh.add("base", self.lsh.signature(BASE))
+        self.lsh.remove("base")
+        self.assertEqual(len(self.lsh), 0)
+        self.assertIsNone(self.lsh.query(self.lsh.signature(BASE)))
+
+if __name__ == '__main__':
+    unittest.main()
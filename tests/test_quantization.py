@@ -0,0 +1,64 @@
+import unittest
+import tempfile
+import numpy as np
+from modules.vector_store import VectorStore, quantization_report
+from modules.quantization import Quantizer
+
+class TestQuantization(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(7)
+        self.vectors = rng.normal(size=(300, 32)).astype('float32')
+        self.queries = rng.normal(size=(10, 32)).astype('float32')
+        self.chunks = [f"c{i}" for i in range(300)]
+
+    def test_codes_approximate_scores(self):
+        vecs = VectorStore._normalize(self.vectors)
+        q = VectorStore._normalize(self.queries[0])
+        for mode in Quantizer.MODES:
+            quantizer = Quantizer(mode)
+            codes = quantizer.encode(vecs)
+            self.assertEqual(codes.dtype, quantizer.dtype)
+            np.testing.assert_allclose(quantizer.score(codes, q, batch_size=64), vecs @ q, atol=0.02)
+
+    def test_quantized_search_matches_exact(self):
+        for mode in Quantizer.MODES:
+            store = VectorStore(quantization=mode)
+            store.add_document("doc1", "a.txt", self.chunks, self.vectors.tolist())
+            for q in self.queries:
+                approx = [r['global_index'] for r in store.search(q.tolist(), top_k=5)]
+                exact = [r['global_index'] for r in store.search(q.tolist(), top_k=5, exact=True)]
+                self.assertEqual(approx, exact)
+
+            report = store.memory_report()
+            self.assertEqual(report['scan_bytes_per_chunk'], 32 * Quantizer(mode).dtype.itemsize)
+            self.assertEqual(report['full_precision_bytes_per_chunk'], 128)
+
+    def test_save_load_keeps_codes(self):
+        store = VectorStore(quantization="int8")
+        store.add_document("doc1", "a.txt", self.chunks[:200], self.vectors[:200].tolist())
+        with tempfile.TemporaryDirectory() as tmp:
+            store.save(tmp)
+            store.add_document("doc2", "b.txt", self.chunks[200:], self.vectors[200:].tolist())
+            store.save(tmp)
+
+            loaded = VectorStore()
+            loaded.load(tmp)
+            self.assertEqual(loaded.quantizer.mode, "int8")
+            self.assertEqual(len(loaded._code_segments), 2)
+            self.assertEqual(loaded._code_segments[0].dtype, np.int8)
+
+            q = self.queries[0].tolist()
+            self.assertEqual(loaded.search(q, top_k=5), store.search(q, top_k=5))
+
+    def test_quantization_report(self):
+        store = VectorStore()
+        store.add_document("doc1", "a.txt", self.chunks, self.vectors.tolist())
+        report = quantization_report(store, self.queries.tolist(), top_k=5)
+
+        self.assertEqual([row['mode'] for row in report], ["float32", "float16", "int8"])
+        self.assertEqual([row['bytes_per_chunk'] for row in report], [128, 64, 32])
+        for row in report:
+            self.assertGreaterEqual(row['recall_reranked'], row['recall'] - 1e-9)
+
+if __name__ == '__main__':
+    unittest.main()
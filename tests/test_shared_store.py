@@ -0,0 +1,183 @@
+import os
+import json
+import tempfile
+import threading
+import unittest
+import numpy as np
+from modules.vector_store import VectorStore, MANIFEST_FILE
+from modules.shared_store import SharedStore
+
+def unit_rows(n, dim=8, seed=0):
+    rng = np.random.default_rng(seed)
+    return rng.normal(size=(n, dim)).astype('float32').tolist()
+
+class TestFork(unittest.TestCase):
+    def setUp(self):
+        self.store = VectorStore()
+        self.store.add_document("a", "a.txt", ["apple pie recipe", "banana bread"], [[1, 0, 0, 0], [0, 1, 0, 0]])
+
+    def test_fork_changes_are_invisible_to_the_original(self):
+        before = self.store.search([0, 1, 0, 0], top_k=5)
+        fork = self.store.fork()
+        fork.add_document("b", "b.txt", ["apple tart", "cherry jam"], [[0, 0, 1, 0], [0, 0, 0, 1]])
+        fork.remove_document("a")
+
+        self.assertEqual(self.store.search([0, 1, 0, 0], top_k=5), before)
+        self.assertEqual(self.store.documents(), {"a": "a.txt"})
+        self.assertEqual([r["doc_id"] for r in self.store.keyword_search("apple")], ["a"])
+        self.assertEqual([r["doc_id"] for r in fork.keyword_search("apple")], ["b"])
+        # remove_document compacted the fork: renumbered rows, the original's dicts untouched
+        self.assertEqual([c["global_index"] for c in self.store.chunks], [0, 1])
+        self.assertEqual(fork.documents(), {"b": "b.txt"})
+        self.assertGreater(fork.version, self.store.version)
+
+    def test_both_sides_can_append_after_a_fork(self):
+        fork = self.store.fork()
+        fork.add_document("b", "b.txt", ["cherry"], [[0, 0, 1, 0]])
+        # The original appends into the same row slot: it must not overwrite the fork's vector
+        self.store.add_document("c", "c.txt", ["date"], [[0, 0, 0, 1]])
+
+        self.assertEqual(fork.search([0, 0, 1, 0], top_k=1)[0]["doc_id"], "b")
+        self.assertAlmostEqual(fork.search([0, 0, 1, 0], top_k=1)[0]["score"], 1.0, places=5)
+        self.assertEqual(self.store.search([0, 0, 0, 1], top_k=1)[0]["doc_id"], "c")
+        self.assertEqual([r["doc_id"] for r in fork.keyword_search("date")], [])
+
+    def test_fork_with_ivf_and_saved_segments(self):
+        self.store.add_document("big", "big.txt", [f"chunk {i}" for i in range(200)], unit_rows(200, dim=4))
+        self.store.build_ivf(n_lists=4)
+        with tempfile.TemporaryDirectory() as tmp:
+            self.store.save(tmp)
+            before = self.store.search([1, 0, 0, 0], top_k=3)
+
+            fork = self.store.fork()
+            fork.add_document("new", "new.txt", ["north"], [[1, 0, 0, 0]])
+            fork.save(tmp)
+
+            self.assertEqual(self.store.search([1, 0, 0, 0], top_k=3), before)
+            self.assertEqual(fork.search([1, 0, 0, 0], top_k=1, exact=True)[0]["doc_id"], "new")
+            reloaded = VectorStore()
+            reloaded.load(tmp)
+            self.assertEqual(reloaded.num_live, self.store.num_live + 1)
+
+    def test_reference_promotion_in_fork(self):
+        footer = "This document is confidential and the property of the company, it may not be shared."
+        self.store.add_document("f1", "f1.txt", [footer], [[0, 0, 1, 0]])
+        duplicate_of = self.store.near_duplicates("f2", [footer])
+        self.store.add_document("f2", "f2.txt", [footer], [None], duplicate_of=duplicate_of)
+
+        fork = self.store.fork()
+        fork.remove_document("f1")
+
+        self.assertEqual(self.store.num_references, 1)
+        self.assertEqual(self.store._refs["f2"][0]["canonical"], ("f1", 0))
+        self.assertEqual(fork.num_references, 0)
+        self.assertEqual(fork.search([0, 0, 1, 0], top_k=1)[0]["doc_id"], "f2")
+
+    def test_fork_leaves_the_source_near_duplicate_index_alone(self):
+        footer = "This document is confidential and the property of the company, it may not be shared."
+        self.store.add_document("f1", "f1.txt", [footer], [[0, 0, 1, 0]])
+        self.assertEqual(self.store.near_duplicates("f2", [footer]), [("f1", 0)])
+        lsh = self.store._lsh
+
+        fork = self.store.fork()
+        fork.remove_document("f1")
+        self.assertEqual(fork.near_duplicates("f2", [footer]), [None])
+
+        # Readers of the source version still see its index, with f1 in it
+        self.assertIs(self.store._lsh, lsh)
+        self.assertEqual(self.store.near_duplicates("f2", [footer]), [("f1", 0)])
+
+class TestSharedStore(unittest.TestCase):
+    def setUp(self):
+        self.shared = SharedStore()
+
+    def test_snapshots_are_isolated_and_writes_publish(self):
+        empty = self.shared.snapshot()
+        with self.shared.write() as draft:
+            draft.add_document("a", "a.txt", ["x"], [[1.0, 0.0]])
+            # Not visible until the write completes
+            self.assertIs(self.shared.snapshot(), empty)
+
+        self.assertEqual(empty.num_live, 0)
+        self.assertEqual(self.shared.snapshot().documents(), {"a": "a.txt"})
+        self.assertEqual(self.shared.stats()["publishes"], 1)
+
+    def test_failed_write_publishes_nothing(self):
+        with self.shared.write() as draft:
+            draft.add_document("a", "a.txt", ["x"], [[1.0, 0.0]])
+        current = self.shared.snapshot()
+
+        with self.assertRaises(ValueError):
+            with self.shared.write() as draft:
+                draft.add_document("b", "b.txt", ["y"], [[0.0, 1.0]])
+                draft.add_document("c", "c.txt", ["z"], [[0.0, 1.0, 0.0]])  # dimension mismatch
+
+        self.assertIs(self.shared.snapshot(), current)
+        self.assertEqual(current.documents(), {"a": "a.txt"})
+
+    def test_concurrent_readers_during_writes(self):
+        with self.shared.write() as draft:
+            draft.add_document("seed", "seed.txt", [f"seed {i}" for i in range(50)], unit_rows(50))
+
+        errors = []
+        stop = threading.Event()
+
+        def reader():
+            query = unit_rows(1, seed=99)[0]
+            while not stop.is_set():
+                snapshot = self.shared.snapshot()
+                try:
+                    live = snapshot.num_live
+                    results = snapshot.search(query, top_k=live)
+                    hybrid = snapshot.hybrid_search("seed", query, top_k=5)
+                    # A snapshot is internally consistent: every live row is returned exactly once
+                    if len(results) != live or len({r["global_index"] for r in results}) != live or not hybrid:
+                        errors.append((live, len(results)))
+                except Exception as e:  # pragma: no cover - reported below
+                    errors.append(e)
+
+        threads = [threading.Thread(target=reader) for _ in range(4)]
+        for t in threads:
+            t.start()
+        for i in range(30):
+            with self.shared.write() as draft:
+                draft.add_document(f"d{i}", f"d{i}.txt", [f"doc {i} a", f"doc {i} b"], unit_rows(2, seed=i))
+                if i % 3 == 0:
+                    draft.remove_document(f"d{i}")
+        stop.set()
+        for t in threads:
+            t.join()
+
+        self.assertEqual(errors, [])
+        self.assertEqual(self.shared.snapshot().num_live, 50 + 2 * 20)
+
+    def test_saving_each_write_appends_one_segment(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            with self.shared.write() as draft:
+                draft.add_document("a", "a.txt", ["x"], [[1.0, 0.0]])
+                draft.save(tmp)
+            with self.shared.write() as draft:
+                draft.add_document("b", "b.txt", ["y"], [[0.0, 1.0]])
+                draft.save(tmp)
+
+            with open(os.path.join(tmp, MANIFEST_FILE), encoding='utf-8') as f:
+                manifest = json.load(f)
+            self.assertEqual(manifest["generation"], 0)
+            self.assertEqual([seg["rows"] for seg in manifest["segments"]], [1, 1])
+            reloaded = VectorStore()
+            reloaded.load(tmp)
+            self.assertEqual(reloaded.documents(), {"a": "a.txt", "b": "b.txt"})
+
+    def test_near_duplicates_against_current_version(self):
+        footer = "This document is confidential and the property of the company, it may not be shared."
+        with self.shared.write() as draft:
+            draft.add_document("a", "a.txt", [footer], [[1.0, 0.0]])
+        self.assertEqual(self.shared.near_duplicates("b", [footer]), [("a", 0)])
+
+        # The near-duplicate index moves to the next version along with the writes
+        with self.shared.write() as draft:
+            draft.remove_document("a")
+        self.assertEqual(self.shared.near_duplicates("b", [footer]), [None])
+
+if __name__ == '__main__':
+    unittest.main()
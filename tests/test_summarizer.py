@@ -0,0 +1,137 @@
+import time
+import asyncio
+import unittest
+from openai import OpenAIError
+from modules.summarizer import Summarizer, SummaryError, MAP_PROMPT
+from modules.document_processor import DocumentProcessor
+from modules.llm_interface import LLMInterface, CHAT_ERROR_PREFIX, run_async
+from benchmarks.corpus import synthetic_document
+from benchmarks.fake_backend import FakeOpenAI, FakeAsyncOpenAI
+
+class RecordingChat:
+    """
+    Async chat stand-in: answers after `latency` seconds and records prompts and peak concurrency.
+    """
+    def __init__(self, latency=0.0, fail=False):
+        self.latency = latency
+        self.fail = fail
+        self.prompts = []
+        self.in_flight = 0
+        self.peak = 0
+
+    async def __call__(self, prompt, system_prompt):
+        self.prompts.append(prompt)
+        self.in_flight += 1
+        self.peak = max(self.peak, self.in_flight)
+        try:
+            await asyncio.sleep(self.latency)
+            if self.fail:
+                raise SummaryError(f"{CHAT_ERROR_PREFIX}: boom")
+            return f"notes {len(self.prompts)}"
+        finally:
+            self.in_flight -= 1
+
+class TestSummarizer(unittest.TestCase):
+    def setUp(self):
+        self.text = synthetic_document(64_000, seed=4)
+
+    def summarizer(self, chat, **kwargs):
+        settings = dict(single_pass_chars=200, section_chars=1000, fan_in=4, max_concurrency=100)
+        settings.update(kwargs)
+        return Summarizer(chat, **settings)
+
+    def test_short_text_is_passed_through(self):
+        chat = RecordingChat()
+        self.assertEqual(asyncio.run(self.summarizer(chat).acondense("short")), "short")
+        self.assertEqual(chat.prompts, [])
+
+    def test_latency_follows_tree_depth(self):
+        chat = RecordingChat(latency=0.05)
+        summarizer = self.summarizer(chat)
+
+        start = time.perf_counter()
+        notes = asyncio.run(summarizer.acondense(self.text))
+        elapsed = time.perf_counter() - start
+
+        map_prompts = [p for p in chat.prompts if p.startswith("Summarize the following section")]
+        self.assertGreater(len(map_prompts), 40)
+        self.assertLess(len(chat.prompts), 2 * len(map_prompts))
+        self.assertLessEqual(len(notes), 200)
+        # A few levels of concurrent requests, not one request after another
+        self.assertLess(elapsed, 0.05 * len(chat.prompts) / 4)
+
+    def test_concurrency_is_bounded(self):
+        chat = RecordingChat(latency=0.01)
+        asyncio.run(self.summarizer(chat, max_concurrency=5).acondense(self.text))
+        self.assertEqual(chat.peak, 5)
+
+    def test_partial_summaries_are_cached(self):
+        chat = RecordingChat()
+        summarizer = self.summarizer(chat)
+        first = asyncio.run(summarizer.acondense(self.text))
+        requests = len(chat.prompts)
+
+        self.assertEqual(asyncio.run(summarizer.acondense(self.text)), first)
+        self.assertEqual(len(chat.prompts), requests)
+        self.assertGreater(summarizer.cache_stats()["hits"], 0)
+
+        # An edit at the end re-runs one section and the reduce path above it
+        asyncio.run(summarizer.acondense(self.text + " An appended closing sentence."))
+        self.assertLess(len(chat.prompts) - requests, 6)
+
+    def test_chunk_records_are_condensed_section_by_section(self):
+        processor = DocumentProcessor()
+        chunks = list(processor.iter_chunks([(1, self.text)], chunk_size=300, overlap=50))
+        chat = RecordingChat()
+        summarizer = self.summarizer(chat)
+
+        notes = asyncio.run(summarizer.acondense(chunks))
+        self.assertLessEqual(len(notes), 200)
+        map_prompts = [p for p in chat.prompts if p.startswith("Summarize the following section")]
+        # Every map prompt is a bounded section; together they cover the whole document
+        self.assertTrue(all(len(p) < len(MAP_PROMPT) + 1000 for p in map_prompts))
+        self.assertIn(chunks[-1].text, "".join(map_prompts))
+
+        # A short document comes back as its text
+        short = self.summarizer(chat, single_pass_chars=600)
+        self.assertEqual(asyncio.run(short.acondense(chunks[:2])), processor.clean_text(self.text)[:chunks[1].end])
+
+    def test_failures_are_not_cached(self):
+        chat = RecordingChat(fail=True)
+        summarizer = self.summarizer(chat)
+        with self.assertRaises(SummaryError):
+            asyncio.run(summarizer.acondense(self.text))
+        self.assertEqual(summarizer.cache_stats()["entries"], 0)
+
+class TestLLMInterfaceSummaries(unittest.TestCase):
+    def setUp(self):
+        self.client = FakeOpenAI()
+        self.aclient = FakeAsyncOpenAI()
+        self.llm = LLMInterface(api_key="offline", client=self.client, async_client=self.aclient)
+        self.text = synthetic_document(200_000, seed=5)
+
+    def test_whole_document_is_summarized_and_map_stage_reused(self):
+        short = self.llm.summarize_short(self.text, language="en")
+        self.assertTrue(short.startswith("Synthetic answer"))
+        # The map stage covered every section, not just the first page
+        sections = self.llm.summarizer.processor.chunk_text(self.text, chunk_size=self.llm.summarizer.section_chars, overlap=0)
+        self.assertGreaterEqual(self.aclient.requests, len(sections))
+
+        notes_requests = self.aclient.requests
+        detailed = run_async(self.llm.asummarize_detailed(self.text, language="tr"))
+        streamed = "".join(self.llm.stream_summarize_short(self.text, language="tr"))
+        self.assertTrue(detailed.startswith("Synthetic answer") and streamed.startswith("Synthetic answer"))
+        # Another language / level of detail: only the final prompts are new
+        self.assertEqual(self.aclient.requests, notes_requests + 1)
+
+    def test_failed_map_stage_returns_error_text(self):
+        async def failing(model, messages, temperature=0.0, **kwargs):
+            raise OpenAIError("unavailable")
+        self.aclient.chat.completions.create = failing
+
+        self.assertTrue(self.llm.summarize_short(self.text, language="en").startswith(CHAT_ERROR_PREFIX))
+        self.assertTrue("".join(self.llm.stream_summarize_detailed(self.text)).startswith(CHAT_ERROR_PREFIX))
+        self.assertEqual(self.client.requests, 0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,5 +1,11 @@
 import unittest
+import os
+import json
+import tempfile
+import sqlite3
 import numpy as np
+from unittest import mock
+from concurrent.futures import Future
 from modules.vector_store import VectorStore
 
 class TestVectorStore(unittest.TestCase):
@@ -26,6 +32,308 @@ class TestVectorStore(unittest.TestCase):
         self.assertEqual(len(results), 1)
         self.assertEqual(results[0]['doc_id'], "doc1")
         self.assertEqual(results[0]['chunk_text'], "This is a test document.")
-        
+
+    def test_search_top_k_order(self):
+        rng = np.random.default_rng(0)
+        vecs = rng.normal(size=(50, 8)).astype('float32')
+        self.store.add_document("doc1", "a.txt", [f"c{i}" for i in range(50)], vecs.tolist())
+
+        query = rng.normal(size=8)
+        results = self.store.search(query.tolist(), top_k=5)
+
+        # Compare against a brute-force cosine ranking
+        normed = vecs / np.linalg.norm(vecs, axis=1, keepdims=True)
+        expected = np.argsort(normed @ (query / np.linalg.norm(query)))[::-1][:5]
+        self.assertEqual([r['global_index'] for r in results], expected.tolist())
+        self.assertAlmostEqual(np.linalg.norm(self.store.embeddings_matrix[0]), 1.0, places=5)
+
+    def test_search_batch(self):
+        embeddings = [[1.0, 0.0], [0.0, 1.0], [0.7, 0.7]]
+        self.store.add_document("doc1", "a.txt", ["x", "y", "xy"], embeddings)
+
+        batch = self.store.search_batch([[1.0, 0.0], [0.0, 2.0]], top_k=2)
+        self.assertEqual(len(batch), 2)
+        self.assertEqual([r['chunk_text'] for r in batch[0]], ["x", "xy"])
+        self.assertEqual([r['chunk_text'] for r in batch[1]], ["y", "xy"])
+        self.assertEqual(batch, [self.store.search(q, top_k=2) for q in [[1.0, 0.0], [0.0, 2.0]]])
+
+    def test_buffer_growth(self):
+        for d in range(100):
+            self.store.add_document(f"doc{d}", "a.txt", ["a", "b"], [[1.0, float(d)], [float(d), 1.0]])
+
+        self.assertEqual(self.store.embeddings_matrix.shape, (200, 2))
+        self.assertGreaterEqual(len(self.store._buffer), 200)
+        self.assertEqual(self.store.chunks[-1]['global_index'], 199)
+
+    def test_remove_and_replace_document(self):
+        self.store.compact_threshold = 1.0  # keep tombstones around
+        self.store.add_document("old", "a.txt", ["stale"], [[1.0, 0.0]])
+        self.store.add_document("other", "b.txt", ["kept"], [[0.0, 1.0]])
+
+        self.assertEqual(self.store.remove_document("old"), 1)
+        self.assertEqual(self.store.remove_document("old"), 0)
+        results = self.store.search([1.0, 0.0], top_k=5)
+        self.assertEqual([r['chunk_text'] for r in results], ["kept"])
+
+        self.store.replace_document("other", "b.txt", ["fresh", "fresh2"], [[1.0, 0.0], [0.5, 0.5]])
+        self.assertEqual(self.store.num_live, 2)
+        self.assertEqual([c['chunk_text'] for c in self.store.live_chunks()], ["fresh", "fresh2"])
+
+        self.store.compact()
+        self.assertEqual(len(self.store.chunks), 2)
+        self.assertEqual([c['global_index'] for c in self.store.chunks], [0, 1])
+        self.assertEqual(self.store.search([1.0, 0.0], top_k=1)[0]['chunk_text'], "fresh")
+
+    def test_failed_replace_keeps_old_version(self):
+        self.store.add_document("doc", "a.txt", ["alpha", "beta"], [[1.0, 0.0], [0.0, 1.0]])
+        self.store.add_document("other", "b.txt", ["gamma"], [[0.7, 0.7]])
+        bad_calls = [
+            dict(embeddings=[[1.0, 0.0, 0.0], [0.0, 1.0, 0.0]]),                        # dimension
+            dict(embeddings=[[1.0, 0.0], [0.0, 1.0]], provenance=[{"page_start": 1}]),    # provenance length
+            dict(embeddings=[[1.0, 0.0], [0.0, 1.0]], duplicate_of=[None]),              # duplicate_of length
+            dict(embeddings=[[1.0, 0.0], None], duplicate_of=[None, ("gone", 0)]),       # unknown target
+            dict(embeddings=[[1.0, 0.0], None], duplicate_of=[None, ("doc", 1)]),        # old version's chunk
+        ]
+        for kwargs in bad_calls:
+            with self.assertRaises(ValueError):
+                self.store.replace_document("doc", "a.txt", ["alpha2", "beta2"], **kwargs)
+
+        self.assertEqual(self.store.num_live, 3)
+        self.assertEqual(self.store.search([0.0, 1.0], top_k=1)[0]["chunk_text"], "beta")
+        self.assertEqual([r["doc_id"] for r in self.store.keyword_search("alpha")], ["doc"])
+
+    def test_auto_compact(self):
+        self.store.add_document("a", "a.txt", ["x"], [[1.0, 0.0]])
+        self.store.add_document("b", "b.txt", ["y"], [[0.0, 1.0]])
+        self.store.remove_document("a")  # 50% tombstoned > default threshold
+        self.assertEqual(len(self.store.chunks), 1)
+        self.assertEqual(self.store.embeddings_matrix.shape[0], 1)
+
+    def test_save_load_incremental(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            self.store.add_document("a", "a.txt", ["x", "y"], [[1.0, 0.0], [0.0, 1.0]])
+            self.store.save(tmp)
+
+            self.store.add_document("b", "b.txt", ["z"], [[0.6, 0.8]])
+            self.store.save(tmp)
+
+            with open(os.path.join(tmp, "manifest.json")) as f:
+                manifest = json.load(f)
+            # Second save only appended one new segment
+            self.assertEqual([seg["rows"] for seg in manifest["segments"]], [2, 1])
+
+            loaded = VectorStore()
+            loaded.load(tmp)
+            self.assertIsInstance(loaded._segments[0], np.memmap)
+            self.assertEqual([c['chunk_text'] for c in loaded.chunks], ["x", "y", "z"])
+            self.assertEqual(loaded.search([0.6, 0.8], top_k=1)[0]['doc_id'], "b")
+
+            # Tombstones survive a round trip
+            loaded.compact_threshold = 1.0
+            loaded.remove_document("a")
+            loaded.save(tmp)
+            reloaded = VectorStore()
+            reloaded.load(tmp)
+            self.assertEqual(reloaded.num_live, 1)
+            self.assertEqual([r['chunk_text'] for r in reloaded.search([1.0, 0.0], top_k=3)], ["z"])
+
+            # After compaction the directory is rewritten as a single new generation
+            reloaded.compact()
+            reloaded.save(tmp)
+            with open(os.path.join(tmp, "manifest.json")) as f:
+                manifest = json.load(f)
+            self.assertEqual(manifest["generation"], 1)
+            self.assertEqual(len(manifest["segments"]), 1)
+            self.assertFalse(os.path.exists(os.path.join(tmp, "vectors_0000_00000.npy")))
+
+    def test_load_legacy_format(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            chunks = [{"doc_id": "a", "filename": "a.txt", "chunk_index": 0, "chunk_text": "x", "global_index": 0}]
+            with open(os.path.join(tmp, "metadata.json"), "w") as f:
+                json.dump(chunks, f)
+            np.save(os.path.join(tmp, "vectors.npy"), np.array([[3.0, 4.0]], dtype='float32'))
+
+            self.store.load(tmp)
+            self.assertEqual(self.store.chunks[0]['chunk_text'], "x")
+            self.assertAlmostEqual(self.store.search([3.0, 4.0], top_k=1)[0]['score'], 1.0, places=5)
+
+    def test_hybrid_search(self):
+        self.store.add_document("doc1", "a.txt", ["alpha beta", "gamma delta", "alpha gamma"],
+                                [[1.0, 0.0], [0.0, 1.0], [0.1, 0.9]])
+
+        # "alpha gamma" is 1st (vector) and tied 2nd (keyword), so it beats the other alpha chunk
+        results = self.store.hybrid_search("alpha", [0.1, 0.9], top_k=3)
+        self.assertEqual(results[0]['chunk_text'], "alpha gamma")
+        self.assertIn('vector_score', results[0])
+        self.assertIn('keyword_score', results[0])
+        self.assertAlmostEqual(results[0]['score'], 1 / 61 + 1 / 62)
+        self.assertEqual(len(results), 3)
+
+    def test_hybrid_search_falls_back_to_keywords(self):
+        self.store.add_document("doc1", "a.txt", ["alpha beta", "gamma delta"], [[1.0, 0.0], [0.0, 1.0]])
+
+        # embed_query returns [] on API errors
+        self.assertEqual([r['chunk_text'] for r in self.store.hybrid_search("gamma", [], top_k=2)], ["gamma delta"])
+
+        failed = Future()
+        failed.set_exception(RuntimeError("API down"))
+        self.assertEqual(len(self.store.hybrid_search("gamma", failed, top_k=2)), 1)
+
+        pending = Future()  # never resolves
+        results = self.store.hybrid_search("gamma", pending, top_k=2, embedding_timeout=0.01)
+        self.assertEqual([r['chunk_text'] for r in results], ["gamma delta"])
+        self.assertNotIn('vector_score', results[0])
+
+    def test_filtered_search(self):
+        self.store.compact_threshold = 1.0
+        self.store.add_document("a", "a.txt", ["a0", "a1"], [[1.0, 0.0], [0.9, 0.1]])
+        self.store.add_document("b", "b.txt", ["b0", "b1"], [[0.0, 1.0], [0.2, 0.8]])
+        self.store.add_document("c", "a.txt", ["c0"], [[0.95, 0.05]])
+
+        q = [1.0, 0.0]
+        self.assertEqual([r['chunk_text'] for r in self.store.search(q, top_k=2, doc_ids=["b"])], ["b1", "b0"])
+        self.assertEqual([r['doc_id'] for r in self.store.search(q, top_k=5, filenames=["a.txt"])], ["a", "c", "a"])
+        self.assertEqual(self.store.search(q, top_k=5, doc_ids=["a"], filenames=["b.txt"]), [])
+        self.assertEqual(self.store.search(q, top_k=5, doc_ids=["missing"]), [])
+
+        # Filter index follows removals and compaction
+        self.store.remove_document("c")
+        self.assertEqual([r['doc_id'] for r in self.store.search(q, top_k=5, filenames=["a.txt"])], ["a", "a"])
+        self.store.compact()
+        self.assertEqual([r['chunk_text'] for r in self.store.search(q, top_k=1, doc_ids=["b"])], ["b1"])
+
+        self.assertEqual(self.store.keyword_search("b0", doc_ids=["a"]), [])
+        self.assertEqual([r['doc_id'] for r in self.store.hybrid_search("b0", q, top_k=3, doc_ids=["b"])], ["b", "b"])
+
+    def test_provenance_persists(self):
+        provenance = [
+            {"page_start": 1, "page_end": 1, "start_offset": 0, "end_offset": 5},
+            {"page_start": 1, "page_end": 2, "start_offset": 4, "end_offset": 12}
+        ]
+        self.store.add_document("doc1", "a.pdf", ["alpha", "beta gamma"], [[1.0, 0.0], [0.0, 1.0]], provenance)
+        self.store.add_document("doc2", "b.txt", ["plain"], [[0.5, 0.5]])
+
+        with tempfile.TemporaryDirectory() as tmp:
+            self.store.save(tmp)
+            self.store.add_document("doc3", "c.pdf", ["more"], [[0.7, 0.7]], [{"page_start": 3, "page_end": 3}])
+            self.store.save(tmp)  # incremental append
+            loaded = VectorStore()
+            loaded.load(tmp)
+
+        chunks = {c['chunk_text']: c for c in loaded.chunks}
+        self.assertEqual((chunks['beta gamma']['page_end'], chunks['beta gamma']['end_offset']), (2, 12))
+        self.assertEqual(chunks['more']['page_start'], 3)
+        self.assertNotIn('page_start', chunks['plain'])
+        self.assertEqual(loaded.search([0.0, 1.0], top_k=1)[0]['start_offset'], 4)
+
+    def test_reusable_vectors_by_chunk_text(self):
+        self.store.add_document("v1", "a.txt", ["same", "old"], [[3.0, 4.0], [1.0, 0.0]])
+        self.store.add_document("other", "b.txt", ["new"], [[0.0, 1.0]])
+
+        reused = self.store.reusable_vectors("v1", ["new", "same", "other"])
+        self.assertIsNone(reused[0])
+        np.testing.assert_allclose(reused[1], [0.6, 0.8], rtol=1e-6)
+        self.assertIsNone(reused[2])
+        self.assertEqual(self.store.reusable_vectors("missing", ["same"]), [None])
+
+        self.store.remove_document("v1")
+        self.assertFalse(self.store.has_document("v1"))
+        self.assertEqual(self.store.reusable_vectors("v1", ["same"]), [None])
+
+class TestNearDuplicateReferences(unittest.TestCase):
+    FOOTER = "This document is confidential and the property of the company, it may not be shared or copied."
+
+    def setUp(self):
+        self.store = VectorStore()
+        self.store.add_document("a", "a.txt", ["alpha report on northern sales", self.FOOTER], [[1, 0, 0], [0, 1, 0]])
+
+    def add_copy(self, doc_id, filename, first):
+        chunks = [first, self.FOOTER + " "]
+        duplicate_of = self.store.near_duplicates(doc_id, chunks)
+        embeddings = [[0, 0, 1] if target is None else None for target in duplicate_of]
+        self.store.add_document(doc_id, filename, chunks, embeddings, duplicate_of=duplicate_of)
+        return duplicate_of
+
+    def test_duplicate_is_a_reference_with_all_sources(self):
+        self.assertEqual(self.add_copy("b", "b.txt", "beta memo on hiring"), [None, ("a", 1)])
+        self.assertEqual((self.store.num_live, self.store.num_references), (3, 1))
+
+        top = self.store.search([0, 1, 0], top_k=1)[0]
+        self.assertEqual([s["filename"] for s in top["sources"]], ["a.txt", "b.txt"])
+        self.assertNotIn("sources", self.store.search([1, 0, 0], top_k=1)[0])
+
+        # Filtering by the referencing document still finds the shared text
+        hits = self.store.search([0, 1, 0], top_k=2, doc_ids=["b"])
+        self.assertEqual(hits[0]["chunk_text"], self.FOOTER)
+        self.assertEqual(self.store.documents(), {"a": "a.txt", "b": "b.txt"})
+
+    def test_removing_canonical_promotes_reference(self):
+        self.add_copy("b", "b.txt", "beta memo on hiring")
+        self.add_copy("c", "c.txt", "gamma plan for next year")
+        self.store.remove_document("a")
+
+        self.assertEqual(self.store.num_references, 1)
+        top = self.store.search([0, 1, 0], top_k=1)[0]
+        self.assertEqual((top["doc_id"], top["chunk_index"]), ("b", 1))
+        self.assertEqual([s["filename"] for s in top["sources"]], ["b.txt", "c.txt"])
+
+        self.store.remove_document("b")
+        self.assertEqual(self.store.num_references, 0)
+        self.assertEqual(self.store.search([0, 1, 0], top_k=1)[0]["doc_id"], "c")
+
+    def test_references_persist(self):
+        self.add_copy("b", "b.txt", "beta memo on hiring")
+        with tempfile.TemporaryDirectory() as tmp:
+            self.store.save(tmp)
+            loaded = VectorStore()
+            loaded.load(tmp)
+            self.assertEqual(loaded.num_references, 1)
+            self.assertEqual(len(loaded.search([0, 1, 0], top_k=1)[0]["sources"]), 2)
+
+            loaded.remove_document("b")
+            loaded.save(tmp)  # incremental: references are rewritten
+            reloaded = VectorStore()
+            reloaded.load(tmp)
+            self.assertEqual((reloaded.num_references, reloaded.documents()), (0, {"a": "a.txt"}))
+
+    def test_incremental_save_writes_only_changes(self):
+        self.store.compact_threshold = 1.0
+        self.add_copy("b", "b.txt", "beta memo on hiring")
+        self.add_copy("c", "c.txt", "gamma plan for next year")
+        self.store.add_document("z", "z.txt", ["zeta", "eta"], [[1, 1, 0], [0, 1, 1]])
+        self.store.remove_document("z")
+        statements = []
+        connect = sqlite3.connect
+
+        def traced(path):
+            conn = connect(path)
+            conn.set_trace_callback(statements.append)
+            return conn
+
+        with tempfile.TemporaryDirectory() as tmp:
+            self.store.save(tmp)
+            # Removing "a" promotes b's reference to a row and re-points c's at it
+            self.store.remove_document("a")
+            with mock.patch("sqlite3.connect", traced):
+                self.store.save(tmp)
+
+            # Only a's two rows are tombstoned again (not z's), and only c's reference is rewritten
+            self.assertEqual(sum(q.startswith("INSERT OR IGNORE INTO tombstones") for q in statements), 2)
+            self.assertEqual(sum(q.startswith("INSERT INTO refs") for q in statements), 1)
+            self.assertNotIn("DELETE FROM refs", statements)
+
+            loaded = VectorStore()
+            loaded.load(tmp)
+            self.assertEqual((loaded.num_live, loaded.num_references), (3, 1))
+            self.assertEqual(loaded.documents(), {"b": "b.txt", "c": "c.txt"})
+            top = loaded.search([0, 1, 0], top_k=1)[0]
+            self.assertEqual((top["doc_id"], top["chunk_index"]), ("b", 1))
+            self.assertEqual([s["filename"] for s in top["sources"]], ["b.txt", "c.txt"])
+
+    def test_reference_to_unknown_chunk_is_rejected(self):
+        with self.assertRaises(ValueError):
+            self.store.add_document("b", "b.txt", ["x"], [None], duplicate_of=[("missing", 0)])
+        self.assertFalse(self.store.has_document("b"))
+
 if __name__ == '__main__':
     unittest.main()